@@ -6,21 +6,89 @@
 # distribution of this software and related documentation without an express
 # license agreement from NVIDIA CORPORATION is strictly prohibited.
 
-import omni.kit.pipapi
+import importlib
+import importlib.util
+import time
+
+import carb.settings
+
+_import_start = time.perf_counter()
 
 # python-osc:
 # - SWIPAT request: http://nvbugs/3684871
 # - A copy of the source is forked to https://github.com/NVIDIA-Omniverse/python-osc
 # - The dependency vendored and installed from exts/omni.osc/vendor/python_osc-1.8.0-py3-none-any.whl
-omni.kit.pipapi.install(
-    package="python-osc", module="pythonosc", use_online_index=False, ignore_cache=True, ignore_import_check=False
-)
+# Resolving the wheel takes a noticeable time even when it is already installed, only do it when it is missing
+if importlib.util.find_spec("pythonosc") is None:
+    import omni.kit.pipapi
 
-from pythonosc import *  # noqa: F401
+    omni.kit.pipapi.install(
+        package="python-osc", module="pythonosc", use_online_index=False, ignore_cache=False, ignore_import_check=False
+    )
 
+from .batching import *  # noqa: F401,F403
+from .codec import *  # noqa: F401,F403
 from .core import *  # noqa: F401,F403
 from .extension import *  # noqa: F401,F403
+from .filters import *  # noqa: F401,F403
+from .message_queue import *  # noqa: F401,F403
+from .monitor import *  # noqa: F401,F403
+from .router import *  # noqa: F401,F403
+from .scheduler import *  # noqa: F401,F403
+from .sender import *  # noqa: F401,F403
 from .server import *  # noqa: F401,F403
+from .stats import *  # noqa: F401,F403
+
+# The optional subsystems load USD, the subprocess and shared memory support or the TCP selectors, and most apps
+# use none of them. Their public names are imported on first access, e.g. `omni.osc.OscTCPServer`.
+_LAZY_EXPORTS = {
+    "binding": (
+        "OSC_BINDINGS_LAYER_DATA_KEY",
+        "OSC_BINDINGS_SETTINGS_PATH",
+        "OscBinding",
+        "OscBindingEngine",
+        "bindings_from_config",
+        "config_entries",
+        "get_osc_binding_engine",
+    ),
+    "capture": ("OSC_CAPTURE_MAGIC", "OscRecorder", "OscReplayer", "read_capture"),
+    "mirror": (
+        "OSC_MIRROR_LAYER_DATA_KEY",
+        "OSC_MIRROR_SETTINGS_PATH",
+        "OscMirrorEntry",
+        "OscStageMirror",
+        "get_osc_mirror",
+        "mirror_entries_from_config",
+    ),
+    "process_server": ("OscProcessServer",),
+    "tcp_server": (
+        "OSC_TCP_DEFAULT_MAX_PACKET_SIZE",
+        "OscFramingError",
+        "OscLengthPrefixFramer",
+        "OscSlipFramer",
+        "OscStreamFramer",
+        "OscTCPServer",
+        "create_framer",
+    ),
+}
+_LAZY_MODULES = {name: module for module, names in _LAZY_EXPORTS.items() for name in names}
+
+
+def __getattr__(name: str):
+    """Import the optional subsystem that defines `name` on first access"""
+    module = _LAZY_MODULES.get(name)
+    if module is None and name in _LAZY_EXPORTS:
+        return importlib.import_module(f"{__name__}.{name}")
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_MODULES))
+
 
 # NOTE(jshrake): omni.graph is an optional dependency so handle the case
 # that the below import fails
@@ -29,3 +97,7 @@ try:
 except Exception as e:
     print(f"omni.osc failed to import OGN due to {e}")
     pass
+
+carb.settings.get_settings().set_float(
+    f"{OSC_STARTUP_SETTINGS_PATH}/importMs", (time.perf_counter() - _import_start) * 1000.0
+)
@@ -0,0 +1,104 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# NVIDIA CORPORATION and its licensors retain all intellectual property
+# and proprietary rights in and to this software, related documentation
+# and any modifications thereto.  Any use, reproduction, disclosure or
+# distribution of this software and related documentation without an express
+# license agreement from NVIDIA CORPORATION is strictly prohibited.
+
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import carb
+import carb.events
+import carb.profiler
+import omni.kit.app
+
+from .core import OSC_DEFAULT_LISTENER, carb_event_payload_from_osc_messages, push_to_osc_event_stream
+from .stats import get_osc_stats
+
+
+class OscEventBatcher:
+    """
+    Buffer OSC messages on the server thread and push them to the OSC event stream of a listener
+    as a single event per frame (or per `interval_ms` milliseconds).
+
+    Subscribers should use `osc_messages_from_carb_event` to unpack the batch.
+
+    Usage::
+
+        import omni.osc
+
+        batcher = omni.osc.OscEventBatcher(interval_ms=0)
+        batcher.start()
+        server = omni.osc.OmniOscExt.create_server(batcher)
+        server.start("192.168.0.1", 3434)
+        # ...
+        server.stop()
+        batcher.stop()
+    """
+
+    def __init__(self, interval_ms: float = 0, listener: str = OSC_DEFAULT_LISTENER):
+        self.interval: float = max(0.0, interval_ms) / 1000.0
+        self.listener: str = listener
+        self.messages: List[Tuple[str, list, float]] = []
+        self.lock: threading.Lock = threading.Lock()
+        self.sub: carb.events.ISubscription = None
+        self.last_flush_time: float = 0.0
+        # The highest number of messages buffered between two flushes
+        self.high_water: int = 0
+
+    def running(self) -> bool:
+        """
+        Returns true if the batcher is flushing on app updates
+        """
+        return self.sub is not None
+
+    def start(self) -> bool:
+        """
+        Start flushing the buffered messages on every app update.
+        Does nothing if the batcher is already running.
+        """
+        if not self.running():
+            update_stream = omni.kit.app.get_app().get_update_event_stream()
+            self.sub = update_stream.create_subscription_to_pop(self.on_update, name="omni.osc batcher")
+        return self.running()
+
+    def stop(self) -> bool:
+        """
+        Stop flushing on app updates. Any buffered messages are pushed immediately.
+        """
+        if self.running():
+            self.sub.unsubscribe()
+            self.sub = None
+            self.flush()
+        return self.running()
+
+    def add(self, addr: str, args: list, timestamp: Optional[float] = None) -> None:
+        """
+        Buffer a message received at `timestamp` (defaults to now). Safe to call from the server thread.
+        """
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        with self.lock:
+            self.messages.append((addr, args, timestamp))
+            if len(self.messages) > self.high_water:
+                self.high_water = len(self.messages)
+                get_osc_stats().note_queue_depth(self.high_water)
+
+    @carb.profiler.profile
+    def flush(self) -> int:
+        """
+        Push every buffered message as a single event. Returns the number of messages pushed.
+        """
+        with self.lock:
+            messages, self.messages = self.messages, []
+        if messages:
+            push_to_osc_event_stream(carb_event_payload_from_osc_messages(messages), self.listener)
+        self.last_flush_time = time.monotonic()
+        return len(messages)
+
+    def on_update(self, _event: carb.events.IEvent) -> None:
+        if time.monotonic() - self.last_flush_time >= self.interval:
+            self.flush()
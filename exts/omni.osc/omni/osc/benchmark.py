@@ -0,0 +1,396 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# NVIDIA CORPORATION and its licensors retain all intellectual property
+# and proprietary rights in and to this software, related documentation
+# and any modifications thereto.  Any use, reproduction, disclosure or
+# distribution of this software and related documentation without an express
+# license agreement from NVIDIA CORPORATION is strictly prohibited.
+
+"""
+Micro-benchmarks for the OSC receive pipeline.
+
+`benchmark_decoder` times the decoder alone. `benchmark_pipeline` drives the whole receive pipeline with a
+load generator, from the socket to the compute of an `On OSC Message` node, and measures each stage.
+
+Usage::
+
+    import omni.osc.benchmark
+
+    results = omni.osc.benchmark.benchmark_decoder()
+    results = await omni.osc.benchmark.benchmark_pipeline(rate=10000, duration=5, output_path="/tmp/osc.json")
+"""
+
+import json
+import socket
+import struct
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import carb
+import carb.events
+import numpy as np
+import omni.kit.app
+from pythonosc import osc_message, osc_message_builder
+
+from .codec import decode_message, encode_message
+from .core import OSC_MESSAGE_ARGUMENTS_STR
+from .router import get_osc_router
+from .server import OSC_SERVER_ENGINE_THREAD
+
+# Representative message shapes, as (address, arguments)
+DECODER_BENCHMARK_MESSAGES: List[Tuple[str, list]] = [
+    ("/fader/1", [0.5]),
+    ("/xy/1", [0.25, 0.75]),
+    ("/accxyz", [0.1, 0.2, 0.3]),
+    ("/button/1", [1]),
+    ("/spectrum", [float(i) for i in range(64)]),
+    ("/label", ["text"]),
+]
+
+# The message shapes the On OSC Message node can output
+PIPELINE_BENCHMARK_MESSAGES: List[Tuple[str, list]] = [
+    (address, args)
+    for address, args in DECODER_BENCHMARK_MESSAGES
+    if all(isinstance(arg, (int, float)) for arg in args)
+]
+# The address prefix of the messages sent by the load generator
+PIPELINE_BENCHMARK_ADDRESS = "/benchmark"
+# Float32 arguments hold every integer up to 2^24 exactly
+_MAX_SEQUENCE = 1 << 24
+
+
+def build_message(address: str, args: list) -> bytes:
+    """
+    Returns the datagram of an OSC message
+    """
+    builder = osc_message_builder.OscMessageBuilder(address=address)
+    for arg in args:
+        builder.add_arg(arg)
+    return builder.build().dgram
+
+
+def _time_per_call(fn: Callable[[bytes], None], data: bytes, iterations: int) -> float:
+    """Returns the average duration of a call in nanoseconds"""
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        fn(data)
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def _decode_message_pythonosc(data: bytes) -> Tuple[str, list]:
+    """The decoding performed by the python-osc Dispatcher"""
+    msg = osc_message.OscMessage(data)
+    return (msg.address, msg.params)
+
+
+def benchmark_decoder(iterations: int = 100000) -> Dict[str, Dict[str, float]]:
+    """
+    Compare the time spent decoding each message shape with python-osc and with `decode_message`.
+
+    Returns:
+        The average time per message in nanoseconds and the speedup, keyed by message address
+    """
+    results = {}
+    for address, args in DECODER_BENCHMARK_MESSAGES:
+        data = build_message(address, args)
+        pythonosc_ns = _time_per_call(_decode_message_pythonosc, data, iterations)
+        fast_ns = _time_per_call(decode_message, data, iterations)
+        results[address] = {"pythonosc_ns": pythonosc_ns, "fast_ns": fast_ns, "speedup": pythonosc_ns / fast_ns}
+        carb.log_info(
+            f"OSC decode {address} ({len(args)} args): python-osc {pythonosc_ns:.0f} ns, "
+            f"fast path {fast_ns:.0f} ns, {pythonosc_ns / fast_ns:.1f}x"
+        )
+    return results
+
+
+class OscLoadGenerator:
+    """
+    Send OSC messages at a fixed rate from a background thread.
+
+    The messages cycle through every shape sent to `fan_out` addresses prefixed with `/benchmark/<n>`,
+    for `fan_out * len(shapes)` distinct addresses. The first argument of message i is i, as a float.
+    The send time (time.perf_counter) of every message is recorded in `send_times`.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        rate: float = 10000,
+        count: int = 50000,
+        shapes: List[Tuple[str, list]] = PIPELINE_BENCHMARK_MESSAGES,
+        fan_out: int = 16,
+    ):
+        self.destination: Tuple[str, int] = (host, port)
+        self.rate: float = rate
+        self.count: int = min(count, _MAX_SEQUENCE)
+        self.send_times: np.ndarray = np.full(self.count, np.nan)
+        # Pre-encoded datagrams and the offset of their sequence number argument, per (fan out, shape)
+        self.templates: List[Tuple[bytearray, int]] = []
+        for i in range(max(1, fan_out) * len(shapes)):
+            address, args = shapes[i % len(shapes)]
+            address = f"{PIPELINE_BENCHMARK_ADDRESS}/{i // len(shapes)}{address}"
+            data = bytearray(encode_message(address, [0.0] + list(args)))
+            # The first argument follows the padded ",f..." type tag string
+            self.templates.append((data, data.index(b",") + ((len(args) + 2) // 4 + 1) * 4))
+        self.sent: int = 0
+        self.thread: threading.Thread = None
+        self.stop_event: threading.Event = threading.Event()
+
+    def running(self) -> bool:
+        """
+        Returns true if the generator is sending messages
+        """
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self) -> bool:
+        """
+        Start sending messages. Does nothing if the generator is already running.
+        """
+        if not self.running():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name="omni.osc load generator")
+            self.thread.daemon = True
+            self.thread.start()
+        return self.running()
+
+    def stop(self) -> bool:
+        """
+        Stop sending messages
+        """
+        if self.running():
+            self.stop_event.set()
+            self.thread.join()
+        self.thread = None
+        return self.running()
+
+    def _run(self) -> None:
+        """The generator thread, sends the messages due every millisecond"""
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.connect((socket.gethostbyname(self.destination[0]), self.destination[1]))
+            start_time = time.perf_counter()
+            while self.sent < self.count and not self.stop_event.is_set():
+                due = min(self.count, int((time.perf_counter() - start_time) * self.rate) + 1)
+                while self.sent < due:
+                    data, offset = self.templates[self.sent % len(self.templates)]
+                    struct.pack_into(">f", data, offset, self.sent)
+                    self.send_times[self.sent] = time.perf_counter()
+                    try:
+                        sock.send(data)
+                    except OSError:
+                        # Count it as dropped, like a datagram the kernel does not deliver
+                        pass
+                    self.sent += 1
+                time.sleep(0.001)
+
+
+def _latency_stats(start: np.ndarray, end: np.ndarray) -> Dict[str, float]:
+    """Returns the percentiles in milliseconds of the latencies between two arrays of times"""
+    latencies = (end - start)[~(np.isnan(start) | np.isnan(end))] * 1000.0
+    if latencies.size == 0:
+        return {"count": 0}
+    p50, p99, p999 = np.percentile(latencies, [50, 99, 99.9])
+    return {
+        "count": int(latencies.size),
+        "mean": float(latencies.mean()),
+        "p50": float(p50),
+        "p99": float(p99),
+        "p999": float(p999),
+        "max": float(latencies.max()),
+    }
+
+
+def _create_benchmark_graph(graph_path: str, queue_policy: str) -> bool:
+    """Create an action graph with an On OSC Message node listening to the load generator"""
+    try:
+        import omni.graph.core as og
+
+        keys = og.Controller.Keys
+        og.Controller.edit(
+            {"graph_path": graph_path, "evaluator_name": "execution"},
+            {
+                keys.CREATE_NODES: [("on_osc", "omni.osc.OnOscEvent")],
+                keys.SET_VALUES: [
+                    ("on_osc.inputs:path", PIPELINE_BENCHMARK_ADDRESS + "/"),
+                    ("on_osc.inputs:argumentsAsArray", True),
+                    ("on_osc.inputs:queuePolicy", queue_policy),
+                    ("on_osc.inputs:queueSize", 4096),
+                ],
+            },
+        )
+        return True
+    except Exception as e:
+        carb.log_warn(f"Unable to create the OSC benchmark graph, the compute stage is not measured: {e}")
+        return False
+
+
+async def benchmark_pipeline(
+    rate: float = 10000,
+    duration: float = 5.0,
+    shapes: List[Tuple[str, list]] = PIPELINE_BENCHMARK_MESSAGES,
+    fan_out: int = 16,
+    port: int = 3399,
+    engine: str = OSC_SERVER_ENGINE_THREAD,
+    workers: int = 1,
+    numpy_arrays: bool = False,
+    graph: bool = True,
+    queue_policy: str = "latest",
+    output_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Send `rate` messages per second for `duration` seconds to a server created like the extension's, and time
+    each message through the stages of the receive pipeline:
+
+    - receive: from the send call to the server handler (`on_osc_msg`), which stamps the message
+    - stream: from the server handler to a subscriber of the OSC event stream, on the main thread
+    - compute: from the subscriber to the compute of an `On OSC Message` node that output the message
+    - end_to_end: from the send call to the node compute, or to the subscriber when `graph` is false
+
+    The node outputs at most one message per evaluation, so with the default "latest" queue policy the compute
+    stage only times the messages that were not superseded before the node evaluated.
+
+    The compute stage is timed by wrapping `OgnOnOscEvent.compute` for the duration of the run, so every
+    `On OSC Message` node of the app goes through the wrapper meanwhile. Only the nodes of the benchmark graph
+    are timed, the other nodes pay a prim path check per evaluation.
+
+    Must run on Kit's main loop, since the stream and the graph only progress on app updates.
+
+    Returns:
+        The results, also written as JSON to `output_path` when provided: the configuration, the number of
+        messages sent, received and computed, the throughput, the drop rate, the latency percentiles of each
+        stage in milliseconds, and the frame time and main thread time spent handling OSC messages per frame
+    """
+    from .extension import OmniOscExt
+
+    app = omni.kit.app.get_app()
+    generator = OscLoadGenerator(
+        "127.0.0.1", port, rate=rate, count=int(rate * duration), shapes=shapes, fan_out=fan_out
+    )
+    receive_times = np.full(generator.count, np.nan)
+    subscriber_times = np.full(generator.count, np.nan)
+    compute_times = np.full(generator.count, np.nan)
+    # Main thread time spent handling OSC messages during the current frame
+    main_thread_time = [0.0]
+
+    def on_message(_address: str, args: list, timestamp: float) -> None:
+        start = time.perf_counter()
+        seq = int(args[0])
+        receive_times[seq] = timestamp
+        subscriber_times[seq] = start
+        main_thread_time[0] += time.perf_counter() - start
+
+    frame_times: List[float] = []
+    main_thread_times: List[float] = []
+    last_update_time = [time.perf_counter()]
+
+    def on_update(_event: carb.events.IEvent) -> None:
+        now = time.perf_counter()
+        frame_times.append(now - last_update_time[0])
+        main_thread_times.append(main_thread_time[0])
+        last_update_time[0] = now
+        main_thread_time[0] = 0.0
+
+    graph_path = "/OscBenchmark"
+    compute_class = None
+    original_compute = None
+    if graph:
+        from .ogn.nodes.OgnOnOscEvent import OgnOnOscEvent
+
+        def timed_compute(db) -> bool:
+            # The nodes of the other graphs are evaluated as is
+            if not db.node.get_prim_path().startswith(graph_path):
+                return original_compute(db)
+            start = time.perf_counter()
+            result = original_compute(db)
+            end = time.perf_counter()
+            main_thread_time[0] += end - start
+            args = db.outputs.message.attribute_by_name(OSC_MESSAGE_ARGUMENTS_STR) if result else None
+            if args is not None:
+                compute_times[int(args.value[0])] = end
+            return result
+
+        if _create_benchmark_graph(graph_path, queue_policy):
+            compute_class = OgnOnOscEvent
+            original_compute = OgnOnOscEvent.compute
+            OgnOnOscEvent.compute = staticmethod(timed_compute)
+
+    server = OmniOscExt.create_server(engine=engine, workers=workers, numpy_arrays=numpy_arrays)
+    router_sub = get_osc_router().subscribe(PIPELINE_BENCHMARK_ADDRESS + "/", on_message)
+    update_sub = app.get_update_event_stream().create_subscription_to_pop(on_update, name="omni.osc benchmark")
+    try:
+        if not server.start("127.0.0.1", port):
+            raise RuntimeError(f"Unable to start the OSC benchmark server on port {port}")
+        # Let the graph evaluate once, so that the node subscribes before the first message
+        await app.next_update_async()
+        await app.next_update_async()
+        frame_times.clear()
+        main_thread_times.clear()
+        generator.start()
+        start_time = time.perf_counter()
+        while generator.running():
+            await app.next_update_async()
+        send_duration = time.perf_counter() - start_time
+        # Let the messages still in flight reach the end of the pipeline
+        drain_end = time.perf_counter() + 0.5
+        while time.perf_counter() < drain_end:
+            await app.next_update_async()
+    finally:
+        generator.stop()
+        update_sub.unsubscribe()
+        router_sub.unsubscribe()
+        server.stop()
+        if compute_class is not None:
+            compute_class.compute = staticmethod(original_compute)
+            import omni.usd
+
+            omni.usd.get_context().get_stage().RemovePrim(graph_path)
+
+    sent = generator.sent
+    received = int(np.count_nonzero(~np.isnan(subscriber_times)))
+    computed = int(np.count_nonzero(~np.isnan(compute_times)))
+    frame_ms = np.array(frame_times) * 1000.0
+    main_thread_ms = np.array(main_thread_times) * 1000.0
+    ext_manager = app.get_extension_manager()
+    results = {
+        "extension": ext_manager.get_enabled_extension_id("omni.osc"),
+        "time": time.time(),
+        "config": {
+            "rate": rate,
+            "duration": duration,
+            "fan_out": fan_out,
+            "shapes": [address for address, _ in shapes],
+            "engine": engine,
+            "workers": workers,
+            "numpy_arrays": numpy_arrays,
+            "graph": compute_class is not None,
+            "queue_policy": queue_policy,
+        },
+        "sent": sent,
+        "received": received,
+        "computed": computed,
+        "msgs_per_s": received / send_duration if send_duration > 0 else 0.0,
+        "drop_rate": (sent - received) / sent if sent > 0 else 0.0,
+        "latency_ms": {
+            "receive": _latency_stats(generator.send_times, receive_times),
+            "stream": _latency_stats(receive_times, subscriber_times),
+            "compute": _latency_stats(subscriber_times, compute_times),
+            "end_to_end": _latency_stats(
+                generator.send_times, compute_times if compute_class is not None else subscriber_times
+            ),
+        },
+        "frames": {
+            "count": len(frame_times),
+            "frame_ms": _latency_stats(np.zeros_like(frame_ms), frame_ms),
+            "main_thread_ms": _latency_stats(np.zeros_like(main_thread_ms), main_thread_ms),
+        },
+    }
+    end_to_end = results["latency_ms"]["end_to_end"]
+    carb.log_info(
+        f"OSC pipeline: {results['msgs_per_s']:.0f} msgs/s, {results['drop_rate'] * 100:.2f}% dropped, "
+        f"end to end p50 {end_to_end.get('p50', float('nan')):.2f} ms, p99 {end_to_end.get('p99', float('nan')):.2f} ms"
+    )
+    if output_path:
+        with open(output_path, "w") as f:
+            json.dump(results, f, indent=4)
+    return results
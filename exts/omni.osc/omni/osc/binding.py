@@ -0,0 +1,287 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# NVIDIA CORPORATION and its licensors retain all intellectual property
+# and proprietary rights in and to this software, related documentation
+# and any modifications thereto.  Any use, reproduction, disclosure or
+# distribution of this software and related documentation without an express
+# license agreement from NVIDIA CORPORATION is strictly prohibited.
+
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+import carb
+import carb.events
+import carb.profiler
+import carb.settings
+import numpy as np
+import omni.kit.app
+import omni.usd
+from pxr import Sdf, Usd
+
+from .core import OSC_DEFAULT_LISTENER
+from .router import OscAddressRouter, OscRouterSubscription, get_osc_router
+
+# The key of the bindings in the custom layer data of a stage root layer
+OSC_BINDINGS_LAYER_DATA_KEY = "omni.osc:bindings"
+# The settings path of the bindings loaded by the extension
+OSC_BINDINGS_SETTINGS_PATH = "exts/omni.osc/bindings"
+
+
+class OscBinding:
+    """
+    Drives a prim attribute with the arguments of the OSC messages matching an address filter.
+
+    The value written is `argument * scale + offset`, where the argument is the message argument at index
+    `argument`, or every argument as a tuple (e.g. for a float3 attribute) when `argument` is None.
+    Only the messages received by `listener` are considered.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        prim_path: str,
+        attribute: str,
+        scale: float = 1.0,
+        offset: float = 0.0,
+        argument: Optional[int] = None,
+        listener: str = OSC_DEFAULT_LISTENER,
+    ):
+        self.address: str = address
+        self.listener: str = listener
+        self.path: Sdf.Path = Sdf.Path(prim_path).AppendProperty(attribute)
+        self.scale: float = scale
+        self.offset: float = offset
+        self.argument: Optional[int] = argument
+
+    @staticmethod
+    def from_dict(config: Dict[str, Any]) -> "OscBinding":
+        """
+        Create a binding from a dictionary with the "address", "prim" and "attribute" keys,
+        and the optional "scale", "offset", "argument" and "listener" keys
+
+        Raises:
+            KeyError if a required key is missing
+        """
+        argument = config.get("argument")
+        return OscBinding(
+            config["address"],
+            config["prim"],
+            config["attribute"],
+            scale=float(config.get("scale", 1.0)),
+            offset=float(config.get("offset", 0.0)),
+            argument=None if argument is None or argument < 0 else int(argument),
+            listener=config.get("listener", OSC_DEFAULT_LISTENER),
+        )
+
+    def value(self, args: Union[list, np.ndarray]) -> Union[float, Tuple[float, ...]]:
+        """
+        Returns the attribute value for the arguments of a message
+
+        Raises:
+            IndexError if the message has no argument at index `argument`
+        """
+        values = np.asarray(args if self.argument is None else (args[self.argument],), dtype=np.float64)
+        values = values * self.scale + self.offset
+        return values.item() if values.size == 1 else tuple(values.tolist())
+
+
+def config_entries(config: Union[None, Iterable, Dict[str, Any]]) -> List[Any]:
+    """
+    Returns the entries of a configuration given as a list of entries, or as a dictionary of entries keyed by name
+    """
+    if not config:
+        return []
+    return list(config.values() if isinstance(config, dict) else config)
+
+
+def bindings_from_config(config: Union[None, Iterable, Dict[str, Any]]) -> List[OscBinding]:
+    """
+    Returns the bindings described by a list of binding dictionaries, or by a dictionary of binding dictionaries
+    keyed by name. Invalid entries are skipped with a warning.
+    """
+    bindings = []
+    for entry in config_entries(config):
+        try:
+            bindings.append(OscBinding.from_dict(dict(entry)))
+        except Exception as e:
+            carb.log_warn(f"Ignoring invalid OSC binding {entry}: {e}")
+    return bindings
+
+
+class OscBindingEngine:
+    """
+    Write the arguments of OSC messages to USD attributes, following a table of bindings.
+
+    Every binding registers with the OSC router, the engine only keeps the latest arguments of each binding.
+    Once per frame, every pending value is written to the edit target layer of the stage inside a single
+    `Sdf.ChangeBlock`, so hundreds of channels only trigger a single USD change notification.
+
+    Usage::
+
+        import omni.osc
+
+        engine = omni.osc.OscBindingEngine()
+        engine.load([{"address": "/fader/1$", "prim": "/World/Cube", "attribute": "xformOp:scale", "scale": 2.0}])
+        engine.start()
+    """
+
+    def __init__(self, usd_context_name: str = "", router: Optional[OscAddressRouter] = None):
+        self.usd_context_name: str = usd_context_name
+        # The router of every binding, instead of the router of the binding listener
+        self.router: Optional[OscAddressRouter] = router
+        self.bindings: List[OscBinding] = []
+        self.subs: List[OscRouterSubscription] = []
+        # The latest arguments received for each binding since the last frame, keyed by binding index
+        self.pending: Dict[int, Union[list, np.ndarray]] = {}
+        # The attribute spec written by each binding in the edit target layer
+        self.specs: Dict[int, Sdf.AttributeSpec] = {}
+        # The bindings whose attribute does not exist, skipped until the bindings or the edit target change
+        self.missing: Set[int] = set()
+        self.layer: Optional[Sdf.Layer] = None
+        self.sub: carb.events.ISubscription = None
+
+    def running(self) -> bool:
+        """
+        Returns true if the engine writes the pending values on every app update
+        """
+        return self.sub is not None
+
+    def start(self) -> bool:
+        """
+        Start writing the pending values on every app update.
+        Does nothing if the engine is already running.
+        """
+        if not self.running():
+            update_stream = omni.kit.app.get_app().get_update_event_stream()
+            self.sub = update_stream.create_subscription_to_pop(self.on_update, name="omni.osc bindings")
+        return self.running()
+
+    def stop(self) -> bool:
+        """
+        Stop writing values, the bindings stay registered
+        """
+        if self.running():
+            self.sub.unsubscribe()
+            self.sub = None
+        return self.running()
+
+    def load(self, config: Union[None, Iterable, Dict[str, Any]]) -> int:
+        """
+        Replace the bindings with the ones described by `config` (see `bindings_from_config`).
+        Returns the number of bindings loaded.
+        """
+        self.clear()
+        for binding in bindings_from_config(config):
+            index = len(self.bindings)
+            try:
+                router = self.router if self.router is not None else get_osc_router(binding.listener)
+                sub = router.subscribe(binding.address, lambda _addr, args, _ts, i=index: self.on_message(i, args))
+            except Exception as e:
+                carb.log_warn(f"Ignoring OSC binding with an invalid address filter '{binding.address}': {e}")
+                continue
+            self.bindings.append(binding)
+            self.subs.append(sub)
+        return len(self.bindings)
+
+    def reload(self, settings_path: str = OSC_BINDINGS_SETTINGS_PATH) -> int:
+        """
+        Replace the bindings with the ones stored in the settings at `settings_path`, followed by the ones stored
+        in the custom layer data of the stage root layer under the "omni.osc:bindings" key.
+        Returns the number of bindings loaded.
+        """
+        config = config_entries(carb.settings.get_settings().get(settings_path))
+        stage = self._stage()
+        if stage is not None:
+            config += config_entries(stage.GetRootLayer().customLayerData.get(OSC_BINDINGS_LAYER_DATA_KEY))
+        return self.load(config)
+
+    def clear(self) -> None:
+        """
+        Unregister every binding and drop the pending values
+        """
+        for sub in self.subs:
+            sub.unsubscribe()
+        self.subs = []
+        self.bindings = []
+        self.pending = {}
+        self.specs = {}
+        self.missing = set()
+
+    def on_message(self, index: int, args: Union[list, np.ndarray]) -> None:
+        """The router callback of a binding, only keeps the latest arguments"""
+        self.pending[index] = args
+
+    def _stage(self) -> Optional[Usd.Stage]:
+        return omni.usd.get_context(self.usd_context_name).get_stage()
+
+    def _spec(self, stage: Usd.Stage, layer: Sdf.Layer, index: int) -> Optional[Sdf.AttributeSpec]:
+        """Returns the attribute spec written by a binding in a layer, creating it if needed"""
+        spec = self.specs.get(index)
+        if spec is not None and not spec.expired:
+            return spec
+        if index in self.missing:
+            return None
+        path = self.bindings[index].path
+        spec = layer.GetAttributeAtPath(path)
+        if spec is None:
+            attribute = stage.GetAttributeAtPath(path)
+            if not attribute:
+                carb.log_warn(f"OSC binding for '{self.bindings[index].address}': no attribute at {path}")
+                self.missing.add(index)
+                return None
+            prim_spec = Sdf.CreatePrimInLayer(layer, path.GetPrimPath())
+            spec = Sdf.AttributeSpec(prim_spec, path.name, attribute.GetTypeName())
+        self.specs[index] = spec
+        return spec
+
+    @carb.profiler.profile
+    def apply(self) -> int:
+        """
+        Write the pending values, returns the number of attributes written
+        """
+        if not self.pending:
+            return 0
+        pending, self.pending = self.pending, {}
+        stage = self._stage()
+        if stage is None:
+            return 0
+        layer = stage.GetEditTarget().GetLayer()
+        if layer != self.layer:
+            self.layer = layer
+            self.specs = {}
+            self.missing = set()
+        # Resolve the specs first, the composed stage must not be queried inside a change block
+        specs = []
+        for index, args in pending.items():
+            try:
+                value = self.bindings[index].value(args)
+            except Exception as e:
+                carb.log_warn(f"OSC binding for '{self.bindings[index].address}' cannot convert {args}: {e}")
+                continue
+            spec = self._spec(stage, layer, index)
+            if spec is not None:
+                specs.append((index, spec, value))
+        written = 0
+        with Sdf.ChangeBlock():
+            for index, spec, value in specs:
+                try:
+                    spec.default = value
+                    written += 1
+                except Exception as e:
+                    carb.log_warn(f"OSC binding cannot write {value} to {self.bindings[index].path}: {e}")
+        return written
+
+    def on_update(self, _event: carb.events.IEvent) -> None:
+        self.apply()
+
+
+_engine: Optional[OscBindingEngine] = None
+
+
+def get_osc_binding_engine() -> OscBindingEngine:
+    """
+    Returns the binding engine of the extension
+    """
+    global _engine
+    if _engine is None:
+        _engine = OscBindingEngine()
+    return _engine
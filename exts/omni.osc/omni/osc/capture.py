@@ -0,0 +1,240 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# NVIDIA CORPORATION and its licensors retain all intellectual property
+# and proprietary rights in and to this software, related documentation
+# and any modifications thereto.  Any use, reproduction, disclosure or
+# distribution of this software and related documentation without an express
+# license agreement from NVIDIA CORPORATION is strictly prohibited.
+
+"""
+Capture and replay of raw OSC traffic.
+
+A capture file starts with an 8 bytes header (`OSC_CAPTURE_MAGIC`) followed by one record per datagram:
+the receive time in seconds since the Unix epoch (little-endian float64), the datagram size
+(little-endian uint32) and the datagram bytes.
+"""
+
+import mmap
+import os
+import socket
+import struct
+import threading
+import time
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
+
+import carb
+from pythonosc.dispatcher import Dispatcher
+
+from .codec import Buffer, OscFastDispatcher
+
+OSC_CAPTURE_MAGIC = b"OSCCAP\x00\x01"
+_RECORD_HEADER = struct.Struct("<dI")
+# The client address reported to the dispatcher for replayed datagrams
+_REPLAY_CLIENT_ADDRESS = ("127.0.0.1", 0)
+
+
+class OscRecorder:
+    """
+    Append the raw datagrams received by a dispatcher to a capture file.
+
+    Usage::
+
+        import omni.osc
+
+        recorder = omni.osc.OscRecorder("/tmp/show.osccap")
+        recorder.start(dispatcher)
+        # ...
+        recorder.stop()
+    """
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self.file: BinaryIO = None
+        self.lock: threading.Lock = threading.Lock()
+        self.dispatcher: Dispatcher = None
+        # Number of datagrams recorded since the recorder started
+        self.count: int = 0
+
+    def running(self) -> bool:
+        """
+        Returns true if the recorder is recording
+        """
+        return self.file is not None
+
+    def start(self, dispatcher: Dispatcher) -> bool:
+        """
+        Start recording the datagrams received by a dispatcher (see `OscFastDispatcher.packet_callbacks`).
+        Appends to the capture file if it already exists.
+        """
+        if not self.running():
+            try:
+                exists = os.path.exists(self.path) and os.path.getsize(self.path) > 0
+                if exists:
+                    with open(self.path, "rb") as f:
+                        if f.read(len(OSC_CAPTURE_MAGIC)) != OSC_CAPTURE_MAGIC:
+                            raise ValueError(f"{self.path} is not an OSC capture file")
+                self.file = open(self.path, "ab")
+                if not exists:
+                    self.file.write(OSC_CAPTURE_MAGIC)
+                self.count = 0
+                self.dispatcher = dispatcher
+                dispatcher.packet_callbacks.append(self.record)
+                carb.log_info(f"Recording OSC traffic to {self.path}")
+            except Exception as e:
+                carb.log_error(f"Error starting OSC recorder: {e}")
+                if self.file is not None:
+                    self.file.close()
+                    self.file = None
+        return self.running()
+
+    def stop(self) -> bool:
+        """
+        Stop recording and close the capture file
+        """
+        if self.running():
+            self.dispatcher.packet_callbacks.remove(self.record)
+            self.dispatcher = None
+            with self.lock:
+                self.file.close()
+                self.file = None
+            carb.log_info(f"Recorded {self.count} OSC datagrams to {self.path}")
+        return self.running()
+
+    def record(self, data: Buffer, _client_address: Tuple[str, int]) -> None:
+        """
+        Append a datagram to the capture file. Safe to call from the server threads.
+        """
+        header = _RECORD_HEADER.pack(time.time(), len(data))
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(header)
+            self.file.write(data)
+            self.count += 1
+
+
+def read_capture(buffer: Buffer) -> Iterator[Tuple[float, memoryview]]:
+    """
+    Iterate over the (receive time, datagram) records of a capture file loaded in a buffer.
+    The datagrams are slices of the buffer, they are not copied.
+
+    Raises:
+        ValueError if the buffer does not hold an OSC capture
+    """
+    view = memoryview(buffer)
+    if view[: len(OSC_CAPTURE_MAGIC)] != OSC_CAPTURE_MAGIC:
+        raise ValueError("Not an OSC capture file")
+    index = len(OSC_CAPTURE_MAGIC)
+    while index + _RECORD_HEADER.size <= len(view):
+        timestamp, size = _RECORD_HEADER.unpack_from(view, index)
+        index += _RECORD_HEADER.size
+        if index + size > len(view):
+            carb.log_warn("Truncated record at the end of the OSC capture file")
+            break
+        yield (timestamp, view[index : index + size])
+        index += size
+
+
+class OscReplayer:
+    """
+    Replay a capture file from a background thread, either into a dispatcher (and so into the OSC event stream)
+    or to a UDP host and port. The file is memory-mapped, datagrams are never copied before being sent or dispatched
+    by an `OscFastDispatcher`. Other dispatchers receive a copy of each datagram.
+
+    The replay runs at the captured pace scaled by `speed` (2.0 replays twice as fast),
+    or as fast as possible when `speed` is 0.
+
+    Usage::
+
+        import omni.osc
+
+        replayer = omni.osc.OscReplayer("/tmp/show.osccap")
+        replayer.start(("127.0.0.1", 3334), speed=1.0)
+        # ...
+        replayer.stop()
+    """
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self.thread: threading.Thread = None
+        self.stop_event: threading.Event = threading.Event()
+        # Number of datagrams replayed since the replay started
+        self.count: int = 0
+
+    def running(self) -> bool:
+        """
+        Returns true if the replay is in progress
+        """
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, target: Union[Dispatcher, Tuple[str, int]], speed: float = 1.0, loop: bool = False) -> bool:
+        """
+        Start replaying into a dispatcher, or to a (host, port) UDP destination.
+        Does nothing if the replay is already in progress.
+        """
+        if not self.running():
+            self.stop_event.clear()
+            self.count = 0
+            self.thread = threading.Thread(target=self._run, args=(target, speed, loop), name="omni.osc replayer")
+            self.thread.daemon = True
+            self.thread.start()
+        return self.running()
+
+    def stop(self) -> bool:
+        """
+        Stop replaying
+        """
+        if self.running():
+            self.stop_event.set()
+            self.thread.join()
+        self.thread = None
+        return self.running()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the replay to complete, returns true if it did
+        """
+        if self.thread is not None:
+            self.thread.join(timeout)
+        return not self.running()
+
+    def _run(self, target: Union[Dispatcher, Tuple[str, int]], speed: float, loop: bool) -> None:
+        """The replay thread"""
+        sock = None
+        try:
+            if isinstance(target, OscFastDispatcher):
+                send = lambda data: target.call_handlers_for_packet(data, _REPLAY_CLIENT_ADDRESS)  # noqa: E731
+            elif isinstance(target, Dispatcher):
+                # python-osc dispatchers parse bytes, copy each datagram out of the mapped file
+                send = lambda data: target.call_handlers_for_packet(bytes(data), _REPLAY_CLIENT_ADDRESS)  # noqa: E731
+            else:
+                family, _, _, _, sockaddr = socket.getaddrinfo(*target, type=socket.SOCK_DGRAM)[0]
+                sock = socket.socket(family, socket.SOCK_DGRAM)
+                sock.connect(sockaddr)
+                send = sock.send
+            with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                while True:
+                    self._replay(buffer, send, speed)
+                    if not loop or self.stop_event.is_set():
+                        break
+        except Exception as e:
+            carb.log_error(f"Error replaying OSC capture {self.path}: {e}")
+        finally:
+            if sock is not None:
+                sock.close()
+
+    def _replay(self, buffer: mmap.mmap, send, speed: float) -> None:
+        """Replay every record of the capture once"""
+        start_time = time.perf_counter()
+        first_timestamp = None
+        for timestamp, data in read_capture(buffer):
+            if self.stop_event.is_set():
+                break
+            if speed > 0:
+                if first_timestamp is None:
+                    first_timestamp = timestamp
+                delay = start_time + (timestamp - first_timestamp) / speed - time.perf_counter()
+                if delay > 0 and self.stop_event.wait(delay):
+                    break
+            send(data)
+            self.count += 1
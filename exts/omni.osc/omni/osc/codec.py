@@ -0,0 +1,322 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# NVIDIA CORPORATION and its licensors retain all intellectual property
+# and proprietary rights in and to this software, related documentation
+# and any modifications thereto.  Any use, reproduction, disclosure or
+# distribution of this software and related documentation without an express
+# license agreement from NVIDIA CORPORATION is strictly prohibited.
+
+import re
+import struct
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from pythonosc import osc_message
+from pythonosc.dispatcher import Dispatcher, Handler
+
+if TYPE_CHECKING:
+    from .scheduler import OscBundleScheduler
+    from .stats import OscStats
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# Matches an OSC string up to, but excluding, its null terminator
+_OSC_STRING = re.compile(rb"[^\x00]*")
+# Type tags that can be unpacked with a single struct format, mapped to their struct format character
+_FAST_TYPE_TAGS = {ord("f"): "f", ord("i"): "i"}
+# Compiled struct per type tag string, None when the type tags are not supported by the fast path
+_struct_cache: Dict[bytes, Optional[struct.Struct]] = {}
+# OSC floats are big-endian 32 bit floats
+_OSC_FLOAT_DTYPE = np.dtype(">f4")
+_FLOAT = struct.Struct(">f")
+_INT = struct.Struct(">i")
+_INT64 = struct.Struct(">q")
+_UINT64 = struct.Struct(">Q")
+_BUNDLE_HEADER = b"#bundle\x00"
+# The size of a bundle header: "#bundle" string and timetag
+OSC_BUNDLE_HEADER_SIZE = len(_BUNDLE_HEADER) + _UINT64.size
+# The timetag of a bundle that must be delivered immediately
+OSC_IMMEDIATELY = 1
+
+
+class OscDecodeError(Exception):
+    """Raised when a datagram is not a valid OSC message"""
+
+
+class OscEncodeError(Exception):
+    """Raised when a value cannot be encoded as an OSC argument"""
+
+
+def _padded_end(end: int) -> int:
+    """Returns the index following an OSC string whose null terminator is at `end`"""
+    return (end + 4) & ~3
+
+
+def _struct_for_type_tags(type_tags: bytes) -> Optional[struct.Struct]:
+    """Returns the cached struct unpacking the arguments of a type tag string, or None"""
+    try:
+        return _struct_cache[type_tags]
+    except KeyError:
+        pass
+    if all(tag in _FAST_TYPE_TAGS for tag in type_tags):
+        fmt = struct.Struct(">" + "".join(_FAST_TYPE_TAGS[tag] for tag in type_tags))
+    else:
+        fmt = None
+    _struct_cache[type_tags] = fmt
+    return fmt
+
+
+def decode_message(data: Buffer, numpy_arrays: bool = False) -> Tuple[str, Union[tuple, np.ndarray]]:
+    """
+    Decode an OSC message, returning its address and arguments.
+
+    Messages whose arguments are all floats and/or ints are unpacked directly from the buffer with a
+    struct compiled once per type tag string. Any other message is decoded by python-osc.
+
+    When `numpy_arrays` is true, the arguments of messages that only contain floats are returned
+    as a single float32 numpy array rather than a tuple of Python floats.
+
+    Raises:
+        OscDecodeError if the data is not a valid OSC message
+    """
+    address_end = _OSC_STRING.match(data, 0).end()
+    tags_start = _padded_end(address_end)
+    if address_end == 0 or data[tags_start : tags_start + 1] != b",":
+        return _decode_message_fallback(data)
+    tags_end = _OSC_STRING.match(data, tags_start).end()
+    type_tags = bytes(data[tags_start + 1 : tags_end])
+    args_start = _padded_end(tags_end)
+    if numpy_arrays and type_tags and type_tags.count(b"f") == len(type_tags):
+        try:
+            array = np.frombuffer(data, dtype=_OSC_FLOAT_DTYPE, count=len(type_tags), offset=args_start)
+        except ValueError as e:
+            raise OscDecodeError(f"Truncated OSC message: {e}")
+        return (str(data[:address_end], "utf-8"), array.astype(np.float32))
+    fmt = _struct_for_type_tags(type_tags)
+    if fmt is None:
+        return _decode_message_fallback(data)
+    try:
+        args = fmt.unpack_from(data, args_start)
+    except struct.error as e:
+        raise OscDecodeError(f"Truncated OSC message: {e}")
+    return (str(data[:address_end], "utf-8"), args)
+
+
+def decode_bundle(data: Buffer) -> Tuple[int, List[Buffer]]:
+    """
+    Decode an OSC bundle, returning its timetag and its elements (messages or nested bundles).
+    The elements are slices of `data`, they are not copied when `data` is a memoryview.
+
+    Raises:
+        OscDecodeError if the data is not a valid OSC bundle
+    """
+    if data[: len(_BUNDLE_HEADER)] != _BUNDLE_HEADER:
+        raise OscDecodeError("OSC bundle should start with '#bundle'")
+    try:
+        (timetag,) = _UINT64.unpack_from(data, len(_BUNDLE_HEADER))
+        elements = []
+        index = OSC_BUNDLE_HEADER_SIZE
+        while index < len(data):
+            (size,) = _INT.unpack_from(data, index)
+            index += _INT.size
+            if size < 0 or index + size > len(data):
+                raise OscDecodeError(f"Invalid OSC bundle element size {size}")
+            elements.append(data[index : index + size])
+            index += size
+    except struct.error as e:
+        raise OscDecodeError(f"Truncated OSC bundle: {e}")
+    return (timetag, elements)
+
+
+def is_bundle(data: Buffer) -> bool:
+    """
+    Returns true if the data looks like an OSC bundle
+    """
+    return data[: len(_BUNDLE_HEADER)] == _BUNDLE_HEADER
+
+
+def _decode_message_fallback(data: Buffer) -> Tuple[str, tuple]:
+    """Decode an OSC message with python-osc"""
+    try:
+        msg = osc_message.OscMessage(bytes(data))
+    except osc_message.ParseError as e:
+        raise OscDecodeError(str(e))
+    return (msg.address, tuple(msg.params))
+
+
+def _encode_string(value: str) -> bytes:
+    """Encode an OSC string: UTF-8 bytes, null terminated and padded to a multiple of 4 bytes"""
+    data = value.encode("utf-8")
+    return data + b"\x00" * (4 - len(data) % 4)
+
+
+def _encode_blob(value: bytes) -> bytes:
+    """Encode an OSC blob: int32 size followed by the bytes padded to a multiple of 4 bytes"""
+    return struct.pack(">i", len(value)) + value + b"\x00" * (-len(value) % 4)
+
+
+def encode_message(address: str, args: Union[Iterable[Any], np.ndarray] = ()) -> bytes:
+    """
+    Encode an OSC message.
+
+    Supported arguments are float ("f"), int ("i", or "h" beyond 32 bits), bool ("T"/"F"), None ("N"),
+    str ("s") and bytes ("b"). A numpy array is encoded as a sequence of floats with a single conversion.
+
+    Raises:
+        OscEncodeError if an argument type is not supported
+    """
+    if isinstance(args, np.ndarray):
+        values = args.astype(_OSC_FLOAT_DTYPE, copy=False).ravel()
+        return _encode_string(address) + _encode_string("," + "f" * len(values)) + values.tobytes()
+
+    tags = []
+    data = []
+    for arg in args:
+        if isinstance(arg, bool):
+            tags.append("T" if arg else "F")
+        elif isinstance(arg, float):
+            tags.append("f")
+            data.append(_FLOAT.pack(arg))
+        elif isinstance(arg, int):
+            if -0x80000000 <= arg <= 0x7FFFFFFF:
+                tags.append("i")
+                data.append(_INT.pack(arg))
+            else:
+                tags.append("h")
+                data.append(_INT64.pack(arg))
+        elif isinstance(arg, str):
+            tags.append("s")
+            data.append(_encode_string(arg))
+        elif isinstance(arg, (bytes, bytearray)):
+            tags.append("b")
+            data.append(_encode_blob(bytes(arg)))
+        elif arg is None:
+            tags.append("N")
+        elif isinstance(arg, np.floating):
+            tags.append("f")
+            data.append(_FLOAT.pack(float(arg)))
+        elif isinstance(arg, np.integer):
+            tags.append("i")
+            data.append(_INT.pack(int(arg)))
+        else:
+            raise OscEncodeError(f"Unsupported OSC argument type {type(arg).__name__}: {arg}")
+    return _encode_string(address) + _encode_string("," + "".join(tags)) + b"".join(data)
+
+
+def encode_bundle(messages: Iterable[bytes], timetag: int = OSC_IMMEDIATELY) -> bytes:
+    """
+    Encode an OSC bundle containing already encoded messages or bundles.
+    The timetag is a 64 bit NTP timestamp, the default delivers the bundle immediately.
+    """
+    data = [_BUNDLE_HEADER, _UINT64.pack(timetag)]
+    for message in messages:
+        data.append(_INT.pack(len(message)))
+        data.append(message)
+    return b"".join(data)
+
+
+def _invoke(handler: Handler, client_address: Tuple[str, int], address: str, args: Iterable[Any]) -> None:
+    """Invoke a python-osc handler with an already decoded message, mirroring `Handler.invoke`"""
+    if handler.needs_reply_address:
+        if handler.args:
+            handler.callback(client_address, address, handler.args, *args)
+        else:
+            handler.callback(client_address, address, *args)
+    else:
+        if handler.args:
+            handler.callback(address, handler.args, *args)
+        else:
+            handler.callback(address, *args)
+
+
+class OscFastDispatcher(Dispatcher):
+    """
+    A python-osc Dispatcher that decodes messages with `decode_message`.
+
+    When no address is mapped, messages go straight to the default handler without matching the address
+    against the mapped patterns.
+
+    When `numpy_arrays` is true, handlers receive the arguments of float-only messages as a single
+    float32 numpy array argument, e.g. `handler(address, array)`.
+
+    Bundles with a timetag are handed to the `scheduler` (see `OscBundleScheduler`), which dispatches their
+    messages on the frame nearest their timetag. Without a scheduler, and for immediate bundles, the messages
+    are dispatched as soon as the bundle is received. Unlike python-osc's Dispatcher, the receiving thread
+    never sleeps until the timetag of a bundle.
+
+    Every callback in `packet_callbacks` is invoked with the raw datagram and the client address
+    before the datagram is decoded, e.g. to record the traffic.
+
+    When `stats` is provided, packets, bytes, decode errors and messages per address are counted
+    in the counters of the receiving thread.
+    """
+
+    def __init__(
+        self,
+        numpy_arrays: bool = False,
+        scheduler: Optional["OscBundleScheduler"] = None,
+        stats: Optional["OscStats"] = None,
+    ) -> None:
+        super().__init__()
+        self.numpy_arrays: bool = numpy_arrays
+        self.scheduler = scheduler
+        self.stats = stats
+        self.packet_callbacks: List[Callable[[Buffer, Tuple[str, int]], None]] = []
+
+    def call_handlers_for_packet(self, data: Buffer, client_address: Tuple[str, int]) -> None:
+        for packet_callback in self.packet_callbacks:
+            packet_callback(data, client_address)
+        if self.stats is not None:
+            counters = self.stats.counters()
+            counters.packets += 1
+            counters.bytes += len(data)
+        try:
+            if is_bundle(data):
+                self._dispatch_bundle(data, client_address)
+            else:
+                self._dispatch_message(decode_message(data, self.numpy_arrays), client_address)
+        except (OscDecodeError, UnicodeDecodeError):
+            if self.stats is not None:
+                self.stats.counters().decode_errors += 1
+            return
+
+    def dispatch_message(self, address: str, args: Any, client_address: Tuple[str, int]) -> None:
+        """
+        Dispatch a message that was already decoded, e.g. by a receiver process
+        """
+        self._dispatch_message((address, args), client_address)
+
+    def _dispatch_bundle(self, data: Buffer, client_address: Tuple[str, int]) -> None:
+        """Dispatch or schedule the messages of a bundle, and of its nested bundles"""
+        timetag, elements = decode_bundle(data)
+        messages = []
+        for element in elements:
+            if is_bundle(element):
+                self._dispatch_bundle(element, client_address)
+            else:
+                messages.append(decode_message(element, self.numpy_arrays))
+        if not messages:
+            return
+        if self.scheduler is not None:
+            if self.scheduler.schedule(timetag, lambda: self._dispatch_messages(messages, client_address)):
+                return
+        self._dispatch_messages(messages, client_address)
+
+    def _dispatch_messages(self, messages: List[Tuple[str, Any]], client_address: Tuple[str, int]) -> None:
+        for message in messages:
+            self._dispatch_message(message, client_address)
+
+    def _dispatch_message(self, message: Tuple[str, Any], client_address: Tuple[str, int]) -> None:
+        address, args = message
+        if self.stats is not None:
+            self.stats.counters().count_message(address)
+        if isinstance(args, np.ndarray):
+            args = (args,)
+        if self._map:
+            handlers = self.handlers_for_address(address)
+        elif self._default_handler is not None:
+            handlers = (self._default_handler,)
+        else:
+            return
+        for handler in handlers:
+            _invoke(handler, client_address, address, args)
@@ -8,10 +8,13 @@
 ## This software product is governed by the End User License Agreement
 ## provided with the software product.
 
-from typing import Callable, Tuple
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import carb
 import carb.events
+import numpy as np
 import omni.ext
 import omni.kit.app
 
@@ -19,36 +22,217 @@ OSC_EVENT_TYPE_NAME: str = "omni.osc"
 OSC_EVENT_TYPE: int = carb.events.type_from_string(OSC_EVENT_TYPE_NAME)
 OSC_MESSAGE_ADDRESS_STR = "address"
 OSC_MESSAGE_ARGUMENTS_STR = "arguments"
+OSC_MESSAGE_TIMESTAMP_STR = "timestamp"
+OSC_MESSAGES_STR = "messages"
+# The name of the default listener, whose messages are pushed to the app message bus
+OSC_DEFAULT_LISTENER = ""
 
+# The settings path the import and startup times of the extension are published to
+OSC_STARTUP_SETTINGS_PATH = "exts/omni.osc/startup"
 
-def get_osc_event_stream() -> carb.events._events.IEventStream:
+# The default number of distinct addresses held by a value store
+OSC_VALUE_STORE_DEFAULT_CAPACITY = 4096
+
+# The event streams of the named listeners, pumped on every app update
+_listener_streams: Dict[str, carb.events._events.IEventStream] = {}
+_pump_sub: Optional[carb.events._events.ISubscription] = None
+
+
+def _pump_listener_streams(_event: carb.events._events.IEvent) -> None:
+    for stream in list(_listener_streams.values()):
+        stream.pump()
+
+def get_osc_event_stream(listener: str = OSC_DEFAULT_LISTENER) -> carb.events._events.IEventStream:
+    """
+    Returns the OSC event stream of a listener.
+    The default listener uses the app message bus, every named listener has a dedicated stream,
+    created on first use and pumped on every app update.
     """
-    Returns the OSC event stream
+    global _pump_sub
+    if listener == OSC_DEFAULT_LISTENER:
+        return omni.kit.app.get_app().get_message_bus_event_stream()
+    stream = _listener_streams.get(listener)
+    if stream is None:
+        stream = carb.events.get_events_interface().create_event_stream()
+        _listener_streams[listener] = stream
+        if _pump_sub is None:
+            update_stream = omni.kit.app.get_app().get_update_event_stream()
+            _pump_sub = update_stream.create_subscription_to_pop(_pump_listener_streams, name="omni.osc listeners")
+    return stream
+
+def release_osc_event_streams() -> None:
+    """
+    Stop pumping the event streams of the named listeners and release them
     """
-    return omni.kit.app.get_app().get_message_bus_event_stream()
+    global _pump_sub
+    if _pump_sub is not None:
+        _pump_sub.unsubscribe()
+        _pump_sub = None
+    _listener_streams.clear()
 
-def push_to_osc_event_stream(payload: dict) -> None:
+def push_to_osc_event_stream(payload: dict, listener: str = OSC_DEFAULT_LISTENER) -> None:
     """
-    Push a payload to the OSC event stream
+    Push a payload to the OSC event stream of a listener
     """
-    get_osc_event_stream().push(OSC_EVENT_TYPE, sender=0, payload=payload)
+    get_osc_event_stream(listener).push(OSC_EVENT_TYPE, sender=0, payload=payload)
 
 def subscribe_to_osc_event_stream(
-    cb: Callable[[carb.events._events.IEvent], None]
+    cb: Callable[[carb.events._events.IEvent], None], listener: str = OSC_DEFAULT_LISTENER
 ) -> carb.events._events.ISubscription:
     """
-    Returns a Carbonite event subscription to the OSC event stream
+    Returns a Carbonite event subscription to the OSC event stream of a listener
     """
-    return get_osc_event_stream().create_subscription_to_pop_by_type(OSC_EVENT_TYPE, cb)
+    return get_osc_event_stream(listener).create_subscription_to_pop_by_type(OSC_EVENT_TYPE, cb)
 
-def carb_event_payload_from_osc_message(address: str, args: list) -> dict:
+def carb_event_payload_from_osc_message(
+    address: str, args: Union[list, np.ndarray], timestamp: Optional[float] = None
+) -> dict:
     """
-    Return a carbonite event payload suitable for pushing to the OSC event stream
+    Return a carbonite event payload suitable for pushing to the OSC event stream.
+    Numpy array arguments are converted to a list of Python floats.
+    The optional timestamp is the time the message was received, as returned by `time.perf_counter()`.
     """
-    return {OSC_MESSAGE_ADDRESS_STR: address, OSC_MESSAGE_ARGUMENTS_STR: args}
+    if isinstance(args, np.ndarray):
+        args = args.tolist()
+    if timestamp is None:
+        return {OSC_MESSAGE_ADDRESS_STR: address, OSC_MESSAGE_ARGUMENTS_STR: args}
+    return {OSC_MESSAGE_ADDRESS_STR: address, OSC_MESSAGE_ARGUMENTS_STR: args, OSC_MESSAGE_TIMESTAMP_STR: timestamp}
 
 def osc_message_from_carb_event(e: carb.events.IEvent) -> Tuple[str, list]:
     """
     Return the OSC message address and arguments extracted from a carbonite event payload
     """
     return (e.payload[OSC_MESSAGE_ADDRESS_STR], e.payload[OSC_MESSAGE_ARGUMENTS_STR])
+
+def carb_event_payload_from_osc_messages(messages: List[Tuple]) -> dict:
+    """
+    Return a carbonite event payload carrying a batch of OSC messages, in arrival order.
+    Each message is an (address, arguments) or an (address, arguments, timestamp) tuple.
+    """
+    return {OSC_MESSAGES_STR: [carb_event_payload_from_osc_message(*msg) for msg in messages]}
+
+def osc_messages_from_carb_event(e: carb.events.IEvent) -> List[Tuple[str, list]]:
+    """
+    Return every OSC message address and arguments carried by a carbonite event payload.
+    Handles both batched payloads and single message payloads.
+    """
+    payload = e.payload.get_dict()
+    messages = payload.get(OSC_MESSAGES_STR)
+    if messages is None:
+        return [(payload[OSC_MESSAGE_ADDRESS_STR], payload[OSC_MESSAGE_ARGUMENTS_STR])]
+    return [(msg[OSC_MESSAGE_ADDRESS_STR], msg[OSC_MESSAGE_ARGUMENTS_STR]) for msg in messages]
+
+def osc_timed_messages_from_carb_event(e: carb.events.IEvent) -> List[Tuple[str, list, float]]:
+    """
+    Return every OSC message address, arguments and receive timestamp carried by a carbonite event payload.
+    Messages pushed without a timestamp are stamped with the current `time.perf_counter()`.
+    """
+    payload = e.payload.get_dict()
+    messages = payload.get(OSC_MESSAGES_STR)
+    if messages is None:
+        messages = [payload]
+    now = time.perf_counter()
+    return [
+        (msg[OSC_MESSAGE_ADDRESS_STR], msg[OSC_MESSAGE_ARGUMENTS_STR], msg.get(OSC_MESSAGE_TIMESTAMP_STR, now))
+        for msg in messages
+    ]
+
+
+class OscValueStore:
+    """
+    The latest arguments received for each OSC address, for consumers that poll values rather than handle events.
+
+    Every address gets a slot on first receipt, out of `capacity` preallocated slots, and each slot holds the latest
+    (arguments, receive timestamp, update count) tuple. Updates replace the tuple of a slot in a single assignment,
+    so they are safe from the receive threads and readers never take a lock: a read is a dictionary lookup
+    and a list index, whatever the number of addresses and readers. Only allocating a slot takes a lock.
+
+    Usage::
+
+        import omni.osc
+
+        store = omni.osc.get_osc_value_store()
+        fader = store.get("/fader/3", default=[0.0])
+    """
+
+    def __init__(self, capacity: int = OSC_VALUE_STORE_DEFAULT_CAPACITY):
+        self.capacity: int = max(1, capacity)
+        # Slot index of each address
+        self.slots: Dict[str, int] = {}
+        # (arguments, timestamp, update count) of each slot, None for the free slots
+        self.entries: List[Optional[Tuple[Union[list, np.ndarray], float, int]]] = [None] * self.capacity
+        self.lock: threading.Lock = threading.Lock()
+        # Number of updates ignored because every slot was allocated
+        self.overflow: int = 0
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def update(self, address: str, args: Union[list, np.ndarray], timestamp: Optional[float] = None) -> None:
+        """
+        Store the latest arguments of an address. Safe to call from the receive threads.
+        """
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        slot = self.slots.get(address)
+        if slot is None:
+            with self.lock:
+                slot = self.slots.get(address)
+                if slot is None:
+                    if len(self.slots) == self.capacity:
+                        self.overflow += 1
+                        return
+                    slot = len(self.slots)
+                    self.entries[slot] = (args, timestamp, 1)
+                    self.slots[address] = slot
+                    return
+        entry = self.entries[slot]
+        # The entry is None if the store was cleared since the slot was looked up
+        self.entries[slot] = (args, timestamp, 1 if entry is None else entry[2] + 1)
+
+    def get(self, address: str, default: Any = None) -> Union[list, np.ndarray, Any]:
+        """
+        Returns the latest arguments of an address, or `default` if no message was received for it
+        """
+        slot = self.slots.get(address)
+        entry = None if slot is None else self.entries[slot]
+        return default if entry is None else entry[0]
+
+    def get_timed(self, address: str) -> Optional[Tuple[Union[list, np.ndarray], float, int]]:
+        """
+        Returns the latest arguments of an address, their receive timestamp (time.perf_counter) and the number
+        of messages received for the address, or None if no message was received for it
+        """
+        slot = self.slots.get(address)
+        if slot is None:
+            return None
+        return self.entries[slot]
+
+    def addresses(self) -> List[str]:
+        """
+        Returns every address received, in order of first receipt
+        """
+        return list(self.slots.keys())
+
+    def clear(self) -> None:
+        """
+        Forget every address
+        """
+        with self.lock:
+            self.slots = {}
+            self.entries = [None] * self.capacity
+            self.overflow = 0
+
+
+_value_stores: Dict[str, OscValueStore] = {}
+
+
+def get_osc_value_store(listener: str = OSC_DEFAULT_LISTENER) -> OscValueStore:
+    """
+    Returns the latest-value store of a listener
+    """
+    store = _value_stores.get(listener)
+    if store is None:
+        store = OscValueStore()
+        _value_stores[listener] = store
+    return store
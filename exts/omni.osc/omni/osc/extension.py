@@ -7,28 +7,65 @@
 # license agreement from NVIDIA CORPORATION is strictly prohibited.
 
 
-from typing import Any, List
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
 
 import carb
 import carb.events
 import carb.profiler
+import numpy as np
 import omni.ext
 import omni.kit.app
-from pythonosc.dispatcher import Dispatcher
 
-from .core import carb_event_payload_from_osc_message, push_to_osc_event_stream
-from .menu import OscMenu
-from .server import DaemonOSCUDPServer
-from .window import OscWindow
+from .batching import OscEventBatcher
+from .codec import OscFastDispatcher
+from .core import (
+    OSC_DEFAULT_LISTENER,
+    OSC_STARTUP_SETTINGS_PATH,
+    OscValueStore,
+    carb_event_payload_from_osc_message,
+    get_osc_value_store,
+    push_to_osc_event_stream,
+    release_osc_event_streams,
+)
+from .filters import OSC_FILTERS_SETTINGS_PATH, OscMessageFilter, filter_rules_from_config
+from .monitor import OscMonitor, get_osc_monitor
+from .scheduler import OSC_SCHEDULER_DEFAULT_MAX_HOLD_MS, OSC_SCHEDULER_DEFAULT_MAX_PENDING, OscBundleScheduler
+from .sender import release_osc_sender
+from .router import get_osc_router
+from .server import (
+    OSC_PROCESS_RING_DEFAULT_SIZE,
+    OSC_SERVER_ENGINE_ASYNCIO,
+    OSC_SERVER_ENGINE_PROCESS,
+    OSC_SERVER_ENGINE_THREAD,
+    OSC_SERVER_TRANSPORT_TCP,
+    OSC_SERVER_TRANSPORT_UDP,
+    OSC_TCP_FRAMING_SLIP,
+    AsyncOSCUDPServer,
+    DaemonOSCUDPServer,
+)
+from .stats import OscStats, get_osc_stats
+
+if TYPE_CHECKING:
+    # The optional engines are only imported when the settings select them
+    from .process_server import OscProcessServer
+    from .tcp_server import OscTCPServer
 
 
 class OmniOscExt(omni.ext.IExt):
     def on_startup(self, ext_id):
+        startup_start = time.perf_counter()
+
         def on_start(host: str, port: int) -> bool:
             return self.server.start(host, port)
 
         def on_stop() -> bool:
-            return self.server.stop()
+            # Do not wait for the server threads on the UI thread
+            self.server.stop_async()
+            return self.server.running()
+
+        def on_rebind(host: str, port: int) -> bool:
+            return self.server.rebind(host, port)
 
         def toggle_window_visible(_arg0, _arg1) -> None:
             """
@@ -36,40 +73,363 @@ class OmniOscExt(omni.ext.IExt):
             """
             self.window.visible = not self.window.visible
 
-        self.server = OmniOscExt.create_server()
-        # The main UI window
-        default_addr = carb.settings.get_settings().get("exts/omni.osc/address")
-        default_port = carb.settings.get_settings().get("exts/omni.osc/port")
-        self.window = OscWindow(
-            on_start=on_start, on_stop=on_stop, default_addr=default_addr, default_port=default_port
+        settings = carb.settings.get_settings()
+        # Optionally deliver all messages received during a frame as a single event
+        self.batcher = None
+        if settings.get("exts/omni.osc/batch"):
+            self.batcher = OscEventBatcher(interval_ms=settings.get("exts/omni.osc/batchIntervalMs") or 0)
+            self.batcher.start()
+        # Release timetagged bundles on the frame nearest their timetag
+        self.scheduler = None
+        if settings.get("exts/omni.osc/scheduleBundles"):
+            self.scheduler = OscBundleScheduler(
+                latency_ms=settings.get("exts/omni.osc/bundleLatencyMs") or 0,
+                max_hold_ms=settings.get("exts/omni.osc/bundleMaxHoldMs") or OSC_SCHEDULER_DEFAULT_MAX_HOLD_MS,
+                max_pending=settings.get("exts/omni.osc/bundleMaxPending") or OSC_SCHEDULER_DEFAULT_MAX_PENDING,
+            )
+            self.scheduler.start()
+        # Collect and periodically publish the receive pipeline statistics
+        self.stats = None
+        if settings.get("exts/omni.osc/collectStats"):
+            self.stats = get_osc_stats()
+            self.stats.start(interval_ms=settings.get("exts/omni.osc/statsIntervalMs") or 1000)
+            get_osc_router().stats = self.stats
+        engine = settings.get("exts/omni.osc/engine") or OSC_SERVER_ENGINE_THREAD
+        workers = settings.get("exts/omni.osc/workers") or 1
+        numpy_arrays = bool(settings.get("exts/omni.osc/numpyArrays"))
+        transport = settings.get("exts/omni.osc/transport") or OSC_SERVER_TRANSPORT_UDP
+        framing = settings.get("exts/omni.osc/tcpFraming") or OSC_TCP_FRAMING_SLIP
+        ring_size = settings.get("exts/omni.osc/processRingSize") or OSC_PROCESS_RING_DEFAULT_SIZE
+        receive_buffer_size = settings.get("exts/omni.osc/receiveBufferSize") or 0
+        # Keep the latest arguments of every address for the consumers that poll values
+        store_values = bool(settings.get("exts/omni.osc/storeValues"))
+        # Rate limit, conflate, deadband and smooth the messages of some addresses before they are pushed
+        filter_rules = filter_rules_from_config(settings.get(OSC_FILTERS_SETTINGS_PATH))
+        self.filters: List[OscMessageFilter] = []
+
+        def create_filter(listener: str) -> Optional[OscMessageFilter]:
+            """
+            Returns a started filter with the rules of a listener, or None if it has no rule
+            """
+            rules = [rule for rule in filter_rules if rule.listener == listener]
+            if not rules:
+                return None
+            message_filter = OscMessageFilter(rules)
+            message_filter.start()
+            self.filters.append(message_filter)
+            return message_filter
+
+        self.server = OmniOscExt.create_server(
+            self.batcher,
+            engine=engine,
+            workers=workers,
+            numpy_arrays=numpy_arrays,
+            scheduler=self.scheduler,
+            stats=self.stats,
+            transport=transport,
+            framing=framing,
+            ring_size=ring_size,
+            receive_buffer_size=receive_buffer_size,
+            value_store=get_osc_value_store() if store_values else None,
+            message_filter=create_filter(OSC_DEFAULT_LISTENER),
+            monitor=get_osc_monitor(),
         )
-        # The editor menu entry that toggles the window visibility
-        self.menu = OscMenu(on_click=toggle_window_visible)
-        # Toggle the editor menu entry when the user closes the window
-        self.window.set_visibility_changed_fn(lambda visible: self.menu.set_item_value(visible))
+
+        def start_listener(config: Dict[str, Any]) -> None:
+            """
+            Start a named listener, which pushes the messages it receives to its own event stream
+            """
+            name = config.get("name")
+            if not name or name in self.listeners or config.get("port") is None:
+                carb.log_warn(f"Ignoring OSC listener without a unique name and a port: {config}")
+                return
+            batcher = None
+            if self.batcher is not None:
+                batcher = OscEventBatcher(interval_ms=self.batcher.interval * 1000.0, listener=name)
+                batcher.start()
+            server = OmniOscExt.create_server(
+                batcher,
+                engine=config.get("engine", engine),
+                workers=config.get("workers", workers),
+                numpy_arrays=numpy_arrays,
+                scheduler=self.scheduler,
+                stats=self.stats,
+                transport=config.get("transport", transport),
+                framing=config.get("tcpFraming", framing),
+                ring_size=config.get("processRingSize", ring_size),
+                receive_buffer_size=config.get("receiveBufferSize", receive_buffer_size),
+                listener=name,
+                multicast_group=config.get("multicastGroup"),
+                value_store=get_osc_value_store(name) if store_values else None,
+                message_filter=create_filter(name),
+            )
+            server.start(config.get("address", "0.0.0.0"), config["port"])
+            self.listeners[name] = (server, batcher)
+            if self.stats is not None:
+                get_osc_router(name).stats = self.stats
+
+        # Named listeners, keyed by name
+        self.listeners: Dict[str, Tuple[Any, Optional[OscEventBatcher]]] = {}
+        for config in settings.get("exts/omni.osc/listeners") or []:
+            start_listener(dict(config))
+        # Bind OSC addresses to USD attributes and mirror USD attributes as OSC messages. Both need USD, which is an
+        # optional dependency, so USD is only imported when bindings, mirrored attributes or the stage layer data
+        # are configured
+        self.bindings = None
+        self.mirror = None
+        self.stage_event_sub = None
+        stage_layer_data = bool(settings.get("exts/omni.osc/stageLayerData"))
+        use_bindings = stage_layer_data or bool(settings.get("exts/omni.osc/bindings"))
+        use_mirror = stage_layer_data or bool(settings.get("exts/omni.osc/mirror/attributes"))
+        if use_bindings or use_mirror:
+            try:
+                import omni.usd
+            except ImportError as e:
+                carb.log_error(f"OSC bindings and mirror disabled, USD is not available: {e}")
+                use_bindings = use_mirror = False
+        if use_bindings:
+            from .binding import get_osc_binding_engine
+
+            # Write the values of the OSC messages to the USD attributes bound to their address
+            self.bindings = get_osc_binding_engine()
+            self.bindings.reload()
+            self.bindings.start()
+        if use_mirror:
+            from .mirror import get_osc_mirror
+
+            # Send the changes of the mirrored USD attributes as OSC messages, once per frame
+            self.mirror = get_osc_mirror()
+            self.mirror.reload()
+            self.mirror.start()
+        if use_bindings or use_mirror:
+
+            def on_stage_event(event: carb.events.IEvent) -> None:
+                if event.type in (int(omni.usd.StageEventType.OPENED), int(omni.usd.StageEventType.CLOSED)):
+                    if self.bindings is not None:
+                        self.bindings.reload()
+                    if self.mirror is not None:
+                        self.mirror.reload()
+
+            self.stage_event_sub = omni.usd.get_context().get_stage_event_stream().create_subscription_to_pop(
+                on_stage_event, name="omni.osc bindings"
+            )
+        # Optionally record all received datagrams to a capture file
+        self.recorder = None
+        capture_path = settings.get("exts/omni.osc/capturePath")
+        if capture_path:
+            from .capture import OscRecorder
+
+            self.recorder = OscRecorder(capture_path)
+            self.recorder.start(self.server.dispatcher)
+
+        def build_ui(_event: carb.events.IEvent) -> None:
+            """
+            Build the window and the menu entry on the first app update, out of the extension startup
+            """
+            self.ui_sub = None
+            ui_start = time.perf_counter()
+            try:
+                from .menu import OscMenu
+                from .window import OscWindow
+            except ImportError as e:
+                carb.log_info(f"OSC window disabled, the UI is not available: {e}")
+                return
+            # The main UI window
+            default_addr = settings.get("exts/omni.osc/address")
+            default_port = settings.get("exts/omni.osc/port")
+            self.window = OscWindow(
+                on_start=on_start,
+                on_stop=on_stop,
+                on_rebind=on_rebind,
+                default_addr=default_addr,
+                default_port=default_port,
+                stats=self.stats,
+                monitor=get_osc_monitor(),
+            )
+            # The editor menu entry that toggles the window visibility
+            self.menu = OscMenu(on_click=toggle_window_visible)
+            # Toggle the editor menu entry when the user closes the window
+            self.window.set_visibility_changed_fn(lambda visible: self.menu.set_item_value(visible))
+            ui_ms = (time.perf_counter() - ui_start) * 1000.0
+            settings.set_float(f"{OSC_STARTUP_SETTINGS_PATH}/uiMs", ui_ms)
+            carb.log_info(f"OSC window built in {ui_ms:.1f} ms")
+
+        # No window in headless apps (e.g. render nodes started with --no-window)
+        self.window = None
+        self.menu = None
+        self.ui_sub = None
+        show_window = settings.get("exts/omni.osc/showWindow") is not False
+        if show_window and settings.get("/app/window/enabled") is not False:
+            update_stream = omni.kit.app.get_app().get_update_event_stream()
+            self.ui_sub = update_stream.create_subscription_to_pop(build_ui, name="omni.osc ui")
+        startup_ms = (time.perf_counter() - startup_start) * 1000.0
+        import_ms = settings.get(f"{OSC_STARTUP_SETTINGS_PATH}/importMs") or 0.0
+        settings.set_float(f"{OSC_STARTUP_SETTINGS_PATH}/startupMs", startup_ms)
+        carb.log_info(f"omni.osc imported in {import_ms:.1f} ms, started in {startup_ms:.1f} ms")
 
     def on_shutdown(self):
+        self.ui_sub = None
+        if self.window is not None:
+            self.window.destroy()
         self.window = None
         self.menu = None
         if self.server is not None:
             self.server.stop()
             self.server = None
+        for name, (server, batcher) in self.listeners.items():
+            server.stop()
+            if batcher is not None:
+                batcher.stop()
+            get_osc_router(name).stats = None
+        self.listeners = {}
+        if self.recorder is not None:
+            self.recorder.stop()
+            self.recorder = None
+        self.stage_event_sub = None
+        if self.bindings is not None:
+            self.bindings.stop()
+            self.bindings.clear()
+            self.bindings = None
+        if self.mirror is not None:
+            self.mirror.stop()
+            self.mirror.clear()
+            self.mirror = None
+        for message_filter in self.filters:
+            message_filter.stop()
+        self.filters = []
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            self.scheduler = None
+        if self.batcher is not None:
+            self.batcher.stop()
+            self.batcher = None
+        if self.stats is not None:
+            self.stats.stop()
+            get_osc_router().stats = None
+            self.stats = None
+        release_osc_event_streams()
+        release_osc_sender()
 
-    def create_server() -> DaemonOSCUDPServer:
+    def create_dispatcher(
+        batcher: Optional[OscEventBatcher] = None,
+        numpy_arrays: bool = False,
+        scheduler: Optional[OscBundleScheduler] = None,
+        stats: Optional[OscStats] = None,
+        listener: str = OSC_DEFAULT_LISTENER,
+        value_store: Optional[OscValueStore] = None,
+        message_filter: Optional[OscMessageFilter] = None,
+        monitor: Optional[OscMonitor] = None,
+    ) -> OscFastDispatcher:
         """
-        Create a server that routes all OSC messages to a carbonite event stream
+        Create a dispatcher that routes all OSC messages to the carbonite event stream of a listener.
+        When a batcher is provided, messages are buffered and pushed by the batcher instead.
+        When numpy_arrays is true, float-only arguments are decoded as numpy arrays.
+        When a scheduler is provided, timetagged bundles are released on the frame nearest their timetag.
+        When stats are provided, the received packets are counted in them.
+        When a value store is provided, it is updated with every message delivered.
+        When a message filter is provided, only the messages it passes on are delivered.
+        When a monitor is provided, every message received is recorded in it, before the filter.
         """
 
+        def deliver(addr: str, args: Any, timestamp: float) -> None:
+            """
+            Deliver a message that passed the filter
+            """
+            if value_store is not None:
+                value_store.update(addr, args, timestamp)
+            if batcher is not None:
+                batcher.add(addr, args, timestamp)
+                return
+            payload = carb_event_payload_from_osc_message(addr, args, timestamp)
+            push_to_osc_event_stream(payload, listener)
+
         @carb.profiler.profile
         def on_osc_msg(addr: str, *args: List[Any]) -> None:
             """
             OSC message handler
             """
             carb.log_verbose(f"OSC message: [{addr}, {args}]")
-            payload = carb_event_payload_from_osc_message(addr, args)
-            push_to_osc_event_stream(payload)
+            if numpy_arrays and len(args) == 1 and isinstance(args[0], np.ndarray):
+                args = args[0]
+            timestamp = time.perf_counter()
+            if monitor is not None:
+                monitor.record(addr, args, timestamp)
+            if message_filter is not None:
+                args = message_filter.process(addr, args, timestamp, deliver)
+                if args is None:
+                    return
+            deliver(addr, args, timestamp)
 
-        # Server
-        dispatcher = Dispatcher()
+        dispatcher = OscFastDispatcher(numpy_arrays=numpy_arrays, scheduler=scheduler, stats=stats)
         dispatcher.set_default_handler(on_osc_msg)
-        return DaemonOSCUDPServer(dispatcher)
+        return dispatcher
+
+    def create_server(
+        batcher: Optional[OscEventBatcher] = None,
+        engine: str = OSC_SERVER_ENGINE_THREAD,
+        workers: int = 1,
+        numpy_arrays: bool = False,
+        scheduler: Optional[OscBundleScheduler] = None,
+        stats: Optional[OscStats] = None,
+        transport: str = OSC_SERVER_TRANSPORT_UDP,
+        framing: str = OSC_TCP_FRAMING_SLIP,
+        listener: str = OSC_DEFAULT_LISTENER,
+        multicast_group: Optional[str] = None,
+        value_store: Optional[OscValueStore] = None,
+        ring_size: int = OSC_PROCESS_RING_DEFAULT_SIZE,
+        receive_buffer_size: int = 0,
+        message_filter: Optional[OscMessageFilter] = None,
+        monitor: Optional[OscMonitor] = None,
+    ) -> Union[DaemonOSCUDPServer, AsyncOSCUDPServer, "OscProcessServer", "OscTCPServer"]:
+        """
+        Create a server that routes all OSC messages to the carbonite event stream of a listener.
+        When a batcher is provided, messages are buffered and pushed by the batcher instead.
+        The engine selects whether messages are received in a daemon thread ("thread"),
+        on Kit's asyncio event loop ("asyncio") or in a separate process ("process"). The "thread" engine can
+        spread the load across several worker threads, each with its own socket. The "process" engine decodes
+        in a receiver process that shares a ring buffer of `ring_size` records with Kit.
+        When numpy_arrays is true, float-only arguments are decoded as numpy arrays.
+        When a scheduler is provided, timetagged bundles are released on the frame nearest their timetag.
+        When stats are provided, the received packets are counted in them.
+        With the "tcp" transport, the server accepts TCP connections whose stream is framed with
+        the given framing ("length" for OSC 1.0, "slip" for OSC 1.1), and ignores the engine.
+        When a multicast group is provided, the UDP sockets join it.
+        `receive_buffer_size` sets the kernel receive buffer of the UDP sockets, 0 keeps the OS default.
+        When a value store is provided, it is updated with every message delivered.
+        When a message filter is provided, only the messages it passes on are delivered.
+        When a monitor is provided, every message received is recorded in it, before the filter.
+        """
+        dispatcher = OmniOscExt.create_dispatcher(
+            batcher,
+            numpy_arrays=numpy_arrays,
+            scheduler=scheduler,
+            stats=stats,
+            listener=listener,
+            value_store=value_store,
+            message_filter=message_filter,
+            monitor=monitor,
+        )
+        if transport == OSC_SERVER_TRANSPORT_TCP:
+            from .tcp_server import OscTCPServer
+
+            return OscTCPServer(dispatcher, framing=framing)
+        if transport != OSC_SERVER_TRANSPORT_UDP:
+            carb.log_warn(f"Unknown OSC transport '{transport}', falling back to '{OSC_SERVER_TRANSPORT_UDP}'")
+        if engine == OSC_SERVER_ENGINE_ASYNCIO:
+            return AsyncOSCUDPServer(
+                dispatcher, multicast_group=multicast_group, receive_buffer_size=receive_buffer_size
+            )
+        if engine == OSC_SERVER_ENGINE_PROCESS:
+            from .process_server import OscProcessServer
+
+            return OscProcessServer(
+                dispatcher,
+                ring_size=ring_size,
+                multicast_group=multicast_group,
+                receive_buffer_size=receive_buffer_size,
+            )
+        if engine != OSC_SERVER_ENGINE_THREAD:
+            carb.log_warn(f"Unknown OSC server engine '{engine}', falling back to '{OSC_SERVER_ENGINE_THREAD}'")
+        return DaemonOSCUDPServer(
+            dispatcher, workers=workers, multicast_group=multicast_group, receive_buffer_size=receive_buffer_size
+        )
@@ -0,0 +1,300 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# NVIDIA CORPORATION and its licensors retain all intellectual property
+# and proprietary rights in and to this software, related documentation
+# and any modifications thereto.  Any use, reproduction, disclosure or
+# distribution of this software and related documentation without an express
+# license agreement from NVIDIA CORPORATION is strictly prohibited.
+
+import math
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import carb
+import carb.events
+import carb.profiler
+import numpy as np
+import omni.kit.app
+
+from .core import OSC_DEFAULT_LISTENER
+
+# Smooth the arguments with an exponential moving average
+OSC_SMOOTHING_EMA = "ema"
+# Smooth the arguments with a one-euro filter, which smooths more at low speeds and lags less at high speeds
+OSC_SMOOTHING_ONE_EURO = "one_euro"
+OSC_SMOOTHINGS = (OSC_SMOOTHING_EMA, OSC_SMOOTHING_ONE_EURO)
+# The settings path of the filter rules loaded by the extension
+OSC_FILTERS_SETTINGS_PATH = "exts/omni.osc/filters"
+# Upper bound on the number of distinct addresses whose rule is memoized
+_MAX_CACHED_ADDRESSES = 4096
+
+# Invoked with the address, the arguments and the receive timestamp of a message that passes the filter
+OscFilterEmitCallback = Callable[[str, Any, float], None]
+
+
+class OscFilterRule:
+    """
+    The filtering of the messages whose address matches a regex, applied in this order:
+
+    - `smoothing`: "ema" blends each message into the previous output with weight `alpha`. "one_euro" is a
+      one-euro filter with a `min_cutoff` frequency in Hz, a `beta` speed coefficient and a `d_cutoff` frequency
+      for the speed estimate. Every argument is smoothed independently.
+    - `deadband`: messages whose arguments all changed by less than `deadband` since the last message passed on
+      are suppressed.
+    - `max_rate`: at most `max_rate` messages per second are passed on for each address.
+    - `conflate`: the messages over the rate are not dropped, the latest one is held and passed on once the rate
+      allows it. Without `max_rate`, the latest message of each address is passed on once per frame.
+
+    Smoothing and deadband only apply to messages whose arguments are all numeric.
+    Only the messages received by `listener` are considered.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        max_rate: float = 0.0,
+        conflate: bool = False,
+        deadband: float = 0.0,
+        smoothing: Optional[str] = None,
+        alpha: float = 0.5,
+        min_cutoff: float = 1.0,
+        beta: float = 0.0,
+        d_cutoff: float = 1.0,
+        listener: str = OSC_DEFAULT_LISTENER,
+    ):
+        if smoothing and smoothing not in OSC_SMOOTHINGS:
+            raise ValueError(f"Unknown OSC smoothing '{smoothing}', expected one of {OSC_SMOOTHINGS}")
+        self.address: str = address
+        self.regex: re.Pattern = re.compile(address)
+        self.interval: float = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.conflate: bool = conflate
+        self.deadband: float = deadband
+        self.smoothing: Optional[str] = smoothing or None
+        self.alpha: float = alpha
+        self.min_cutoff: float = min_cutoff
+        self.beta: float = beta
+        self.d_cutoff: float = d_cutoff
+        self.listener: str = listener
+
+    @staticmethod
+    def from_dict(config: Dict[str, Any]) -> "OscFilterRule":
+        """
+        Create a rule from a dictionary with the "address" key, and the optional "maxRate", "conflate", "deadband",
+        "smoothing", "alpha", "minCutoff", "beta", "dCutoff" and "listener" keys
+
+        Raises:
+            KeyError if the address is missing
+            ValueError if the smoothing is unknown
+            re.error if the address is not a valid regex
+        """
+        return OscFilterRule(
+            config["address"],
+            max_rate=float(config.get("maxRate", 0.0)),
+            conflate=bool(config.get("conflate", False)),
+            deadband=float(config.get("deadband", 0.0)),
+            smoothing=config.get("smoothing"),
+            alpha=float(config.get("alpha", 0.5)),
+            min_cutoff=float(config.get("minCutoff", 1.0)),
+            beta=float(config.get("beta", 0.0)),
+            d_cutoff=float(config.get("dCutoff", 1.0)),
+            listener=config.get("listener", OSC_DEFAULT_LISTENER),
+        )
+
+
+def filter_rules_from_config(config: Union[None, Iterable[Dict[str, Any]]]) -> List[OscFilterRule]:
+    """
+    Returns the rules described by a list of rule dictionaries. Invalid entries are skipped with a warning.
+    """
+    rules = []
+    for entry in config or []:
+        try:
+            rules.append(OscFilterRule.from_dict(dict(entry)))
+        except Exception as e:
+            carb.log_warn(f"Ignoring invalid OSC filter {entry}: {e}")
+    return rules
+
+
+def _smoothing_factor(elapsed: float, cutoff: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+    """The weight of a new sample in a low-pass filter of the cutoff frequency"""
+    tau = 1.0 / (2.0 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / elapsed)
+
+
+class _AddressState:
+    """The filter state of an address"""
+
+    __slots__ = ("rule", "value", "speed", "time", "emitted", "emit_time", "held")
+
+    def __init__(self, rule: OscFilterRule):
+        self.rule: OscFilterRule = rule
+        # The smoothed arguments, their speed and the time of the last sample
+        self.value: Optional[np.ndarray] = None
+        self.speed: Optional[np.ndarray] = None
+        self.time: float = 0.0
+        # The numeric arguments of the last message passed on, and when it was passed on
+        self.emitted: Optional[np.ndarray] = None
+        self.emit_time: float = -math.inf
+        # The latest message over the rate (arguments, timestamp, emit callback), passed on once the rate allows it
+        self.held: Optional[Tuple[Any, float, OscFilterEmitCallback]] = None
+
+
+class OscMessageFilter:
+    """
+    Rate limit, conflate, deadband and smooth OSC messages before they are pushed to the OSC event stream.
+
+    `process` is called on the receiving thread with every message and returns the arguments to pass on,
+    or None when the message is suppressed or held. Held messages are passed on from the main thread by `flush`,
+    which runs on every app update once the filter is started. The first matching rule applies to an address,
+    the messages of other addresses are passed on unchanged.
+
+    Usage::
+
+        import omni.osc
+
+        message_filter = omni.osc.OscMessageFilter(
+            [omni.osc.OscFilterRule("/sensor/.*", max_rate=60, conflate=True, smoothing="one_euro")]
+        )
+        message_filter.start()
+        server = omni.osc.OmniOscExt.create_server(message_filter=message_filter)
+    """
+
+    def __init__(self, rules: Iterable[OscFilterRule] = ()):
+        self.rules: List[OscFilterRule] = list(rules)
+        self.lock: threading.Lock = threading.Lock()
+        # The rule of each address, None for the addresses that no rule matches
+        self.cache: Dict[str, Optional[OscFilterRule]] = {}
+        self.states: Dict[str, _AddressState] = {}
+        self.sub: carb.events.ISubscription = None
+        # The number of messages dropped by the deadband or the rate, excluding the held ones
+        self.suppressed: int = 0
+
+    def running(self) -> bool:
+        """
+        Returns true if the held messages are passed on on every app update
+        """
+        return self.sub is not None
+
+    def start(self) -> bool:
+        """
+        Start passing on the held messages on every app update.
+        Does nothing if the filter is already running.
+        """
+        if not self.running():
+            update_stream = omni.kit.app.get_app().get_update_event_stream()
+            self.sub = update_stream.create_subscription_to_pop(self.on_update, name="omni.osc filter")
+        return self.running()
+
+    def stop(self) -> bool:
+        """
+        Stop passing on the held messages on app updates. Any held messages are passed on immediately.
+        """
+        if self.running():
+            self.sub.unsubscribe()
+            self.sub = None
+            self.flush(force=True)
+        return self.running()
+
+    def rule(self, address: str) -> Optional[OscFilterRule]:
+        """
+        Returns the first rule whose regex matches the address, None if no rule matches
+        """
+        try:
+            return self.cache[address]
+        except KeyError:
+            pass
+        rule = next((rule for rule in self.rules if rule.regex.match(address)), None)
+        if len(self.cache) >= _MAX_CACHED_ADDRESSES:
+            self.cache.clear()
+        self.cache[address] = rule
+        return rule
+
+    @carb.profiler.profile
+    def process(self, address: str, args: Any, timestamp: float, emit: OscFilterEmitCallback) -> Any:
+        """
+        Filter a message, returns the arguments to pass on now or None.
+        When the message is held, `emit` is called with it once the rate allows it.
+        """
+        rule = self.rule(address)
+        if rule is None:
+            return args
+        with self.lock:
+            state = self.states.get(address)
+            if state is None:
+                state = _AddressState(rule)
+                self.states[address] = state
+            values = None
+            if rule.smoothing or rule.deadband > 0:
+                values = np.asarray(args)
+                if values.ndim != 1 or values.dtype.kind not in "biuf":
+                    values = None
+            if values is not None:
+                if rule.smoothing:
+                    values = self._smooth(state, values.astype(np.float64), timestamp)
+                    args = values.astype(args.dtype) if isinstance(args, np.ndarray) else values.tolist()
+                if rule.deadband > 0 and state.emitted is not None and state.emitted.shape == values.shape:
+                    if np.all(np.abs(values - state.emitted) < rule.deadband):
+                        self.suppressed += 1
+                        return None
+            if not rule.conflate and timestamp - state.emit_time < rule.interval:
+                self.suppressed += 1
+                return None
+            if rule.conflate and (not rule.interval or timestamp - state.emit_time < rule.interval):
+                state.held = (args, timestamp, emit)
+                return None
+            state.emitted = values
+            state.emit_time = timestamp
+            state.held = None
+            return args
+
+    def _smooth(self, state: _AddressState, values: np.ndarray, timestamp: float) -> np.ndarray:
+        """Returns the smoothed values of a sample, and updates the filter state"""
+        rule = state.rule
+        if state.value is None or state.value.shape != values.shape:
+            # First sample, or the number of arguments changed: restart the filter from this sample
+            state.value = values
+            state.speed = np.zeros_like(values)
+            state.time = timestamp
+            return state.value
+        elapsed = timestamp - state.time
+        if elapsed <= 0:
+            return state.value
+        if rule.smoothing == OSC_SMOOTHING_EMA:
+            state.value = rule.alpha * values + (1.0 - rule.alpha) * state.value
+        else:
+            speed = (values - state.value) / elapsed
+            d_factor = _smoothing_factor(elapsed, rule.d_cutoff)
+            state.speed = d_factor * speed + (1.0 - d_factor) * state.speed
+            factor = _smoothing_factor(elapsed, rule.min_cutoff + rule.beta * np.abs(state.speed))
+            state.value = factor * values + (1.0 - factor) * state.value
+        state.time = timestamp
+        return state.value
+
+    @carb.profiler.profile
+    def flush(self, force: bool = False) -> int:
+        """
+        Pass on the held messages whose rate allows it, or every held message when `force` is true.
+        Returns the number of messages passed on.
+        """
+        now = time.perf_counter()
+        ready = []
+        with self.lock:
+            for address, state in self.states.items():
+                if state.held is None:
+                    continue
+                if force or now - state.emit_time >= state.rule.interval:
+                    args, timestamp, emit = state.held
+                    state.held = None
+                    state.emit_time = now
+                    if state.rule.deadband > 0:
+                        values = np.asarray(args)
+                        if values.ndim == 1 and values.dtype.kind in "biuf":
+                            state.emitted = values.astype(np.float64)
+                    ready.append((emit, address, args, timestamp))
+        for emit, address, args, timestamp in ready:
+            emit(address, args, timestamp)
+        return len(ready)
+
+    def on_update(self, _event: carb.events.IEvent) -> None:
+        self.flush()
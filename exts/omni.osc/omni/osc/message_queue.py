@@ -0,0 +1,101 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# NVIDIA CORPORATION and its licensors retain all intellectual property
+# and proprietary rights in and to this software, related documentation
+# and any modifications thereto.  Any use, reproduction, disclosure or
+# distribution of this software and related documentation without an express
+# license agreement from NVIDIA CORPORATION is strictly prohibited.
+
+from typing import Dict, List, Optional, Tuple
+
+from .stats import get_osc_stats
+
+# Only keep the most recent message
+OSC_QUEUE_POLICY_LATEST = "latest"
+# Keep messages in arrival order, drop the oldest message when full
+OSC_QUEUE_POLICY_FIFO = "fifo"
+# Keep the most recent message per address in order of first arrival, drop the oldest address when full
+OSC_QUEUE_POLICY_CONFLATE = "conflate"
+OSC_QUEUE_POLICIES = (OSC_QUEUE_POLICY_LATEST, OSC_QUEUE_POLICY_FIFO, OSC_QUEUE_POLICY_CONFLATE)
+
+
+class OscMessageQueue:
+    """
+    A bounded ring buffer of OSC messages with an explicit overflow policy.
+
+    The slots are allocated once, pushing and popping messages never allocates.
+    Every message that is overwritten or evicted before being popped is counted in `dropped`.
+    """
+
+    def __init__(self, capacity: int = 1, policy: str = OSC_QUEUE_POLICY_LATEST):
+        if policy not in OSC_QUEUE_POLICIES:
+            raise ValueError(f"Unknown OSC queue policy '{policy}', expected one of {OSC_QUEUE_POLICIES}")
+        self.policy: str = policy
+        self.capacity: int = 1 if policy == OSC_QUEUE_POLICY_LATEST else max(1, capacity)
+        self.addresses: List[Optional[str]] = [None] * self.capacity
+        self.arguments: List[Optional[list]] = [None] * self.capacity
+        # Index of the oldest message
+        self.head: int = 0
+        # Number of pending messages
+        self.count: int = 0
+        # Number of messages dropped since the queue was created
+        self.dropped: int = 0
+        # The highest number of pending messages since the queue was created
+        self.high_water: int = 0
+        # Slot index of each pending address, only used by the conflate policy
+        self.slots: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def push(self, address: str, args: list) -> None:
+        """
+        Queue a message, applying the overflow policy when the queue is full
+        """
+        if self.policy == OSC_QUEUE_POLICY_CONFLATE:
+            slot = self.slots.get(address)
+            if slot is not None:
+                self.arguments[slot] = args
+                self.dropped += 1
+                return
+        if self.count == self.capacity:
+            self._drop_oldest()
+        slot = (self.head + self.count) % self.capacity
+        self.addresses[slot] = address
+        self.arguments[slot] = args
+        self.count += 1
+        if self.policy == OSC_QUEUE_POLICY_CONFLATE:
+            self.slots[address] = slot
+        if self.count > self.high_water:
+            self.high_water = self.count
+            get_osc_stats().note_queue_depth(self.count)
+
+    def pop(self) -> Optional[Tuple[str, list]]:
+        """
+        Pop the oldest message, or None if the queue is empty
+        """
+        if self.count == 0:
+            return None
+        slot = self.head
+        message = (self.addresses[slot], self.arguments[slot])
+        self._release(slot)
+        return message
+
+    def clear(self) -> None:
+        """
+        Discard every pending message without counting them as dropped
+        """
+        while self.count:
+            self._release(self.head)
+
+    def _drop_oldest(self) -> None:
+        self._release(self.head)
+        self.dropped += 1
+
+    def _release(self, slot: int) -> None:
+        if self.policy == OSC_QUEUE_POLICY_CONFLATE:
+            del self.slots[self.addresses[slot]]
+        self.addresses[slot] = None
+        self.arguments[slot] = None
+        self.head = (self.head + 1) % self.capacity
+        self.count -= 1
@@ -0,0 +1,301 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# NVIDIA CORPORATION and its licensors retain all intellectual property
+# and proprietary rights in and to this software, related documentation
+# and any modifications thereto.  Any use, reproduction, disclosure or
+# distribution of this software and related documentation without an express
+# license agreement from NVIDIA CORPORATION is strictly prohibited.
+
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+
+import carb
+import carb.events
+import carb.profiler
+import carb.settings
+import numpy as np
+import omni.kit.app
+import omni.usd
+from pxr import Gf, Sdf, Tf, Usd, UsdGeom
+
+from .binding import config_entries
+from .sender import OscSender, get_osc_sender
+
+# The key of the mirrored attributes in the custom layer data of a stage root layer
+OSC_MIRROR_LAYER_DATA_KEY = "omni.osc:mirror"
+# The settings path of the mirror, with the default "host" and "port" and the mirrored "attributes"
+OSC_MIRROR_SETTINGS_PATH = "exts/omni.osc/mirror"
+# The address suffix of a mirrored world transform
+_TRANSFORM_SUFFIX = "transform"
+
+
+def _osc_args(value: Any) -> list:
+    """Returns the OSC arguments of an attribute value: scalars as is, vectors, matrices and arrays flattened"""
+    if value is None:
+        return []
+    if isinstance(value, (bool, int, float, str)):
+        return [value]
+    if isinstance(value, (Gf.Quatd, Gf.Quatf, Gf.Quath)):
+        return [value.GetReal(), *value.GetImaginary()]
+    try:
+        return np.asarray(value, dtype=np.float64).ravel().tolist()
+    except (TypeError, ValueError):
+        return [str(value)]
+
+
+class OscMirrorEntry:
+    """
+    Sends the value of a prim attribute to host:port whenever it changes.
+
+    When `attribute` is None, the world transform of the prim is sent as the 16 values of its row-major matrix.
+    The address defaults to the prim path followed by the attribute name, or by "transform".
+    """
+
+    def __init__(
+        self,
+        prim_path: str,
+        attribute: Optional[str],
+        host: str,
+        port: int,
+        address: Optional[str] = None,
+    ):
+        self.prim_path: Sdf.Path = Sdf.Path(prim_path)
+        self.attribute: Optional[str] = attribute
+        self.path: Sdf.Path = self.prim_path.AppendProperty(attribute) if attribute else self.prim_path
+        self.host: str = host
+        self.port: int = port
+        self.address: str = address or f"{prim_path.rstrip('/')}/{attribute or _TRANSFORM_SUFFIX}"
+
+    @staticmethod
+    def from_dict(config: Dict[str, Any], host: Optional[str] = None, port: Optional[int] = None) -> "OscMirrorEntry":
+        """
+        Create an entry from a dictionary with the "prim" key, and the optional "attribute", "address", "host"
+        and "port" keys. The host and port default to the ones provided.
+
+        Raises:
+            KeyError if the prim is missing
+            ValueError if there is no host or port
+        """
+        host = config.get("host", host)
+        port = config.get("port", port)
+        if not host or port is None:
+            raise ValueError("no destination host and port")
+        return OscMirrorEntry(
+            config["prim"], config.get("attribute") or None, host, int(port), address=config.get("address")
+        )
+
+    def read(self, stage: Usd.Stage) -> Optional[list]:
+        """
+        Returns the OSC arguments of the current value, None if the prim or the attribute does not exist
+        """
+        if self.attribute is None:
+            prim = stage.GetPrimAtPath(self.prim_path)
+            if not prim or not prim.IsA(UsdGeom.Xformable):
+                return None
+            matrix = UsdGeom.Xformable(prim).ComputeLocalToWorldTransform(Usd.TimeCode.Default())
+            return _osc_args(matrix)
+        attribute = stage.GetAttributeAtPath(self.path)
+        if not attribute:
+            return None
+        return _osc_args(attribute.Get())
+
+
+def mirror_entries_from_config(
+    config: Union[None, Iterable, Dict[str, Any]], host: Optional[str] = None, port: Optional[int] = None
+) -> List[OscMirrorEntry]:
+    """
+    Returns the entries described by a list of entry dictionaries, or by a dictionary of entry dictionaries keyed
+    by name. Invalid entries are skipped with a warning.
+    """
+    entries = []
+    for entry in config_entries(config):
+        try:
+            entries.append(OscMirrorEntry.from_dict(dict(entry), host, port))
+        except Exception as e:
+            carb.log_warn(f"Ignoring invalid OSC mirror entry {entry}: {e}")
+    return entries
+
+
+class OscStageMirror:
+    """
+    Send the values of USD attributes and prim transforms as OSC messages when they change.
+
+    The mirror listens to the `Usd.Notice.ObjectsChanged` notices of the stage and only marks the affected entries
+    as dirty. Once per frame, the dirty entries are read, the values equal to the last value sent are skipped, and
+    the others are queued on the OSC sender, which packs them into bundles that fit in a datagram and sends them
+    from its background thread. Every entry is sent once after loading, so receivers start with the current state.
+
+    Values are read at the default time code, time samples played by the timeline are not mirrored.
+
+    Usage::
+
+        import omni.osc
+
+        mirror = omni.osc.OscStageMirror()
+        mirror.load([{"prim": "/World/Light", "attribute": "inputs:intensity", "host": "192.168.0.2", "port": 9000}])
+        mirror.start()
+    """
+
+    def __init__(self, usd_context_name: str = "", sender: Optional[OscSender] = None):
+        self.usd_context_name: str = usd_context_name
+        # The sender of the messages, instead of the shared sender
+        self.sender: Optional[OscSender] = sender
+        self.entries: List[OscMirrorEntry] = []
+        # The indices of the attribute entries, keyed by attribute path
+        self.attribute_entries: Dict[Sdf.Path, List[int]] = {}
+        # The indices of the transform entries
+        self.transform_entries: List[int] = []
+        # The entries to read on the next frame
+        self.dirty: Set[int] = set()
+        # The last arguments sent for each entry
+        self.sent: Dict[int, list] = {}
+        self.notice: Optional[Tf.Notice.Listener] = None
+        self.sub: carb.events.ISubscription = None
+
+    def running(self) -> bool:
+        """
+        Returns true if the mirror sends the changed values on every app update
+        """
+        return self.sub is not None
+
+    def start(self) -> bool:
+        """
+        Start listening to the stage changes and sending the changed values on every app update.
+        Does nothing if the mirror is already running.
+        """
+        if not self.running():
+            self._listen()
+            update_stream = omni.kit.app.get_app().get_update_event_stream()
+            self.sub = update_stream.create_subscription_to_pop(self.on_update, name="omni.osc mirror")
+        return self.running()
+
+    def stop(self) -> bool:
+        """
+        Stop listening to the stage changes and sending values, the entries stay loaded
+        """
+        if self.running():
+            self.sub.unsubscribe()
+            self.sub = None
+        self._revoke()
+        return self.running()
+
+    def load(
+        self, config: Union[None, Iterable, Dict[str, Any]], host: Optional[str] = None, port: Optional[int] = None
+    ) -> int:
+        """
+        Replace the entries with the ones described by `config` (see `mirror_entries_from_config`), whose host and
+        port default to the ones provided. Returns the number of entries loaded.
+        """
+        self.clear()
+        self.entries = mirror_entries_from_config(config, host, port)
+        for index, entry in enumerate(self.entries):
+            if entry.attribute is None:
+                self.transform_entries.append(index)
+            else:
+                self.attribute_entries.setdefault(entry.path, []).append(index)
+        self.dirty = set(range(len(self.entries)))
+        if self.running():
+            self._listen()
+        return len(self.entries)
+
+    def reload(self, settings_path: str = OSC_MIRROR_SETTINGS_PATH) -> int:
+        """
+        Replace the entries with the "attributes" stored in the settings at `settings_path`, followed by the ones
+        stored in the custom layer data of the stage root layer under the "omni.osc:mirror" key. The entries without
+        a host and port use the "host" and "port" stored in the settings. Returns the number of entries loaded.
+        """
+        settings = carb.settings.get_settings()
+        config = config_entries(settings.get(f"{settings_path}/attributes"))
+        stage = self._stage()
+        if stage is not None:
+            config += config_entries(stage.GetRootLayer().customLayerData.get(OSC_MIRROR_LAYER_DATA_KEY))
+        return self.load(config, settings.get(f"{settings_path}/host"), settings.get(f"{settings_path}/port"))
+
+    def clear(self) -> None:
+        """
+        Remove every entry
+        """
+        self.entries = []
+        self.attribute_entries = {}
+        self.transform_entries = []
+        self.dirty = set()
+        self.sent = {}
+
+    def _stage(self) -> Optional[Usd.Stage]:
+        return omni.usd.get_context(self.usd_context_name).get_stage()
+
+    def _listen(self) -> None:
+        """Listen to the changes of the current stage"""
+        self._revoke()
+        stage = self._stage()
+        if stage is not None and self.entries:
+            self.notice = Tf.Notice.Register(Usd.Notice.ObjectsChanged, self.on_objects_changed, stage)
+
+    def _revoke(self) -> None:
+        if self.notice is not None:
+            self.notice.Revoke()
+            self.notice = None
+
+    def on_objects_changed(self, notice: Usd.Notice.ObjectsChanged, _sender: Usd.Stage) -> None:
+        """Mark the entries affected by a stage change as dirty, they are read on the next frame"""
+        resynced = notice.GetResyncedPaths()
+        for path in resynced:
+            # A resynced prim invalidates every entry below it
+            self.dirty.update(
+                index for index, entry in enumerate(self.entries) if entry.prim_path.HasPrefix(path.GetPrimPath())
+            )
+        for path in notice.GetChangedInfoOnlyPaths():
+            indices = self.attribute_entries.get(path)
+            if indices is not None:
+                self.dirty.update(indices)
+            if self.transform_entries:
+                # Any change to the prim or to one of its ancestors may move it
+                prim_path = path.GetPrimPath()
+                self.dirty.update(
+                    index for index in self.transform_entries if self.entries[index].prim_path.HasPrefix(prim_path)
+                )
+
+    @carb.profiler.profile
+    def send_changes(self) -> int:
+        """
+        Send the values of the dirty entries that changed since they were last sent, returns the number of messages sent
+        """
+        if not self.dirty:
+            return 0
+        stage = self._stage()
+        if stage is None:
+            return 0
+        dirty, self.dirty = self.dirty, set()
+        sender = self.sender if self.sender is not None else get_osc_sender()
+        sent = 0
+        for index in sorted(dirty):
+            entry = self.entries[index]
+            args = entry.read(stage)
+            if args is None or args == self.sent.get(index):
+                continue
+            try:
+                sender.send(entry.host, entry.port, entry.address, args)
+            except Exception as e:
+                carb.log_warn(f"OSC mirror cannot send {entry.path} to '{entry.address}': {e}")
+                continue
+            self.sent[index] = args
+            sent += 1
+        if sent:
+            # Hand the messages to the sender thread this frame
+            sender.flush()
+        return sent
+
+    def on_update(self, _event: carb.events.IEvent) -> None:
+        self.send_changes()
+
+
+_mirror: Optional[OscStageMirror] = None
+
+
+def get_osc_mirror() -> OscStageMirror:
+    """
+    Returns the stage mirror of the extension
+    """
+    global _mirror
+    if _mirror is None:
+        _mirror = OscStageMirror()
+    return _mirror
@@ -0,0 +1,177 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# NVIDIA CORPORATION and its licensors retain all intellectual property
+# and proprietary rights in and to this software, related documentation
+# and any modifications thereto.  Any use, reproduction, disclosure or
+# distribution of this software and related documentation without an express
+# license agreement from NVIDIA CORPORATION is strictly prohibited.
+
+import itertools
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import carb.profiler
+
+# The default number of messages kept by the monitor between two updates
+OSC_MONITOR_DEFAULT_CAPACITY = 8192
+# The default number of addresses aggregated by the monitor
+OSC_MONITOR_DEFAULT_MAX_ADDRESSES = 1024
+
+
+class OscMonitorAddress:
+    """
+    The messages of an address seen by the monitor
+    """
+
+    __slots__ = ("args", "timestamp", "count", "rate", "window_count")
+
+    def __init__(self):
+        # The arguments and the receive timestamp of the latest message
+        self.args: Any = None
+        self.timestamp: float = 0.0
+        # The number of messages, and the messages per second over the last update interval
+        self.count: int = 0
+        self.rate: float = 0.0
+        # The number of messages since the last update
+        self.window_count: int = 0
+
+
+class OscMonitor:
+    """
+    Watch the live OSC traffic, aggregated per address, for debugging.
+
+    `record` is called on the receive threads with every message and stores it into a ring buffer of `capacity`
+    preallocated slots, in a single list assignment and without a lock. While the monitor is paused, which it is
+    until `resume` is called, `record` returns right away. `update` is called from the main thread, at the pace
+    the traffic is displayed, and aggregates the messages recorded since the previous update into the latest value,
+    the message count and the rate of each address. Memory is bounded by `capacity` messages and `max_addresses`
+    addresses: messages overwritten before an update are counted in `overwritten`, and the messages of the addresses
+    over the limit in `untracked`.
+
+    Usage::
+
+        import omni.osc
+
+        monitor = omni.osc.get_osc_monitor()
+        monitor.resume()
+        # ... a few frames later
+        monitor.update()
+        for address, state in monitor.addresses("/fader"):
+            print(f"{address}: {state.args} ({state.rate:.0f}/s)")
+    """
+
+    def __init__(
+        self, capacity: int = OSC_MONITOR_DEFAULT_CAPACITY, max_addresses: int = OSC_MONITOR_DEFAULT_MAX_ADDRESSES
+    ):
+        self.capacity: int = max(1, capacity)
+        self.max_addresses: int = max(1, max_addresses)
+        # (address, arguments, timestamp) of the recorded messages, indexed by record index modulo the capacity
+        self.records: List[Optional[Tuple[str, Any, float]]] = [None] * self.capacity
+        # Hands out record indices, next() on a count is atomic so several receive threads can record
+        self.counter: itertools.count = itertools.count()
+        # One past the index of the latest record, and of the latest record aggregated
+        self.written: int = 0
+        self.read_index: int = 0
+        self.states: Dict[str, OscMonitorAddress] = {}
+        self.update_time: float = time.perf_counter()
+        self.paused: bool = True
+        # The number of messages overwritten before they were aggregated
+        self.overwritten: int = 0
+        # The number of messages of the addresses over `max_addresses`
+        self.untracked: int = 0
+
+    def pause(self) -> None:
+        """
+        Stop recording messages
+        """
+        self.paused = True
+
+    def resume(self) -> None:
+        """
+        Start recording messages, the messages received while paused are not shown
+        """
+        if self.paused:
+            self.read_index = self.written
+            self.update_time = time.perf_counter()
+            self.paused = False
+
+    def clear(self) -> None:
+        """
+        Forget the addresses and the counters
+        """
+        self.read_index = self.written
+        self.states = {}
+        self.overwritten = 0
+        self.untracked = 0
+
+    def record(self, address: str, args: Any, timestamp: float) -> None:
+        """
+        Record a message. Safe to call from the receive threads.
+        """
+        if self.paused:
+            return
+        index = next(self.counter)
+        self.records[index % self.capacity] = (address, args, timestamp)
+        # With several receive threads, a record may be published after a later one, `update` reads up to the latest
+        self.written = max(self.written, index + 1)
+
+    @carb.profiler.profile
+    def update(self) -> int:
+        """
+        Aggregate the messages recorded since the previous update, returns the number of messages aggregated
+        """
+        now = time.perf_counter()
+        elapsed = now - self.update_time
+        self.update_time = now
+        written = self.written
+        count = written - self.read_index
+        if count > self.capacity:
+            self.overwritten += count - self.capacity
+            self.read_index = written - self.capacity
+            count = self.capacity
+        records = self.records
+        capacity = self.capacity
+        states = self.states
+        for index in range(self.read_index, written):
+            # A slot may already hold a newer message if the receive threads lapped the ring buffer during the update
+            record = records[index % capacity]
+            if record is None:
+                continue
+            address, args, timestamp = record
+            state = states.get(address)
+            if state is None:
+                if len(states) >= self.max_addresses:
+                    self.untracked += 1
+                    continue
+                state = OscMonitorAddress()
+                states[address] = state
+            state.args = args
+            state.timestamp = timestamp
+            state.count += 1
+            state.window_count += 1
+        self.read_index = written
+        for state in states.values():
+            state.rate = state.window_count / elapsed if elapsed > 0 else 0.0
+            state.window_count = 0
+        return count
+
+    def addresses(self, pattern: str = "") -> List[Tuple[str, OscMonitorAddress]]:
+        """
+        Returns the addresses that contain `pattern` and their state, sorted by address
+        """
+        return sorted(
+            ((address, state) for address, state in self.states.items() if pattern in address), key=lambda item: item[0]
+        )
+
+
+_monitor: Optional[OscMonitor] = None
+
+
+def get_osc_monitor() -> OscMonitor:
+    """
+    Returns the traffic monitor of the extension server, shown in the OSC window
+    """
+    global _monitor
+    if _monitor is None:
+        _monitor = OscMonitor()
+    return _monitor
@@ -11,15 +11,15 @@ This is the implementation of the OGN node defined in OgnOnOscEvent.ogn
 This implementation is inspired by the OgnOnCustomEvent node
 See https://gitlab-master.nvidia.com/omniverse/kit/-/blob/master/kit/source/extensions/omni.graph.action/nodes/OgnOnCustomEvent.py # noqa E501
 """
-import re
-from typing import Any, List, Union
+from typing import Any, List, Tuple, Union
 
 import carb
-import carb.events
 import carb.profiler
+import numpy as np
 import omni.graph.core as og
 import omni.osc
 from omni.osc.core import OSC_MESSAGE_ADDRESS_STR, OSC_MESSAGE_ARGUMENTS_STR
+from omni.osc.message_queue import OSC_QUEUE_POLICY_LATEST, OscMessageQueue
 
 from .. import OgnOnOscEventDatabase
 
@@ -29,70 +29,103 @@ class OgnOnOscEventInternalState:
 
     def __init__(self):
         """Instantiate the per-node state information."""
-        # This subscription object controls the lifetime of our callback, it will be
+        # This router subscription object controls the lifetime of our callback, it will be
         # cleaned up automatically when our node is destroyed
         self.sub = None
-        # Set when the callback has triggered
-        self.is_set = False
-        # The last event received
-        self.event: Union[None, carb.events.IEvent] = None
+        # The matching OSC messages received since they were last popped
+        self.queue = OscMessageQueue()
         # The node instance handle
         self.node = None
         # The regex used to match the OSC address path
         self.osc_path_regex = ""
-        # The compiled regex pattern
-        self.osc_path_regex_pattern = None
+        # The name of the listener the messages are received from
+        self.listener = ""
+        # Set once the output bundle attributes are built, cleared when the bundle needs to be rebuilt
+        self.bundle_built = False
+        # The type of the "arguments" attribute of the output bundle, None if there is no such attribute
+        self.bundle_args_type: Union[None, og.Type] = None
 
     @carb.profiler.profile
-    def on_event(self, event: carb.events.IEvent):
-        """The event callback"""
-        if event is None:
-            return
-
-        # Only handle messages with a path that matches the OSC address path regex
-        osc_addr, _ = omni.osc.osc_message_from_carb_event(event)
-        if self.osc_path_regex_pattern is None or not self.osc_path_regex_pattern.match(osc_addr):
-            return
-
-        self.is_set = True
-        self.event = event
+    def on_message(self, osc_addr: str, osc_args: list, _timestamp: float):
+        """The router callback, only invoked for messages that match the OSC address path regex"""
+        self.queue.push(osc_addr, osc_args)
         # Tell the evaluator we need to be computed
         if self.node.is_valid():
             self.node.request_compute()
 
     @carb.profiler.profile
-    def first_time_subscribe(self, node: og.Node, osc_path_regex: str) -> bool:
-        """Checked call to set up carb subscription
+    def first_time_subscribe(self, node: og.Node, osc_path_regex: str, listener: str = "") -> bool:
+        """Checked call to register with the OSC router of a listener
         Args:
             node: The node instance
-            event_name: The name of the carb event
+            osc_path_regex: The regex used to match the OSC address path
+            listener: The name of the listener, empty for the default server
         Returns:
             True if we subscribed, False if we are already subscribed
         """
 
-        if self.osc_path_regex != osc_path_regex:
-            # osc path regex changed since we last subscribed, re-compile
-            try:
-                self.osc_path_regex_pattern = re.compile(osc_path_regex)
-                self.osc_path_regex = osc_path_regex
-            except Exception as e:
-                carb.log_error(f"Error compiling OSC Address Path Regex '{osc_path_regex}': {e}")
+        if self.sub is not None and self.osc_path_regex == osc_path_regex and self.listener == listener:
+            return False
 
-        if self.sub is None:
-            self.sub = omni.osc.subscribe_to_osc_event_stream(self.on_event)
-            self.node = node
-            return True
+        # First compute, or the osc path regex or the listener changed since we last subscribed
+        try:
+            sub = omni.osc.get_osc_router(listener).subscribe(osc_path_regex, self.on_message)
+        except Exception as e:
+            carb.log_error(f"Error compiling OSC Address Path Regex '{osc_path_regex}': {e}")
+            return False
 
-        return False
+        self.unsubscribe()
+        self.sub = sub
+        self.osc_path_regex = osc_path_regex
+        self.listener = listener
+        self.node = node
+        return True
 
-    def try_pop_event(self) -> Union[None, carb.events.IEvent]:
-        """Pop the last event received, or None if there is no event to pop"""
-        if self.is_set:
-            self.is_set = False
-            event = self.event
-            self.event = None
-            return event
-        return None
+    def configure_queue(self, policy: str, size: int) -> None:
+        """Re-create the message queue if the queue policy or size changed"""
+        if policy == self.queue.policy and (size == self.queue.capacity or policy == OSC_QUEUE_POLICY_LATEST):
+            return
+        try:
+            self.queue = OscMessageQueue(size, policy)
+        except ValueError as e:
+            carb.log_error(f"Error configuring the OSC message queue: {e}")
+
+    def unsubscribe(self) -> None:
+        """Unregister from the OSC router"""
+        if self.sub is not None:
+            self.sub.unsubscribe()
+        self.sub = None
+
+    def get_bundle_attributes(self, bundle, args_type: Union[None, og.Type]) -> Tuple[Any, Any]:
+        """Returns the address and arguments attributes of the output bundle.
+        The existing attributes are reused when the type of the arguments did not change since
+        the previous message, the bundle is only cleared and rebuilt when it did.
+        Args:
+            bundle: The output bundle contents
+            args_type: The type of the arguments attribute, None if the message has no arguments
+        Returns:
+            The address attribute and the arguments attribute (None if the message has no arguments)
+        """
+        if args_type is None or self.bundle_args_type is None:
+            same_shape = args_type is None and self.bundle_args_type is None
+        else:
+            same_shape = args_type == self.bundle_args_type
+        if self.bundle_built and same_shape:
+            addr_attribute = bundle.attribute_by_name(OSC_MESSAGE_ADDRESS_STR)
+            args_attribute = None if args_type is None else bundle.attribute_by_name(OSC_MESSAGE_ARGUMENTS_STR)
+            if addr_attribute is not None and (args_type is None or args_attribute is not None):
+                return (addr_attribute, args_attribute)
+
+        bundle.clear()
+        addr_attribute = bundle.insert((og.Type(og.BaseDataType.TOKEN), OSC_MESSAGE_ADDRESS_STR))
+        args_attribute = None if args_type is None else bundle.insert((args_type, OSC_MESSAGE_ARGUMENTS_STR))
+        self.bundle_args_type = args_type
+        self.bundle_built = True
+        return (addr_attribute, args_attribute)
+
+    def try_pop_message(self) -> Union[None, Tuple[str, list]]:
+        """Pop the oldest pending message, or None if there is no message to pop"""
+        return self.queue.pop()
 
 
 # ======================================================================
@@ -111,9 +144,15 @@ class OgnOnOscEvent:
     @staticmethod
     def release(node):
         state = OgnOnOscEventDatabase.OgnOnOscEventDatabase.per_node_internal_state(node)
-        if state.sub:
-            state.sub.unsubscribe()
-        state.sub = None
+        state.unsubscribe()
+
+    @staticmethod
+    def update_node_version(_context, _node, old_version: int, new_version: int) -> bool:
+        """
+        Version 2 added the queue, listener and array inputs and the dropped count output,
+        their defaults keep the behavior of version 1
+        """
+        return old_version < new_version
 
     @staticmethod
     def check_all_args_are_floats(args: List[Any]) -> bool:
@@ -123,46 +162,73 @@ class OgnOnOscEvent:
         all_args_are_float = all(isinstance(arg, float) for arg in args)
         return all_args_are_float
 
+    @staticmethod
+    def numeric_args_as_array(args: Union[List[Any], np.ndarray]) -> Union[None, np.ndarray]:
+        """
+        Returns the OSC message arguments as a float64 numpy array, or None if they are not all numeric
+        """
+        values = np.asarray(args)
+        if values.ndim != 1 or values.dtype.kind not in "biuf":
+            return None
+        return values.astype(np.float64, copy=False)
+
     @staticmethod
     @carb.profiler.profile
     def compute(db: og.Database) -> bool:
         state: OgnOnOscEventInternalState = db.internal_state
         osc_path_regex = db.inputs.path
 
-        state.first_time_subscribe(db.node, osc_path_regex)
+        state.configure_queue(db.inputs.queuePolicy, db.inputs.queueSize)
+        state.first_time_subscribe(db.node, osc_path_regex, db.inputs.listener)
 
-        event = state.try_pop_event()
+        message = state.try_pop_message()
+        db.outputs.droppedCount = state.queue.dropped
 
-        if event is None:
+        if message is None:
             return False
 
-        try:
-            addr, args = omni.osc.osc_message_from_carb_event(event)
-            # Populate the output bundle
-            bundle: og._impl.bundles.BundleContents = db.outputs.message
-            bundle.clear()
-
-            # Update the address attribute
-            addr_attribute = bundle.insert((og.Type(og.BaseDataType.TOKEN), OSC_MESSAGE_ADDRESS_STR))
-            addr_attribute.value = addr
+        # Keep evaluating until the queue is drained
+        if len(state.queue) > 0:
+            db.node.request_compute()
 
-            # Update the arguments attribute
-            all_args_are_floats = OgnOnOscEvent.check_all_args_are_floats(args)
-            # NOTE(jshrake): This node currently only supports OSC arguments shaped like a List[Float]
-            if all_args_are_floats:
+        try:
+            addr, args = message
+
+            # Work out the type of the arguments attribute
+            if db.inputs.argumentsAsArray:
+                # Write any number of numeric arguments as a double[] in a single conversion
+                args_value = OgnOnOscEvent.numeric_args_as_array(args)
+                if args_value is None:
+                    carb.log_warn(f"OnOscMessage node expected numeric OSC message arguments, instead got {args}")
+                    return False
+                args_type = og.Type(og.BaseDataType.DOUBLE, array_depth=1)
+            elif OgnOnOscEvent.check_all_args_are_floats(args):
+                # NOTE(jshrake): This node currently only supports OSC arguments shaped like a List[Float]
                 if len(args) == 1:
                     # Argument list contains a single element, write it as a double
-                    args_attribute = bundle.insert((og.Type(og.BaseDataType.DOUBLE),  OSC_MESSAGE_ARGUMENTS_STR))
-                    args_attribute.value = args[0]
+                    args_type = og.Type(og.BaseDataType.DOUBLE)
+                    args_value = args[0]
                 elif len(args) > 1:
                     # Argument list contains multiple element, write it as a list
-                    args_attribute = bundle.insert((og.Type(og.BaseDataType.DOUBLE, tuple_count=len(args), array_depth=0), OSC_MESSAGE_ARGUMENTS_STR))
-                    args_attribute.value = args
+                    args_type = og.Type(og.BaseDataType.DOUBLE, tuple_count=len(args), array_depth=0)
+                    args_value = args
+                else:
+                    args_type = None
+                    args_value = None
             else:
                 carb.log_warn(f"OnOscMessage node expected OSC message arguments to be of type List[Float], instead got {args}")
                 return False
+
+            # Populate the output bundle
+            bundle: og._impl.bundles.BundleContents = db.outputs.message
+            addr_attribute, args_attribute = state.get_bundle_attributes(bundle, args_type)
+            addr_attribute.value = addr
+            if args_attribute is not None:
+                args_attribute.value = args_value
             db.outputs.execOut = og.ExecutionAttributeState.ENABLED
         except Exception as e:
             carb.log_error(f"Error in OgnOnOscEvent::compute: {e}")
+            # Rebuild the bundle from scratch on the next message
+            state.bundle_built = False
             return False
         return True
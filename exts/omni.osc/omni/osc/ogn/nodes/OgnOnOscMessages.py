@@ -0,0 +1,181 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# NVIDIA CORPORATION and its licensors retain all intellectual property
+# and proprietary rights in and to this software, related documentation
+# and any modifications thereto.  Any use, reproduction, disclosure or
+# distribution of this software and related documentation without an express
+# license agreement from NVIDIA CORPORATION is strictly prohibited.
+
+"""
+This is the implementation of the OGN node defined in OgnOnOscMessages.ogn
+"""
+import collections
+import itertools
+from typing import Deque, List, Tuple
+
+import carb
+import carb.profiler
+import numpy as np
+import omni.graph.core as og
+import omni.osc
+
+from .. import OgnOnOscMessagesDatabase
+
+# The argument types output as values, strings and blobs are not converted even when they hold a number
+_NUMERIC_TYPES = (bool, int, float, np.bool_, np.number)
+
+
+def _is_numeric(args: list) -> bool:
+    """Returns true if every argument of a message is a number"""
+    if isinstance(args, np.ndarray):
+        return args.ndim == 1 and args.dtype.kind in "biuf"
+    return all(isinstance(arg, _NUMERIC_TYPES) for arg in args)
+
+
+class OgnOnOscMessagesInternalState:
+    """Convenience class for maintaining per-node state information"""
+
+    def __init__(self):
+        """Instantiate the per-node state information."""
+        # This router subscription object controls the lifetime of our callback, it will be
+        # cleaned up automatically when our node is destroyed
+        self.sub = None
+        # The matching OSC messages received since the last evaluation, as (address, arguments, timestamp) tuples
+        self.messages: Deque[Tuple[str, list, float]] = collections.deque(maxlen=4096)
+        # Number of messages dropped since the node was created
+        self.dropped = 0
+        # The node instance handle
+        self.node = None
+        # The regex used to match the OSC address path
+        self.osc_path_regex = ""
+        # The name of the listener the messages are received from
+        self.listener = ""
+
+    @carb.profiler.profile
+    def on_message(self, osc_addr: str, osc_args: list, timestamp: float):
+        """The router callback, only invoked for messages that match the OSC address path regex"""
+        if len(self.messages) == self.messages.maxlen:
+            self.dropped += 1
+        self.messages.append((osc_addr, osc_args, timestamp))
+        # Tell the evaluator we need to be computed
+        if self.node.is_valid():
+            self.node.request_compute()
+
+    @carb.profiler.profile
+    def first_time_subscribe(self, node: og.Node, osc_path_regex: str, listener: str = "") -> bool:
+        """Checked call to register with the OSC router of a listener
+        Args:
+            node: The node instance
+            osc_path_regex: The regex used to match the OSC address path
+            listener: The name of the listener, empty for the default server
+        Returns:
+            True if we subscribed, False if we are already subscribed
+        """
+
+        if self.sub is not None and self.osc_path_regex == osc_path_regex and self.listener == listener:
+            return False
+
+        # First compute, or the osc path regex or the listener changed since we last subscribed
+        try:
+            sub = omni.osc.get_osc_router(listener).subscribe(osc_path_regex, self.on_message)
+        except Exception as e:
+            carb.log_error(f"Error compiling OSC Address Path Regex '{osc_path_regex}': {e}")
+            return False
+
+        self.unsubscribe()
+        self.sub = sub
+        self.osc_path_regex = osc_path_regex
+        self.listener = listener
+        self.node = node
+        return True
+
+    def set_max_messages(self, max_messages: int) -> None:
+        """Resize the pending message buffer, keeping the most recent messages"""
+        max_messages = max(1, max_messages)
+        if max_messages != self.messages.maxlen:
+            self.messages = collections.deque(self.messages, maxlen=max_messages)
+
+    def unsubscribe(self) -> None:
+        """Unregister from the OSC router"""
+        if self.sub is not None:
+            self.sub.unsubscribe()
+        self.sub = None
+
+    def drain(self) -> List[Tuple[str, list, float]]:
+        """Pop every pending message"""
+        messages = list(self.messages)
+        self.messages.clear()
+        return messages
+
+
+# ======================================================================
+
+
+class OgnOnOscMessages:
+    """
+    This node triggers when OSC events matching the OSC address path regex were received since the last
+    evaluation, and outputs all of them as columnar arrays.
+    """
+
+    @staticmethod
+    def internal_state():
+        """Returns an object that will contain per-node state information"""
+        return OgnOnOscMessagesInternalState()
+
+    @staticmethod
+    def release(node):
+        state = OgnOnOscMessagesDatabase.OgnOnOscMessagesDatabase.per_node_internal_state(node)
+        state.unsubscribe()
+
+    @staticmethod
+    def flatten_values(arguments: List[list]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the numeric arguments of every message concatenated as a float64 array, and the offsets
+        of the values of each message followed by the total number of values.
+        Messages with non numeric arguments contribute no values.
+        """
+        lengths = np.fromiter((len(args) for args in arguments), dtype=np.int32, count=len(arguments))
+        if all(_is_numeric(args) for args in arguments):
+            values = np.fromiter(itertools.chain.from_iterable(arguments), dtype=np.float64, count=int(lengths.sum()))
+        else:
+            # At least one message has non numeric arguments, convert message by message
+            arrays = []
+            for i, args in enumerate(arguments):
+                if _is_numeric(args):
+                    arrays.append(np.asarray(args, dtype=np.float64))
+                else:
+                    carb.log_warn(f"OnOscMessages node expected numeric OSC message arguments, instead got {args}")
+                    arrays.append(np.empty(0))
+                    lengths[i] = 0
+            values = np.concatenate(arrays) if arrays else np.empty(0)
+        offsets = np.zeros(len(arguments) + 1, dtype=np.int32)
+        np.cumsum(lengths, out=offsets[1:])
+        return (values, offsets)
+
+    @staticmethod
+    @carb.profiler.profile
+    def compute(db: og.Database) -> bool:
+        state: OgnOnOscMessagesInternalState = db.internal_state
+
+        state.set_max_messages(db.inputs.maxMessages)
+        state.first_time_subscribe(db.node, db.inputs.path, db.inputs.listener)
+
+        messages = state.drain()
+        db.outputs.droppedCount = state.dropped
+
+        if not messages:
+            return False
+
+        try:
+            addresses, arguments, timestamps = zip(*messages)
+            values, offsets = OgnOnOscMessages.flatten_values(arguments)
+            db.outputs.addresses = list(addresses)
+            db.outputs.values = values
+            db.outputs.offsets = offsets
+            db.outputs.timestamps = np.array(timestamps, dtype=np.float64)
+            db.outputs.count = len(messages)
+            db.outputs.execOut = og.ExecutionAttributeState.ENABLED
+        except Exception as e:
+            carb.log_error(f"Error in OgnOnOscMessages::compute: {e}")
+            return False
+        return True
@@ -0,0 +1,66 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# NVIDIA CORPORATION and its licensors retain all intellectual property
+# and proprietary rights in and to this software, related documentation
+# and any modifications thereto.  Any use, reproduction, disclosure or
+# distribution of this software and related documentation without an express
+# license agreement from NVIDIA CORPORATION is strictly prohibited.
+
+"""
+This is the implementation of the OGN node defined in OgnReadOscValue.ogn
+"""
+import carb
+import carb.profiler
+import numpy as np
+import omni.graph.core as og
+import omni.osc
+
+
+class OgnReadOscValueInternalState:
+    """Convenience class for maintaining per-node state information"""
+
+    def __init__(self):
+        """Instantiate the per-node state information."""
+        # The update count of the address at the previous evaluation
+        self.update_count = 0
+
+
+# ======================================================================
+
+
+class OgnReadOscValue:
+    """
+    This node reads the latest arguments received for an OSC address from the latest-value store.
+    """
+
+    @staticmethod
+    def internal_state():
+        """Returns an object that will contain per-node state information"""
+        return OgnReadOscValueInternalState()
+
+    @staticmethod
+    @carb.profiler.profile
+    def compute(db: og.Database) -> bool:
+        state: OgnReadOscValueInternalState = db.internal_state
+        try:
+            entry = omni.osc.get_osc_value_store(db.inputs.listener).get_timed(db.inputs.address)
+            if entry is None:
+                db.outputs.value = []
+                db.outputs.timestamp = 0.0
+                db.outputs.updateCount = 0
+                db.outputs.changed = False
+                state.update_count = 0
+                return True
+            args, timestamp, update_count = entry
+            values = np.asarray(args)
+            if values.ndim != 1 or values.dtype.kind not in "biuf":
+                values = np.empty(0)
+            db.outputs.value = values.astype(np.float64, copy=False)
+            db.outputs.timestamp = timestamp
+            db.outputs.updateCount = update_count
+            db.outputs.changed = update_count != state.update_count
+            state.update_count = update_count
+        except Exception as e:
+            carb.log_error(f"Error in OgnReadOscValue::compute: {e}")
+            return False
+        return True
@@ -0,0 +1,33 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# NVIDIA CORPORATION and its licensors retain all intellectual property
+# and proprietary rights in and to this software, related documentation
+# and any modifications thereto.  Any use, reproduction, disclosure or
+# distribution of this software and related documentation without an express
+# license agreement from NVIDIA CORPORATION is strictly prohibited.
+
+"""
+This is the implementation of the OGN node defined in OgnSendOscMessage.ogn
+"""
+import carb
+import carb.profiler
+import omni.graph.core as og
+import omni.osc
+
+
+class OgnSendOscMessage:
+    """
+    This node queues an OSC message on the shared OSC sender when executed.
+    """
+
+    @staticmethod
+    @carb.profiler.profile
+    def compute(db: og.Database) -> bool:
+        try:
+            # The arguments array is encoded as OSC floats with a single conversion
+            omni.osc.get_osc_sender().send(db.inputs.host, db.inputs.port, db.inputs.address, db.inputs.arguments)
+        except Exception as e:
+            carb.log_error(f"Error in OgnSendOscMessage::compute: {e}")
+            return False
+        db.outputs.execOut = og.ExecutionAttributeState.ENABLED
+        return True
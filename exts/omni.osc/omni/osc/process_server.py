@@ -0,0 +1,383 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# NVIDIA CORPORATION and its licensors retain all intellectual property
+# and proprietary rights in and to this software, related documentation
+# and any modifications thereto.  Any use, reproduction, disclosure or
+# distribution of this software and related documentation without an express
+# license agreement from NVIDIA CORPORATION is strictly prohibited.
+
+import os
+import socket
+import struct
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import carb
+import carb.events
+import carb.profiler
+import numpy as np
+import omni.kit.app
+
+from . import receiver_process
+from .codec import OscDecodeError, OscFastDispatcher, decode_message
+from .server import (
+    OSC_PROCESS_RING_DEFAULT_SIZE,
+    _join_multicast_group,
+    _set_receive_buffer_size,
+    udp_kernel_drops,
+)
+
+# The client address passed to handlers, the receiver process does not record the sender of a message
+_CLIENT_ADDRESS = ("", 0)
+# How long to wait for the receiver process to exit before killing it, in seconds
+_STOP_TIMEOUT = 2.0
+# The record layout written by the receiver process, the raw message overlaps the address and the arguments
+_RECORD_DTYPE = np.dtype(
+    {
+        "names": ["kind", "count", "size", "int_mask", "timestamp", "address", "args", "raw"],
+        "formats": [
+            "u1",
+            "u1",
+            "<u2",
+            "<u2",
+            "<f8",
+            f"S{receiver_process.RECORD_MAX_ADDRESS}",
+            ("<f8", receiver_process.RECORD_MAX_ARGS),
+            f"V{receiver_process.RECORD_MAX_RAW_SIZE}",
+        ],
+        "offsets": [
+            0,
+            1,
+            2,
+            4,
+            8,
+            receiver_process.RECORD_HEADER_SIZE,
+            receiver_process.RECORD_ARGS_OFFSET,
+            receiver_process.RECORD_HEADER_SIZE,
+        ],
+        "itemsize": receiver_process.RECORD_SIZE,
+    }
+)
+
+
+def _python_executable() -> str:
+    """Returns the Python interpreter that runs the receiver process, the Kit executable is not one"""
+    if os.path.basename(sys.executable).lower().startswith("python"):
+        return sys.executable
+    for candidate in (
+        os.path.join(sys.exec_prefix, "python.exe"),
+        os.path.join(sys.exec_prefix, "bin", "python3"),
+        os.path.join(sys.exec_prefix, "bin", "python"),
+    ):
+        if os.path.isfile(candidate):
+            return candidate
+    return sys.executable
+
+
+class OscProcessServer:
+    """
+    Receive and decode OSC messages in a separate process, so that decoding never competes with Kit for the GIL.
+
+    The receiver process (see `omni.osc.receiver_process`) inherits the server socket, decodes every datagram and
+    writes each message as a fixed-size record into a ring buffer in shared memory. Once per frame, the main thread
+    copies the pending records out of the ring buffer in bulk and hands their messages to the dispatcher.
+    Messages whose arguments are all ints and floats are fully decoded by the receiver process, any other message of
+    up to 240 bytes is decoded on the main thread, and larger ones are dropped and counted in `oversized`.
+    When the ring buffer is full, the receiver process drops the new messages and counts them in `dropped`.
+
+    Bundles are unwrapped by the receiver process and their messages delivered on the next frame, whatever their
+    timetag. The dispatcher packet callbacks are not invoked, the traffic of this server cannot be recorded.
+    Handlers receive an empty client address.
+    `receive_buffer_size` sets the kernel receive buffer (SO_RCVBUF) of the socket, 0 keeps the OS default.
+
+    Usage::
+
+        import omni.osc
+
+        dispatcher = omni.osc.OscFastDispatcher()
+        dispatcher.set_default_handler(lambda path, *args: print(f"{path}: {args}"))
+        server = omni.osc.OscProcessServer(dispatcher)
+        server.start("192.168.0.1", 3434)
+        # ...
+        server.stop()
+    """
+
+    def __init__(
+        self,
+        dispatcher: OscFastDispatcher,
+        ring_size: int = OSC_PROCESS_RING_DEFAULT_SIZE,
+        multicast_group: Optional[str] = None,
+        receive_buffer_size: int = 0,
+    ):
+        self.dispatcher: OscFastDispatcher = dispatcher
+        self.ring_size: int = max(1, ring_size)
+        self.multicast_group: Optional[str] = multicast_group
+        self.receive_buffer_size: int = receive_buffer_size
+        self.sock: socket.socket = None
+        self.shm: shared_memory.SharedMemory = None
+        self.process: subprocess.Popen = None
+        self.sub: carb.events.ISubscription = None
+        # Guards the ownership of the receiver process, the socket and the ring buffer
+        self.lock: threading.Lock = threading.Lock()
+        # The thread releasing a receiver process stopped with `stop_async`
+        self.stopping: threading.Thread = None
+        # Views of the ring buffer header and records
+        self.header: np.ndarray = None
+        self.records: np.ndarray = None
+        self.read_index: int = 0
+        # The counters of the receiver process at the previous drain, to add their increments to the stats
+        self.counters: np.ndarray = np.zeros(3, dtype=np.uint64)
+        # The number of messages dropped because the ring buffer was full
+        self.dropped: int = 0
+        # The number of messages dropped because they were too large for a record
+        self.oversized: int = 0
+
+    def running(self) -> bool:
+        """
+        Returns true if the receiver process is running
+        """
+        return self.process is not None and self.process.poll() is None
+
+    def start(self, addr: str, port: int) -> bool:
+        """
+        Start the OSC server on the specified address and port.
+        The socket is bound before the receiver process is spawned, so bind errors are reported immediately.
+        Does nothing if the server is already running.
+        """
+        if self.running():
+            carb.log_info("OSC server already running")
+            return self.running()
+        carb.log_info(f"Starting OSC server on {addr}:{port} in a receiver process")
+        # A receiver process stopped with stop_async may still hold the port
+        self._wait_stopping()
+        self._shutdown()
+        try:
+            family, _, _, _, sockaddr = socket.getaddrinfo(addr, port, type=socket.SOCK_DGRAM)[0]
+            self.sock = socket.socket(family, socket.SOCK_DGRAM)
+            _set_receive_buffer_size(self.sock, self.receive_buffer_size)
+            self.sock.bind(sockaddr)
+            if self.multicast_group:
+                _join_multicast_group(self.sock, self.multicast_group)
+            size = receiver_process.RING_HEADER_SIZE + self.ring_size * receiver_process.RECORD_SIZE
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.shm.buf[: receiver_process.RING_HEADER_SIZE] = bytes(receiver_process.RING_HEADER_SIZE)
+            self.header = np.ndarray((receiver_process.RING_HEADER_SIZE // 8,), dtype="<u8", buffer=self.shm.buf)
+            self.records = np.ndarray(
+                (self.ring_size,), dtype=_RECORD_DTYPE, buffer=self.shm.buf, offset=receiver_process.RING_HEADER_SIZE
+            )
+            self.read_index = 0
+            self.counters[:] = 0
+            self._spawn()
+            update_stream = omni.kit.app.get_app().get_update_event_stream()
+            self.sub = update_stream.create_subscription_to_pop(self.on_update, name="omni.osc receiver process")
+            if self.dispatcher.stats is not None:
+                self.dispatcher.stats.drop_sources.append(self.kernel_drops)
+        except Exception as e:
+            carb.log_error(f"Error starting OSC server: {e}")
+            self._shutdown()
+        return self.running()
+
+    def stop(self) -> bool:
+        """
+        Stops the OSC server and its receiver process. The messages still in the ring buffer are dropped.
+        """
+        if self.running():
+            carb.log_info("Stopping OSC server")
+        else:
+            carb.log_info("OSC server not running")
+        self._shutdown()
+        self._wait_stopping()
+        return self.running()
+
+    def stop_async(self) -> Future:
+        """
+        Stops the OSC server without waiting for the receiver process to exit, e.g. from a UI callback.
+        The server reports it is not running right away, and the returned future completes with False once the
+        receiver process has exited and the socket and the ring buffer are released. The messages still in the ring
+        buffer are dropped. `start` waits for the release, so the server can be restarted on the same port.
+        """
+        future = Future()
+        if not self.running():
+            carb.log_info("OSC server not running")
+            self._shutdown()
+            future.set_result(self.running())
+            return future
+        carb.log_info("Stopping OSC server")
+        receiver = self._detach()
+
+        def release() -> None:
+            _release_receiver(*receiver)
+            future.set_result(False)
+
+        self._wait_stopping()
+        self.stopping = threading.Thread(target=release, name="omni.osc receiver process stop", daemon=True)
+        self.stopping.start()
+        return future
+
+    def rebind(self, addr: str, port: int) -> bool:
+        """
+        Restart the server and its receiver process on another address and port, messages received meanwhile are lost.
+        Returns true if the server receives on the new address.
+        """
+        self.stop()
+        return self.start(addr, port)
+
+    def _spawn(self) -> None:
+        """Spawn the receiver process, handing it the server socket"""
+        command = [
+            _python_executable(),
+            receiver_process.__file__,
+            "--shm",
+            self.shm.name,
+            "--parent-pid",
+            str(os.getpid()),
+        ]
+        # The receiver process imports python-osc and numpy from the same locations as Kit
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(path for path in sys.path if path))
+        if os.name == "posix":
+            command += ["--fd", str(self.sock.fileno())]
+            self.process = subprocess.Popen(command, env=env, pass_fds=(self.sock.fileno(),))
+        else:
+            self.process = subprocess.Popen(command, env=env, stdin=subprocess.PIPE)
+            self.process.stdin.write(self.sock.share(self.process.pid))
+            self.process.stdin.close()
+
+    def _shutdown(self) -> None:
+        """Stop the receiver process and release the socket and the ring buffer"""
+        _release_receiver(*self._detach())
+
+    def _detach(
+        self,
+    ) -> Tuple[Optional[subprocess.Popen], Optional[socket.socket], Optional[shared_memory.SharedMemory]]:
+        """
+        Returns the receiver process, the socket and the ring buffer, which the server no longer owns.
+        Only one caller gets them, so they are released once.
+        """
+        if self.sub is not None:
+            self.sub.unsubscribe()
+            self.sub = None
+        if self.dispatcher.stats is not None and self.kernel_drops in self.dispatcher.stats.drop_sources:
+            self.dispatcher.stats.drop_sources.remove(self.kernel_drops)
+        with self.lock:
+            receiver = (self.process, self.sock, self.shm)
+            self.process = None
+            self.sock = None
+            self.shm = None
+            # The views must be released before the shared memory is closed
+            self.header = None
+            self.records = None
+        return receiver
+
+    def _wait_stopping(self) -> None:
+        """Wait for the receiver process stopped with stop_async to be released"""
+        if self.stopping is not None:
+            self.stopping.join()
+            self.stopping = None
+
+    def kernel_drops(self) -> Optional[int]:
+        """
+        Returns the number of datagrams the kernel dropped on the server socket, None if it is not available
+        """
+        return udp_kernel_drops([self.sock] if self.sock is not None else [])
+
+    @carb.profiler.profile
+    def drain(self) -> int:
+        """
+        Dispatch the messages written by the receiver process since the previous drain,
+        returns the number of messages dispatched
+        """
+        if self.records is None:
+            return 0
+        write_index = int(self.header[receiver_process.RING_WRITE_INDEX // 8])
+        count = write_index - self.read_index
+        self._update_counters()
+        if count == 0:
+            return 0
+        # Copy the pending records in bulk, and hand their slots back to the receiver process right away
+        start = self.read_index % self.ring_size
+        end = start + count
+        if end <= self.ring_size:
+            records = self.records[start:end].copy()
+        else:
+            records = np.concatenate((self.records[start:], self.records[: end - self.ring_size]))
+        self.read_index = write_index
+        self.header[receiver_process.RING_READ_INDEX // 8] = write_index
+        if self.dispatcher.stats is not None:
+            self.dispatcher.stats.note_queue_depth(count)
+        numpy_arrays = self.dispatcher.numpy_arrays
+        # Convert every column to Python objects at once rather than record by record
+        kinds = records["kind"].tolist()
+        sizes = records["size"].tolist()
+        arg_counts = records["count"].tolist()
+        int_masks = records["int_mask"].tolist()
+        addresses = records["address"].tolist()
+        all_args = records["args"].tolist()
+        for i, kind in enumerate(kinds):
+            if kind == receiver_process.RECORD_KIND_RAW:
+                try:
+                    address, args = decode_message(records["raw"][i].tobytes()[: sizes[i]], numpy_arrays)
+                except (OscDecodeError, UnicodeDecodeError):
+                    if self.dispatcher.stats is not None:
+                        self.dispatcher.stats.counters().decode_errors += 1
+                    continue
+            else:
+                address = addresses[i].decode("utf-8")
+                arg_count = arg_counts[i]
+                int_mask = int_masks[i]
+                if numpy_arrays and arg_count > 0 and int_mask == 0:
+                    args = records["args"][i, :arg_count].astype(np.float32)
+                else:
+                    args = all_args[i][:arg_count]
+                    if int_mask:
+                        args = [int(arg) if int_mask & (1 << j) else arg for j, arg in enumerate(args)]
+            try:
+                self.dispatcher.dispatch_message(address, args, _CLIENT_ADDRESS)
+            except Exception as e:
+                # The records are already handed back, a failing handler must not lose the rest of the batch
+                carb.log_error(f"Error in OSC handler for {address}: {e}")
+        return count
+
+    def _update_counters(self) -> None:
+        """Add the increments of the receiver process counters to the stats"""
+        self.dropped = int(self.header[receiver_process.RING_DROPPED // 8])
+        self.oversized = int(self.header[receiver_process.RING_OVERSIZED // 8])
+        if self.dispatcher.stats is None:
+            return
+        first = receiver_process.RING_PACKETS // 8
+        counters = self.header[first : first + 3].copy()
+        packets, num_bytes, decode_errors = (counters - self.counters).tolist()
+        self.counters = counters
+        thread_counters = self.dispatcher.stats.counters()
+        thread_counters.packets += packets
+        thread_counters.bytes += num_bytes
+        thread_counters.decode_errors += decode_errors
+
+    def on_update(self, _event: carb.events.IEvent) -> None:
+        self.drain()
+
+
+def _release_receiver(
+    process: Optional[subprocess.Popen], sock: Optional[socket.socket], shm: Optional[shared_memory.SharedMemory]
+) -> None:
+    """Stop a receiver process and release its socket and ring buffer"""
+    try:
+        if process is not None:
+            struct.pack_into("<Q", shm.buf, receiver_process.RING_STOP, 1)
+            try:
+                process.wait(_STOP_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                carb.log_warn("OSC receiver process did not stop, killing it")
+                process.kill()
+                process.wait()
+    except Exception as e:
+        carb.log_error(f"Error stopping OSC server: {e}")
+    finally:
+        if sock is not None:
+            sock.close()
+        if shm is not None:
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,224 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# NVIDIA CORPORATION and its licensors retain all intellectual property
+# and proprietary rights in and to this software, related documentation
+# and any modifications thereto.  Any use, reproduction, disclosure or
+# distribution of this software and related documentation without an express
+# license agreement from NVIDIA CORPORATION is strictly prohibited.
+
+"""
+The receive loop of `OscProcessServer`, run as a script in a separate process.
+
+The process receives the datagrams of a socket inherited from Kit, decodes them and writes every message as a
+fixed-size record into a ring buffer in shared memory, which Kit drains once per frame. It only depends on the
+standard library, numpy and python-osc so that it runs without Kit.
+
+Ring buffer layout, little-endian:
+
+- A 64 byte header of uint64: the write index, the read index, the stop flag, and the packet, byte, decode error,
+  dropped record and oversized message counters.
+- `capacity` records of `RECORD_SIZE` bytes. The indices count records and only grow, the record of index `i`
+  is at slot `i % capacity`.
+
+Each record starts with a 16 byte header: the kind (uint8), the number of arguments (uint8), the size of the raw
+message (uint16), a mask of the integer arguments (uint16), 2 padding bytes and the receive timestamp (float64,
+`time.perf_counter`). A numeric record holds the null padded address in the next `RECORD_MAX_ADDRESS` bytes
+followed by up to `RECORD_MAX_ARGS` float64 arguments. Any other message is copied undecoded in a raw record.
+"""
+import argparse
+import importlib.util
+import os
+import socket
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+from types import ModuleType
+from typing import List, Union
+
+# The offsets of the ring buffer header fields
+RING_WRITE_INDEX = 0
+RING_READ_INDEX = 8
+RING_STOP = 16
+RING_PACKETS = 24
+RING_BYTES = 32
+RING_DECODE_ERRORS = 40
+RING_DROPPED = 48
+RING_OVERSIZED = 56
+RING_HEADER_SIZE = 64
+
+# A message whose arguments are all ints and floats, decoded in the receiver process
+RECORD_KIND_NUMERIC = 0
+# Any other message, copied undecoded and decoded by Kit
+RECORD_KIND_RAW = 1
+RECORD_SIZE = 256
+RECORD_HEADER_SIZE = 16
+RECORD_MAX_ADDRESS = 112
+RECORD_MAX_ARGS = 16
+RECORD_ARGS_OFFSET = RECORD_HEADER_SIZE + RECORD_MAX_ADDRESS
+RECORD_MAX_RAW_SIZE = RECORD_SIZE - RECORD_HEADER_SIZE
+
+_UINT64 = struct.Struct("<Q")
+_COUNTERS = struct.Struct("<QQQQQ")
+_RECORD_HEADER = struct.Struct("<BBHH2xd")
+# The struct packing the arguments of a numeric record, per number of arguments
+_ARGS_STRUCTS = [struct.Struct(f"<{count}d") for count in range(RECORD_MAX_ARGS + 1)]
+# How often the receive loop checks the stop flag, in seconds
+_STOP_POLL_INTERVAL = 0.1
+
+
+class _RingWriter:
+    """Writes records to the ring buffer, the receiver process is its only writer"""
+
+    def __init__(self, buf: memoryview):
+        self.buf: memoryview = buf
+        self.capacity: int = (len(buf) - RING_HEADER_SIZE) // RECORD_SIZE
+        self.write_index: int = 0
+        self.packets: int = 0
+        self.bytes: int = 0
+        self.decode_errors: int = 0
+        self.dropped: int = 0
+        self.oversized: int = 0
+
+    def stopped(self) -> bool:
+        return _UINT64.unpack_from(self.buf, RING_STOP)[0] != 0
+
+    def _reserve(self) -> int:
+        """Returns the offset of the next free record, or -1 if the ring buffer is full"""
+        (read_index,) = _UINT64.unpack_from(self.buf, RING_READ_INDEX)
+        if self.write_index - read_index >= self.capacity:
+            self.dropped += 1
+            return -1
+        return RING_HEADER_SIZE + (self.write_index % self.capacity) * RECORD_SIZE
+
+    def _commit(self) -> None:
+        """Publish the reserved record, once it is fully written"""
+        self.write_index += 1
+        _UINT64.pack_into(self.buf, RING_WRITE_INDEX, self.write_index)
+
+    def write_message(self, message: memoryview, address: str, args: tuple, timestamp: float) -> None:
+        address_bytes = address.encode("utf-8")
+        numeric = len(address_bytes) <= RECORD_MAX_ADDRESS and len(args) <= RECORD_MAX_ARGS
+        int_mask = 0
+        if numeric:
+            for i, arg in enumerate(args):
+                if type(arg) is int:
+                    int_mask |= 1 << i
+                elif type(arg) is not float:
+                    numeric = False
+                    break
+        if not numeric and len(message) > RECORD_MAX_RAW_SIZE:
+            self.oversized += 1
+            return
+        offset = self._reserve()
+        if offset < 0:
+            return
+        if numeric:
+            _RECORD_HEADER.pack_into(self.buf, offset, RECORD_KIND_NUMERIC, len(args), 0, int_mask, timestamp)
+            start = offset + RECORD_HEADER_SIZE
+            self.buf[start : start + RECORD_MAX_ADDRESS] = address_bytes.ljust(RECORD_MAX_ADDRESS, b"\x00")
+            _ARGS_STRUCTS[len(args)].pack_into(self.buf, offset + RECORD_ARGS_OFFSET, *args)
+        else:
+            _RECORD_HEADER.pack_into(self.buf, offset, RECORD_KIND_RAW, 0, len(message), 0, timestamp)
+            start = offset + RECORD_HEADER_SIZE
+            self.buf[start : start + len(message)] = message
+        self._commit()
+
+    def publish_counters(self) -> None:
+        _COUNTERS.pack_into(
+            self.buf, RING_PACKETS, self.packets, self.bytes, self.decode_errors, self.dropped, self.oversized
+        )
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Attach to the ring buffer without handing it to the resource tracker, Kit owns and unlinks it"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always tracks the shared memory, and would unlink it when this process exits
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            from multiprocessing import resource_tracker
+
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _receive_socket(args: argparse.Namespace) -> socket.socket:
+    """Returns the socket inherited from Kit"""
+    if args.fd is not None:
+        return socket.socket(fileno=args.fd)
+    # On Windows, Kit writes the shared socket to our stdin
+    return socket.fromshare(sys.stdin.buffer.read())
+
+
+def _load_codec() -> ModuleType:
+    """
+    Load the codec module next to this script. It has no Kit dependency, so it is loaded from its file rather than
+    through the omni.osc package, and without adding the package directory to the import path: the generic names
+    of the package modules would shadow the standard library and site modules.
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "codec.py")
+    spec = importlib.util.spec_from_file_location("omni_osc_receiver_codec", path)
+    codec = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(codec)
+    return codec
+
+
+def run(sock: socket.socket, buf: memoryview, parent_pid: int, max_packet_size: int = 65536) -> None:
+    """
+    Receive, decode and write records until the stop flag is set or Kit exits
+    """
+    codec = _load_codec()
+    decode_bundle, decode_message, is_bundle = codec.decode_bundle, codec.decode_message, codec.is_bundle
+
+    writer = _RingWriter(buf)
+    packet = bytearray(max_packet_size)
+    view = memoryview(packet)
+    sock.settimeout(_STOP_POLL_INTERVAL)
+    while not writer.stopped():
+        try:
+            size = sock.recv_into(packet)
+        except socket.timeout:
+            # Exit if Kit died without setting the stop flag
+            if os.name == "posix" and os.getppid() != parent_pid:
+                return
+            continue
+        except OSError:
+            return
+        timestamp = time.perf_counter()
+        writer.packets += 1
+        writer.bytes += size
+        # Bundles are unwrapped in place, their messages are delivered as soon as they are received
+        pending: List[memoryview] = [view[:size]]
+        try:
+            while pending:
+                data = pending.pop()
+                if is_bundle(data):
+                    _, elements = decode_bundle(data)
+                    pending.extend(reversed(elements))
+                    continue
+                address, message_args = decode_message(data)
+                writer.write_message(data, address, message_args, timestamp)
+        except (codec.OscDecodeError, UnicodeDecodeError, struct.error):
+            writer.decode_errors += 1
+        writer.publish_counters()
+
+
+def main(argv: Union[None, List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Receive OSC messages into a shared memory ring buffer")
+    parser.add_argument("--shm", required=True, help="The name of the ring buffer shared memory")
+    parser.add_argument("--fd", type=int, default=None, help="The file descriptor of the inherited socket")
+    parser.add_argument("--parent-pid", type=int, default=0, help="The process id of Kit")
+    args = parser.parse_args(argv)
+    shm = _attach_shared_memory(args.shm)
+    sock = _receive_socket(args)
+    try:
+        run(sock, shm.buf, args.parent_pid)
+    finally:
+        sock.close()
+        shm.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# NVIDIA CORPORATION and its licensors retain all intellectual property
+# and proprietary rights in and to this software, related documentation
+# and any modifications thereto.  Any use, reproduction, disclosure or
+# distribution of this software and related documentation without an express
+# license agreement from NVIDIA CORPORATION is strictly prohibited.
+
+import itertools
+import re
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import carb
+import carb.events
+import carb.profiler
+
+from .core import OSC_DEFAULT_LISTENER, osc_timed_messages_from_carb_event, subscribe_to_osc_event_stream
+from .stats import OscStats
+
+# Invoked with the address, the arguments and the receive timestamp (time.perf_counter) of a message
+OscRouterCallback = Callable[[str, list, float], None]
+
+# Characters that give a regex a meaning other than a literal string
+_REGEX_METACHARACTERS = frozenset(".^$*+?{}[]\\|()")
+# Upper bound on the number of distinct addresses whose matches are memoized
+_MAX_CACHED_ADDRESSES = 4096
+
+
+def _parse_filter(osc_path_regex: str) -> Tuple[Optional[str], bool]:
+    """
+    Reduce an address regex to a literal address when possible.
+
+    Filters are matched with `re.match`, so a literal filter matches every address that starts with it,
+    a trailing ".*" does not change the set of matched addresses and a trailing "$" requires an exact match.
+
+    Returns:
+        (literal, exact) if the filter can be matched without a regex, (None, False) otherwise
+    """
+    literal = osc_path_regex
+    exact = False
+    if literal.endswith("$") and not literal.endswith("\\$"):
+        literal = literal[:-1]
+        exact = True
+    if literal.endswith(".*") and not literal.endswith("\\.*"):
+        literal = literal[:-2]
+        exact = False
+    if any(c in _REGEX_METACHARACTERS for c in literal):
+        return (None, False)
+    return (literal, exact)
+
+
+class _TrieNode:
+    """A node in the address-part trie"""
+
+    __slots__ = ("children", "exact", "stems")
+
+    def __init__(self):
+        # Child nodes, keyed by the next address part
+        self.children: Dict[str, "_TrieNode"] = {}
+        # Subscription ids whose filter is exactly the address of this node
+        self.exact: Set[int] = set()
+        # Subscription ids whose filter is a prefix of the next address part, keyed by that prefix
+        self.stems: Dict[str, Set[int]] = {}
+
+    def is_empty(self) -> bool:
+        return not (self.children or self.exact or self.stems)
+
+
+class OscRouterSubscription:
+    """
+    Controls the lifetime of a callback registered with `OscAddressRouter.subscribe`
+    """
+
+    def __init__(self, router: "OscAddressRouter", sub_id: int):
+        self.router = router
+        self.sub_id = sub_id
+
+    def unsubscribe(self) -> None:
+        if self.router is not None:
+            self.router.unsubscribe(self.sub_id)
+            self.router = None
+
+
+class OscAddressRouter:
+    """
+    Route OSC messages to the callbacks whose address filter matches.
+
+    Filters are regular expressions matched with `re.match`. Filters that reduce to a literal address prefix
+    (e.g. "/fader", "/fader/.*", "/fader/3$") are indexed in a trie of address parts, only real regular
+    expressions are tested one by one. The callbacks matching an address are memoized, so routing a message
+    costs a single dictionary lookup in the common case.
+
+    The router holds a single subscription to the OSC event stream of its listener while it has at least one callback.
+    When `stats` is set, the time between the receipt and the routing of each message is recorded in it.
+
+    Usage::
+
+        import omni.osc
+
+        router = omni.osc.get_osc_router()
+        sub = router.subscribe("/fader/.*", lambda addr, args, timestamp: print(f"{addr}: {args}"))
+        # ...
+        sub.unsubscribe()
+    """
+
+    def __init__(self, listener: str = OSC_DEFAULT_LISTENER):
+        self.listener: str = listener
+        self.root = _TrieNode()
+        self.regexes: Dict[int, re.Pattern] = {}
+        self.callbacks: Dict[int, OscRouterCallback] = {}
+        self.cache: Dict[str, Tuple[OscRouterCallback, ...]] = {}
+        self.ids = itertools.count()
+        self.sub: carb.events.ISubscription = None
+        self.stats: Optional[OscStats] = None
+
+    def subscribe(self, osc_path_regex: str, cb: OscRouterCallback) -> OscRouterSubscription:
+        """
+        Register a callback invoked with (address, arguments, timestamp) for each message matching the filter.
+
+        Raises:
+            re.error if the filter is not a valid regex
+        """
+        sub_id = next(self.ids)
+        literal, exact = _parse_filter(osc_path_regex)
+        if literal is None:
+            self.regexes[sub_id] = re.compile(osc_path_regex)
+        else:
+            node = self.root
+            parts = literal.split("/")
+            for part in parts[:-1]:
+                node = node.children.setdefault(part, _TrieNode())
+            if exact:
+                node = node.children.setdefault(parts[-1], _TrieNode())
+                node.exact.add(sub_id)
+            else:
+                node.stems.setdefault(parts[-1], set()).add(sub_id)
+        self.callbacks[sub_id] = cb
+        self.cache.clear()
+        if self.sub is None:
+            self.sub = subscribe_to_osc_event_stream(self.on_event, self.listener)
+        return OscRouterSubscription(self, sub_id)
+
+    def unsubscribe(self, sub_id: int) -> None:
+        """
+        Unregister a callback. Prefer calling `OscRouterSubscription.unsubscribe`.
+        """
+        if self.callbacks.pop(sub_id, None) is None:
+            return
+        if self.regexes.pop(sub_id, None) is None:
+            self._remove_from_trie(self.root, sub_id)
+        self.cache.clear()
+        if not self.callbacks and self.sub is not None:
+            self.sub.unsubscribe()
+            self.sub = None
+
+    def _remove_from_trie(self, node: _TrieNode, sub_id: int) -> bool:
+        """Remove a subscription id below a node, returns true if the node became empty"""
+        if sub_id in node.exact:
+            node.exact.discard(sub_id)
+            return node.is_empty()
+        for stem, ids in node.stems.items():
+            if sub_id in ids:
+                ids.discard(sub_id)
+                if not ids:
+                    del node.stems[stem]
+                return node.is_empty()
+        for part, child in node.children.items():
+            if self._remove_from_trie(child, sub_id):
+                del node.children[part]
+                return node.is_empty()
+        return False
+
+    def match(self, address: str) -> Tuple[OscRouterCallback, ...]:
+        """
+        Returns the callbacks whose filter matches the address, in subscription order
+        """
+        callbacks = self.cache.get(address)
+        if callbacks is not None:
+            return callbacks
+
+        ids: List[int] = []
+        node = self.root
+        parts = address.split("/")
+        for part in parts:
+            for stem, stem_ids in node.stems.items():
+                if part.startswith(stem):
+                    ids.extend(stem_ids)
+            node = node.children.get(part)
+            if node is None:
+                break
+        else:
+            ids.extend(node.exact)
+        ids.extend(sub_id for sub_id, regex in self.regexes.items() if regex.match(address))
+
+        callbacks = tuple(self.callbacks[sub_id] for sub_id in sorted(ids))
+        if len(self.cache) >= _MAX_CACHED_ADDRESSES:
+            self.cache.clear()
+        self.cache[address] = callbacks
+        return callbacks
+
+    @carb.profiler.profile
+    def route(self, address: str, args: list, timestamp: float) -> None:
+        """
+        Invoke the callbacks matching the address
+        """
+        for cb in self.match(address):
+            try:
+                cb(address, args, timestamp)
+            except Exception as e:
+                carb.log_error(f"Error in OSC router callback for {address}: {e}")
+
+    def on_event(self, event: carb.events.IEvent) -> None:
+        stats = self.stats
+        now = time.perf_counter()
+        for address, args, timestamp in osc_timed_messages_from_carb_event(event):
+            self.route(address, args, timestamp)
+            if stats is not None:
+                stats.record_latency(now - timestamp)
+
+
+_routers: Dict[str, OscAddressRouter] = {}
+
+
+def get_osc_router(listener: str = OSC_DEFAULT_LISTENER) -> OscAddressRouter:
+    """
+    Returns the router shared by every consumer of the OSC event stream of a listener
+    """
+    router = _routers.get(listener)
+    if router is None:
+        router = OscAddressRouter(listener)
+        _routers[listener] = router
+    return router
@@ -0,0 +1,171 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# NVIDIA CORPORATION and its licensors retain all intellectual property
+# and proprietary rights in and to this software, related documentation
+# and any modifications thereto.  Any use, reproduction, disclosure or
+# distribution of this software and related documentation without an express
+# license agreement from NVIDIA CORPORATION is strictly prohibited.
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, List, Tuple
+
+import carb
+import carb.events
+import carb.profiler
+import omni.kit.app
+
+from .codec import OSC_IMMEDIATELY
+
+# The default longest time a bundle is held before its release, in milliseconds
+OSC_SCHEDULER_DEFAULT_MAX_HOLD_MS = 2000
+# The default number of bundles held at once
+OSC_SCHEDULER_DEFAULT_MAX_PENDING = 4096
+# Seconds between the NTP epoch (1900) and the Unix epoch (1970)
+_NTP_UNIX_EPOCH_DELTA = 2208988800
+
+
+def ntp_to_unix_time(timetag: int) -> float:
+    """
+    Convert a 64 bit NTP timetag to seconds since the Unix epoch
+    """
+    return (timetag >> 32) - _NTP_UNIX_EPOCH_DELTA + (timetag & 0xFFFFFFFF) / 4294967296.0
+
+
+def unix_to_ntp_time(seconds: float) -> int:
+    """
+    Convert seconds since the Unix epoch to a 64 bit NTP timetag
+    """
+    seconds += _NTP_UNIX_EPOCH_DELTA
+    return (int(seconds) << 32) | int((seconds % 1.0) * 4294967296.0)
+
+
+class OscBundleScheduler:
+    """
+    A jitter buffer that releases timetagged OSC bundles on the frame nearest their target time.
+
+    Bundles are held in a min-heap keyed by their release time: the bundle timetag plus a configurable
+    latency budget. On every app update, the bundles whose release time is closer to the current frame
+    than to the next one are dispatched, in timetag order. Bundles whose release time already passed when
+    they arrive are dispatched right away and counted in `late`. Immediate bundles are never scheduled.
+
+    Memory is bounded whatever the timetags sent by the peers: bundles due more than `max_hold_ms` after their
+    arrival, e.g. because of clock skew, are not held but dispatched right away and counted in `late` as well,
+    and while `max_pending` bundles are held, the new ones are dispatched right away and counted in `overflowed`.
+
+    Usage::
+
+        import omni.osc
+
+        scheduler = omni.osc.OscBundleScheduler(latency_ms=20)
+        scheduler.start()
+        dispatcher = omni.osc.OscFastDispatcher(scheduler=scheduler)
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0,
+        max_hold_ms: float = OSC_SCHEDULER_DEFAULT_MAX_HOLD_MS,
+        max_pending: int = OSC_SCHEDULER_DEFAULT_MAX_PENDING,
+    ):
+        self.latency: float = max(0.0, latency_ms) / 1000.0
+        self.max_hold: float = max(0.0, max_hold_ms) / 1000.0
+        self.max_pending: int = max(1, max_pending)
+        # (release time, arrival order, dispatch function)
+        self.heap: List[Tuple[float, int, Callable[[], None]]] = []
+        self.lock: threading.Lock = threading.Lock()
+        self.order = itertools.count()
+        self.sub: carb.events.ISubscription = None
+        # Estimated duration of a frame in seconds
+        self.frame_duration: float = 1.0 / 60.0
+        self.last_update_time: float = 0.0
+        # Number of bundles scheduled, released on a frame, and dispatched late
+        self.scheduled: int = 0
+        self.released: int = 0
+        self.late: int = 0
+        # Number of bundles dispatched right away because `max_pending` bundles were held
+        self.overflowed: int = 0
+
+    def running(self) -> bool:
+        """
+        Returns true if the scheduler releases bundles on app updates
+        """
+        return self.sub is not None
+
+    def start(self) -> bool:
+        """
+        Start releasing bundles on every app update.
+        Does nothing if the scheduler is already running.
+        """
+        if not self.running():
+            update_stream = omni.kit.app.get_app().get_update_event_stream()
+            self.sub = update_stream.create_subscription_to_pop(self.on_update, name="omni.osc scheduler")
+            self.last_update_time = time.perf_counter()
+        return self.running()
+
+    def stop(self) -> bool:
+        """
+        Stop releasing bundles on app updates. Every pending bundle is dispatched immediately.
+        """
+        if self.running():
+            self.sub.unsubscribe()
+            self.sub = None
+            self.release(float("inf"))
+        return self.running()
+
+    def pending(self) -> int:
+        """
+        Returns the number of bundles waiting for their release time
+        """
+        return len(self.heap)
+
+    def schedule(self, timetag: int, dispatch: Callable[[], None]) -> bool:
+        """
+        Schedule the dispatch of a bundle. Safe to call from the server thread.
+
+        Returns:
+            True if the bundle was scheduled, False if the caller should dispatch it immediately,
+            either because it is an immediate bundle, because it is late or due beyond `max_hold_ms`,
+            or because the scheduler is full
+        """
+        if timetag == OSC_IMMEDIATELY:
+            return False
+        now = time.perf_counter()
+        release_time = now + (ntp_to_unix_time(timetag) - time.time()) + self.latency
+        with self.lock:
+            if release_time <= now or release_time - now > self.max_hold:
+                self.late += 1
+                return False
+            if len(self.heap) >= self.max_pending:
+                self.overflowed += 1
+                return False
+            heapq.heappush(self.heap, (release_time, next(self.order), dispatch))
+            self.scheduled += 1
+        return True
+
+    @carb.profiler.profile
+    def release(self, until: float) -> int:
+        """
+        Dispatch every bundle whose release time is before `until`, returns the number of bundles dispatched
+        """
+        with self.lock:
+            due = []
+            while self.heap and self.heap[0][0] <= until:
+                due.append(heapq.heappop(self.heap)[2])
+        for dispatch in due:
+            try:
+                dispatch()
+            except Exception as e:
+                carb.log_error(f"Error dispatching scheduled OSC bundle: {e}")
+        self.released += len(due)
+        return len(due)
+
+    def on_update(self, _event: carb.events.IEvent) -> None:
+        now = time.perf_counter()
+        # Smooth the frame duration so that a single hitch does not release bundles too early
+        self.frame_duration += 0.1 * ((now - self.last_update_time) - self.frame_duration)
+        self.last_update_time = now
+        # Release the bundles that are closer to this frame than to the next one
+        self.release(now + 0.5 * self.frame_duration)
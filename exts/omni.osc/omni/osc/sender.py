@@ -0,0 +1,191 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# NVIDIA CORPORATION and its licensors retain all intellectual property
+# and proprietary rights in and to this software, related documentation
+# and any modifications thereto.  Any use, reproduction, disclosure or
+# distribution of this software and related documentation without an express
+# license agreement from NVIDIA CORPORATION is strictly prohibited.
+
+import queue
+import socket
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import carb
+import carb.events
+import carb.profiler
+import numpy as np
+import omni.kit.app
+
+from .codec import OSC_BUNDLE_HEADER_SIZE, encode_bundle, encode_message
+
+# The largest UDP payload that fits in a standard 1500 bytes Ethernet frame without IP fragmentation
+OSC_DEFAULT_MAX_DATAGRAM_SIZE = 1472
+
+Destination = Tuple[str, int]
+
+
+class OscSender:
+    """
+    Send OSC messages from a background thread.
+
+    Messages queued with `send` during a frame are coalesced per destination into OSC bundles of at most
+    `max_datagram_size` bytes, and handed to the sender thread once per frame (or when calling `flush`).
+    Each destination gets its own connected UDP socket, which is reused for every datagram.
+
+    Usage::
+
+        import omni.osc
+
+        sender = omni.osc.get_osc_sender()
+        sender.send("192.168.0.2", 9000, "/fixture/1/dimmer", [0.5])
+    """
+
+    def __init__(self, max_datagram_size: int = OSC_DEFAULT_MAX_DATAGRAM_SIZE):
+        self.max_datagram_size: int = max_datagram_size
+        # Encoded messages queued during the current frame, per destination
+        self.pending: Dict[Destination, List[bytes]] = {}
+        self.lock: threading.Lock = threading.Lock()
+        # Frames of datagrams waiting to be sent by the sender thread
+        self.frames: queue.SimpleQueue = queue.SimpleQueue()
+        self.sockets: Dict[Destination, socket.socket] = {}
+        self.thread: threading.Thread = None
+        self.sub: carb.events.ISubscription = None
+
+    def running(self) -> bool:
+        """
+        Returns true if the sender thread is running
+        """
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, flush_every_frame: bool = True) -> bool:
+        """
+        Start the sender thread and, optionally, flush the queued messages on every app update.
+        Does nothing if the sender is already running.
+        """
+        if not self.running():
+            self.thread = threading.Thread(target=self._run, name="omni.osc sender")
+            # Daemon mode, so that a sender that is not stopped does not prevent the app from exiting
+            self.thread.daemon = True
+            self.thread.start()
+            if flush_every_frame:
+                update_stream = omni.kit.app.get_app().get_update_event_stream()
+                self.sub = update_stream.create_subscription_to_pop(lambda _: self.flush(), name="omni.osc sender")
+        return self.running()
+
+    def stop(self) -> bool:
+        """
+        Send the queued messages and stop the sender thread.
+        """
+        if self.sub is not None:
+            self.sub.unsubscribe()
+            self.sub = None
+        if self.running():
+            self.flush()
+            self.frames.put(None)
+            self.thread.join()
+        self.thread = None
+        return self.running()
+
+    def send(self, host: str, port: int, address: str, args: Union[Iterable[Any], np.ndarray] = ()) -> None:
+        """
+        Queue a message to be sent to host:port on the next flush. Safe to call from any thread.
+
+        Raises:
+            OscEncodeError if an argument cannot be encoded
+        """
+        self.send_encoded(host, port, encode_message(address, args))
+
+    def send_encoded(self, host: str, port: int, message: bytes) -> None:
+        """
+        Queue an already encoded message or bundle to be sent to host:port on the next flush
+        """
+        with self.lock:
+            self.pending.setdefault((host, port), []).append(message)
+
+    @carb.profiler.profile
+    def flush(self) -> None:
+        """
+        Pack the messages queued since the last flush and hand them to the sender thread
+        """
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        if pending:
+            self.frames.put(pending)
+
+    def pack(self, messages: List[bytes]) -> List[bytes]:
+        """
+        Returns the datagrams to send for a list of encoded messages, in order.
+        Consecutive messages are packed into bundles that fit in `max_datagram_size` bytes,
+        a message that fits in no bundle is sent on its own.
+        """
+        datagrams = []
+        bundle = []
+        size = OSC_BUNDLE_HEADER_SIZE
+        for message in messages:
+            element_size = 4 + len(message)
+            if bundle and size + element_size > self.max_datagram_size:
+                datagrams.append(bundle[0] if len(bundle) == 1 else encode_bundle(bundle))
+                bundle = []
+                size = OSC_BUNDLE_HEADER_SIZE
+            bundle.append(message)
+            size += element_size
+        if bundle:
+            datagrams.append(bundle[0] if len(bundle) == 1 else encode_bundle(bundle))
+        return datagrams
+
+    def _socket(self, destination: Destination) -> socket.socket:
+        """Returns the socket connected to a destination, creating it on first use"""
+        sock = self.sockets.get(destination)
+        if sock is None:
+            family, _, _, _, sockaddr = socket.getaddrinfo(*destination, type=socket.SOCK_DGRAM)[0]
+            sock = socket.socket(family, socket.SOCK_DGRAM)
+            sock.connect(sockaddr)
+            self.sockets[destination] = sock
+        return sock
+
+    def _run(self) -> None:
+        """The sender thread"""
+        while True:
+            frame: Optional[Dict[Destination, List[bytes]]] = self.frames.get()
+            if frame is None:
+                break
+            for destination, messages in frame.items():
+                try:
+                    sock = self._socket(destination)
+                    for datagram in self.pack(messages):
+                        sock.send(datagram)
+                except Exception as e:
+                    carb.log_warn(f"Error sending OSC messages to {destination[0]}:{destination[1]}: {e}")
+                    sock = self.sockets.pop(destination, None)
+                    if sock is not None:
+                        sock.close()
+        for sock in self.sockets.values():
+            sock.close()
+        self.sockets.clear()
+
+
+_sender: Optional[OscSender] = None
+
+
+def get_osc_sender() -> OscSender:
+    """
+    Returns the sender shared by the extension, starting it on first use
+    """
+    global _sender
+    if _sender is None:
+        max_datagram_size = carb.settings.get_settings().get("exts/omni.osc/sender/maxDatagramSize")
+        _sender = OscSender(max_datagram_size or OSC_DEFAULT_MAX_DATAGRAM_SIZE)
+    if not _sender.running():
+        _sender.start()
+    return _sender
+
+
+def release_osc_sender() -> None:
+    """
+    Stop the shared sender, sending the queued messages first
+    """
+    global _sender
+    if _sender is not None:
+        _sender.stop()
+        _sender = None
@@ -6,40 +6,419 @@
 # distribution of this software and related documentation without an express
 # license agreement from NVIDIA CORPORATION is strictly prohibited.
 
+import asyncio
+import errno
+import os
+import selectors
+import socket
+import struct
 import threading
+from concurrent.futures import Future
+from typing import Iterable, List, Optional, Tuple
 
 import carb
 import carb.events
-from pythonosc import osc_server
 from pythonosc.dispatcher import Dispatcher
 
+from .codec import OscFastDispatcher
+
+# Receive on a socketserver loop running in a daemon thread
+OSC_SERVER_ENGINE_THREAD = "thread"
+# Receive on Kit's asyncio event loop, in the main thread
+OSC_SERVER_ENGINE_ASYNCIO = "asyncio"
+# Receive and decode in a separate process, see OscProcessServer
+OSC_SERVER_ENGINE_PROCESS = "process"
+# Receive datagrams, see DaemonOSCUDPServer and AsyncOSCUDPServer
+OSC_SERVER_TRANSPORT_UDP = "udp"
+# Receive framed streams over TCP connections, see OscTCPServer
+OSC_SERVER_TRANSPORT_TCP = "tcp"
+# OSC 1.0 stream framing: each packet is preceded by its size as a big-endian int32
+OSC_TCP_FRAMING_LENGTH_PREFIX = "length"
+# OSC 1.1 stream framing: packets are SLIP encoded (RFC 1055) and delimited by END bytes
+OSC_TCP_FRAMING_SLIP = "slip"
+OSC_TCP_FRAMINGS = (OSC_TCP_FRAMING_LENGTH_PREFIX, OSC_TCP_FRAMING_SLIP)
+# The default number of records of the ring buffer shared with the receiver process of OscProcessServer
+OSC_PROCESS_RING_DEFAULT_SIZE = 65536
+# The largest UDP datagram
+_MAX_DATAGRAM_SIZE = 65536
+# The size of the arena a worker receives a burst of datagrams into
+_RECEIVE_ARENA_SIZE = 1 << 20
+# How often the workers check whether the server is stopping, in seconds
+_STOP_POLL_INTERVAL = 0.1
+
+
+def _join_multicast_group(sock: socket.socket, group: str) -> None:
+    """Join an IPv4 or IPv6 multicast group on the default interface"""
+    if ":" in group:
+        request = socket.inet_pton(socket.AF_INET6, group) + struct.pack("@I", 0)
+        sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_JOIN_GROUP, request)
+    else:
+        request = socket.inet_aton(group) + socket.inet_aton("0.0.0.0")
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, request)
+
+
+def _set_receive_buffer_size(sock: socket.socket, size: int) -> None:
+    """Request a kernel receive buffer of `size` bytes, the OS may grant less (see net.core.rmem_max on Linux)"""
+    if size <= 0:
+        return
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, size)
+        granted = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+    except OSError as e:
+        carb.log_warn(f"Unable to set the OSC server receive buffer size to {size} bytes: {e}")
+        return
+    # Linux reports twice the size it granted, to account for its bookkeeping overhead
+    if granted < size:
+        carb.log_warn(f"OSC server requested a {size} byte receive buffer, the OS granted {granted} bytes")
+
+
+def udp_kernel_drops(sockets: Iterable[socket.socket]) -> Optional[int]:
+    """
+    Returns the number of datagrams the kernel dropped because the receive buffer of the sockets was full,
+    read from /proc/net/udp and /proc/net/udp6. Returns None where they are not available (e.g. Windows and macOS).
+    """
+    inodes = set()
+    for sock in sockets:
+        try:
+            inodes.add(os.fstat(sock.fileno()).st_ino)
+        except (OSError, ValueError):
+            continue
+    drops = None
+    for path in ("/proc/net/udp", "/proc/net/udp6"):
+        try:
+            with open(path) as f:
+                lines = f.readlines()[1:]
+        except OSError:
+            continue
+        for line in lines:
+            # sl local_address rem_address st tx_queue:rx_queue tr:tm->when retrnsmt uid timeout inode ref pointer drops
+            fields = line.split()
+            if len(fields) >= 13 and int(fields[9]) in inodes:
+                drops = (drops or 0) + int(fields[12])
+    return drops
+
 
 class DaemonOSCUDPServer:
     """
-    Run a python-osc BlockingOSCUDPServer in a separate thread.
+    Receive OSC datagrams in separate threads.
+
+    Each time its socket is readable, a worker drains every pending datagram into a preallocated arena before
+    dispatching them, so bursts leave the kernel queue as fast as they arrive and no buffer is allocated per datagram.
+    An `OscFastDispatcher` decodes the datagrams in place, other dispatchers receive a copy of each datagram.
+    Handlers must copy the packet data they keep, the arena is reused for the next burst.
+    `receive_buffer_size` sets the kernel receive buffer (SO_RCVBUF) of every socket, 0 keeps the OS default.
+    `kernel_drops` returns the number of datagrams the kernel dropped because that buffer was full.
+
+    With more than one worker, each worker thread serves its own socket bound with SO_REUSEPORT
+    to the same address and port, and the kernel spreads the incoming datagrams across them.
+    The kernel picks the socket from a hash of the sender address, so the messages of a given
+    sender are always handled by the same worker, in order.
+
+    When `multicast_group` is provided, every socket joins the group, bind the server to "0.0.0.0" to receive it.
 
     Usage::
 
-        import omni.osc.core as osc
+        import omni.osc
 
-        dispatcher = osc.Dispatcher()
-        dispatcher.set_default_handler(lambda(path, args): print(f"{path}: {args}"))
-        server = osc.DaemonOSCUDPServer(dispatcher)
+        dispatcher = omni.osc.OscFastDispatcher()
+        dispatcher.set_default_handler(lambda path, *args: print(f"{path}: {args}"))
+        server = omni.osc.DaemonOSCUDPServer(dispatcher, receive_buffer_size=4 << 20)
         server.start("192.168.0.1", 3434)
         # ...
         server.stop()
     """
 
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        workers: int = 1,
+        multicast_group: Optional[str] = None,
+        receive_buffer_size: int = 0,
+    ):
+        self.dispatcher: Dispatcher = dispatcher
+        self.multicast_group: Optional[str] = multicast_group
+        self.receive_buffer_size: int = receive_buffer_size
+        self.workers: int = max(1, workers)
+        if self.workers > 1 and not hasattr(socket, "SO_REUSEPORT"):
+            carb.log_warn("SO_REUSEPORT is not supported on this platform, the OSC server will use a single worker")
+            self.workers = 1
+        self.sockets: List[socket.socket] = []
+        self.threads: List[threading.Thread] = []
+        self.stop_event: threading.Event = threading.Event()
+        # The thread releasing the workers of a server stopped with `stop_async`
+        self.stopping: threading.Thread = None
+
+    def running(self) -> bool:
+        """
+        Returns true if the server is running
+        """
+        return len(self.threads) > 0 and all(thread.is_alive() for thread in self.threads)
+
+    def start(self, addr: str, port: int) -> bool:
+        """
+        Start the OSC server on the specified address and port.
+        Does nothing if the server is already running.
+        """
+        if not self.running():
+            carb.log_info(f"Starting OSC server on {addr}:{port} with {self.workers} worker(s)")
+            # The sockets of a server stopped with stop_async may still hold the port
+            self._wait_stopping()
+            self.stop_event = threading.Event()
+            try:
+                self.sockets = self._bind(addr, port)
+                self.threads = self._spawn_workers(self.sockets, self.stop_event)
+                stats = getattr(self.dispatcher, "stats", None)
+                if stats is not None:
+                    stats.drop_sources.append(self.kernel_drops)
+            except Exception as e:
+                carb.log_error(f"Error starting OSC server: {e}")
+                self._shutdown()
+        else:
+            carb.log_info("OSC server already running")
+        return self.running()
+
+    def stop(self) -> bool:
+        """
+        Stops the OSC server, waiting for the workers to exit (up to 0.1 s).
+        """
+        if self.running():
+            carb.log_info("Stopping OSC server")
+            self._shutdown()
+        else:
+            carb.log_info("OSC server not running")
+        return self.running()
+
+    def stop_async(self) -> Future:
+        """
+        Stops the OSC server without waiting for the workers to exit, e.g. from a UI callback.
+        The server reports it is not running right away, and the returned future completes with False once the
+        workers have exited and the sockets are closed. `start` waits for the release, so the server can be
+        restarted on the same port.
+        """
+        future = Future()
+        if not self.running():
+            carb.log_info("OSC server not running")
+            future.set_result(self.running())
+            return future
+        carb.log_info("Stopping OSC server")
+        sockets, threads, stop_event = self._detach()
+
+        def release() -> None:
+            _release_workers(sockets, threads, stop_event)
+            future.set_result(False)
+
+        self._wait_stopping()
+        self.stopping = threading.Thread(target=release, name="omni.osc udp server stop", daemon=True)
+        self.stopping.start()
+        return future
+
+    def rebind(self, addr: str, port: int) -> bool:
+        """
+        Move the running server to another address and port, without a gap in reception.
+        The new sockets are bound and served before the previous ones are released in the background. When the port
+        is unchanged and the sockets do not share it with SO_REUSEPORT, the previous sockets are released first.
+        If the new address cannot be bound, the server keeps receiving on the previous one.
+        Starts the server if it is not running. Returns true if the server receives on the new address.
+        """
+        if not self.running():
+            return self.start(addr, port)
+        carb.log_info(f"Rebinding OSC server to {addr}:{port}")
+        try:
+            sockets = self._bind(addr, port)
+        except OSError as e:
+            if e.errno != errno.EADDRINUSE or self.sockets[0].getsockname()[1] != port:
+                carb.log_error(f"Error rebinding OSC server to {addr}:{port}, it still receives on its address: {e}")
+                return False
+            # The previous sockets hold the port, release them first, datagrams received meanwhile are lost
+            _release_workers(*self._detach())
+            return self.start(addr, port)
+        previous = self._detach()
+        self.stop_event = threading.Event()
+        self.sockets = sockets
+        self.threads = self._spawn_workers(sockets, self.stop_event)
+        threading.Thread(target=_release_workers, args=previous, name="omni.osc udp server stop", daemon=True).start()
+        stats = getattr(self.dispatcher, "stats", None)
+        if stats is not None:
+            stats.drop_sources.append(self.kernel_drops)
+        return self.running()
+
+    def _bind(self, addr: str, port: int) -> List[socket.socket]:
+        """Returns the bound sockets of the workers, raises if one cannot be bound"""
+        family, _, _, _, sockaddr = socket.getaddrinfo(addr, port, type=socket.SOCK_DGRAM)[0]
+        sockets = []
+        try:
+            for _ in range(self.workers):
+                sock = socket.socket(family, socket.SOCK_DGRAM)
+                sockets.append(sock)
+                if self.workers > 1:
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+                _set_receive_buffer_size(sock, self.receive_buffer_size)
+                sock.bind(sockaddr)
+                if self.multicast_group:
+                    _join_multicast_group(sock, self.multicast_group)
+                sock.setblocking(False)
+        except Exception:
+            for sock in sockets:
+                sock.close()
+            raise
+        return sockets
+
+    def _spawn_workers(self, sockets: List[socket.socket], stop_event: threading.Event) -> List[threading.Thread]:
+        """Start a worker thread per socket"""
+        threads = []
+        for i, sock in enumerate(sockets):
+            thread = threading.Thread(target=self._serve, args=(sock, stop_event), name=f"omni.osc udp server {i}")
+            # NOTE(jshrake): Running the thread in daemon mode ensures that the thread and server
+            # are properly disposed of in the event that the main thread exits unexpectedly.
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        return threads
+
+    def kernel_drops(self) -> Optional[int]:
+        """
+        Returns the number of datagrams the kernel dropped on the server sockets, None if it is not available
+        """
+        return udp_kernel_drops(self.sockets)
+
+    def _serve(self, sock: socket.socket, stop_event: threading.Event) -> None:
+        """The worker thread, receives bursts of datagrams into its arena and dispatches them"""
+        arena = memoryview(bytearray(_RECEIVE_ARENA_SIZE))
+        datagrams: List[Tuple[memoryview, Tuple[str, int]]] = []
+        selector = selectors.DefaultSelector()
+        selector.register(sock, selectors.EVENT_READ)
+        # python-osc dispatchers parse bytes, only OscFastDispatcher decodes slices of the arena in place
+        zero_copy = isinstance(self.dispatcher, OscFastDispatcher)
+        try:
+            while not stop_event.is_set():
+                if not selector.select(_STOP_POLL_INTERVAL):
+                    continue
+                full = True
+                while full:
+                    full = _receive_burst(sock, arena, datagrams)
+                    for data, client_address in datagrams:
+                        try:
+                            self.dispatcher.call_handlers_for_packet(data if zero_copy else bytes(data), client_address)
+                        except Exception as e:
+                            carb.log_error(f"Error handling OSC packet from {client_address}: {e}")
+                    datagrams.clear()
+        except Exception as e:
+            if not stop_event.is_set():
+                carb.log_error(f"Error in OSC server: {e}")
+        finally:
+            selector.close()
+
+    def _shutdown(self) -> None:
+        """Shut down and release every worker"""
+        _release_workers(*self._detach())
+        self._wait_stopping()
+
+    def _wait_stopping(self) -> None:
+        """Wait for the workers of the server stopped with stop_async to be released"""
+        if self.stopping is not None:
+            self.stopping.join()
+            self.stopping = None
+
+    def _detach(self) -> Tuple[List[socket.socket], List[threading.Thread], threading.Event]:
+        """Returns the sockets, the workers and the stop event of the server, which no longer owns them"""
+        stats = getattr(self.dispatcher, "stats", None)
+        if stats is not None and self.kernel_drops in stats.drop_sources:
+            stats.drop_sources.remove(self.kernel_drops)
+        workers = (self.sockets, self.threads, self.stop_event)
+        self.sockets = []
+        self.threads = []
+        return workers
+
+
+def _release_workers(
+    sockets: List[socket.socket], threads: List[threading.Thread], stop_event: threading.Event
+) -> None:
+    """Stop the workers of a server and close their sockets"""
+    try:
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+    except Exception as e:
+        carb.log_error(f"Error stopping OSC server: {e}")
+    finally:
+        for sock in sockets:
+            sock.close()
+
+
+def _receive_burst(
+    sock: socket.socket, arena: memoryview, datagrams: List[Tuple[memoryview, Tuple[str, int]]]
+) -> bool:
+    """
+    Receive the pending datagrams of a non-blocking socket into consecutive slices of the arena.
+    Returns true if the arena filled up before the socket was drained.
+    """
+    offset = 0
+    while offset + _MAX_DATAGRAM_SIZE <= len(arena):
+        try:
+            size, client_address = sock.recvfrom_into(arena[offset:])
+        except (BlockingIOError, InterruptedError):
+            return False
+        except ConnectionResetError:
+            # Windows reports ICMP port unreachable errors on UDP sockets, ignore them
+            continue
+        datagrams.append((arena[offset : offset + size], client_address))
+        offset += size
+    return True
+
+
+class _OscDatagramProtocol(asyncio.DatagramProtocol):
+    """Hands every datagram received by the transport to the dispatcher"""
+
     def __init__(self, dispatcher: Dispatcher):
         self.dispatcher: Dispatcher = dispatcher
-        self.server: osc_server.BlockingOSCUDPServer = None
-        self.thread: threading.Thread = None
+        self.transport: asyncio.DatagramTransport = None
+
+    def connection_made(self, transport: asyncio.DatagramTransport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, client_address: Tuple[str, int]) -> None:
+        if self.dispatcher is not None:
+            self.dispatcher.call_handlers_for_packet(data, client_address)
+
+    def error_received(self, exc: Exception) -> None:
+        carb.log_warn(f"OSC server socket error: {exc}")
+
+
+class AsyncOSCUDPServer:
+    """
+    Receive OSC messages on Kit's asyncio event loop.
+
+    Datagrams are dispatched on the main thread as the event loop runs, without the thread hop
+    and the per-request handler allocation of the socketserver based `DaemonOSCUDPServer`.
+    The socket is bound synchronously so that `start` reports bind errors immediately.
+    When `multicast_group` is provided, the socket joins the group.
+    `receive_buffer_size` sets the kernel receive buffer (SO_RCVBUF) of the socket, 0 keeps the OS default.
+
+    Usage::
+
+        import omni.osc
+
+        dispatcher = omni.osc.OscFastDispatcher()
+        dispatcher.set_default_handler(lambda path, *args: print(f"{path}: {args}"))
+        server = omni.osc.AsyncOSCUDPServer(dispatcher)
+        server.start("192.168.0.1", 3434)
+        # ...
+        server.stop()
+    """
+
+    def __init__(self, dispatcher: Dispatcher, multicast_group: Optional[str] = None, receive_buffer_size: int = 0):
+        self.dispatcher: Dispatcher = dispatcher
+        self.multicast_group: Optional[str] = multicast_group
+        self.receive_buffer_size: int = receive_buffer_size
+        self.sock: socket.socket = None
+        self.protocol: _OscDatagramProtocol = None
+        self.task: asyncio.Future = None
 
     def running(self) -> bool:
         """
         Returns true if the server is running
         """
-        return self.thread is not None and self.thread.is_alive()
+        return self.sock is not None
 
     def start(self, addr: str, port: int) -> bool:
         """
@@ -49,12 +428,7 @@ class DaemonOSCUDPServer:
         if not self.running():
             carb.log_info(f"Starting OSC server on {addr}:{port}")
             try:
-                self.server = osc_server.BlockingOSCUDPServer((addr, port), dispatcher=self.dispatcher)
-                self.thread = threading.Thread(target=lambda: self.server.serve_forever())
-                # NOTE(jshrake): Running the thread in daemon mode ensures that the thread and server
-                # are properly disposed of in the event that the main thread exits unexpectedly.
-                self.thread.daemon = True
-                self.thread.start()
+                self._open(addr, port)
             except Exception as e:
                 carb.log_error(f"Error starting OSC server: {e}")
         else:
@@ -67,14 +441,104 @@ class DaemonOSCUDPServer:
         """
         if self.running():
             carb.log_info("Stopping OSC server")
-            try:
-                self.server.shutdown()
-                self.thread.join()
-            except Exception as e:
-                carb.log_error(f"Error stopping OSC server: {e}")
-            finally:
-                self.server = None
-                self.thread = None
+            self._close()
         else:
             carb.log_info("OSC server not running")
         return self.running()
+
+    def stop_async(self) -> Future:
+        """
+        Stops the OSC server, returns a future completed with False.
+        Stopping never blocks this server, the method mirrors `DaemonOSCUDPServer.stop_async`.
+        """
+        future = Future()
+        future.set_result(self.stop())
+        return future
+
+    def rebind(self, addr: str, port: int) -> bool:
+        """
+        Move the running server to another address and port, without a gap in reception.
+        The new socket is bound before the previous one is closed. When the port is unchanged, the previous socket
+        is closed first. If the new address cannot be bound, the server keeps receiving on the previous one.
+        Starts the server if it is not running. Returns true if the server receives on the new address.
+        """
+        if not self.running():
+            return self.start(addr, port)
+        carb.log_info(f"Rebinding OSC server to {addr}:{port}")
+        previous = (self.sock, self.protocol, self.task)
+        try:
+            self._open(addr, port)
+        except OSError as e:
+            if e.errno != errno.EADDRINUSE or self.sock.getsockname()[1] != port:
+                carb.log_error(f"Error rebinding OSC server to {addr}:{port}, it still receives on its address: {e}")
+                return False
+            # The previous socket holds the port, close it first, datagrams received meanwhile are lost
+            self._close()
+            return self.start(addr, port)
+        # _open replaced the endpoint, close the previous one
+        current = (self.sock, self.protocol, self.task)
+        self.sock, self.protocol, self.task = previous
+        self._close()
+        self.sock, self.protocol, self.task = current
+        stats = getattr(self.dispatcher, "stats", None)
+        if stats is not None:
+            stats.drop_sources.append(self.kernel_drops)
+        return self.running()
+
+    def _open(self, addr: str, port: int) -> None:
+        """Bind a socket and create its datagram endpoint on the event loop, raises if the socket cannot be bound"""
+        sock = None
+        try:
+            family, _, _, _, sockaddr = socket.getaddrinfo(addr, port, type=socket.SOCK_DGRAM)[0]
+            sock = socket.socket(family, socket.SOCK_DGRAM)
+            _set_receive_buffer_size(sock, self.receive_buffer_size)
+            sock.bind(sockaddr)
+            if self.multicast_group:
+                _join_multicast_group(sock, self.multicast_group)
+            sock.setblocking(False)
+        except Exception:
+            if sock is not None:
+                sock.close()
+            raise
+        loop = asyncio.get_event_loop()
+        protocol = _OscDatagramProtocol(self.dispatcher)
+        self.task = asyncio.ensure_future(loop.create_datagram_endpoint(lambda: protocol, sock=sock))
+        self.protocol = protocol
+        self.sock = sock
+        stats = getattr(self.dispatcher, "stats", None)
+        if stats is not None and self.kernel_drops not in stats.drop_sources:
+            stats.drop_sources.append(self.kernel_drops)
+
+    def _close(self) -> None:
+        """Close the socket and the datagram endpoint"""
+        try:
+            stats = getattr(self.dispatcher, "stats", None)
+            if stats is not None and self.kernel_drops in stats.drop_sources:
+                stats.drop_sources.remove(self.kernel_drops)
+            if self.protocol.transport is not None:
+                self.protocol.transport.close()
+            else:
+                # The endpoint is not created yet, close its transport once it is
+                self.task.add_done_callback(_close_endpoint)
+            # The transport only closes the socket on the next loop iteration,
+            # release the port now so that the server can be restarted right away
+            self.sock.close()
+        except Exception as e:
+            carb.log_error(f"Error stopping OSC server: {e}")
+        finally:
+            self.sock = None
+            self.protocol = None
+            self.task = None
+
+    def kernel_drops(self) -> Optional[int]:
+        """
+        Returns the number of datagrams the kernel dropped on the server socket, None if it is not available
+        """
+        return udp_kernel_drops([self.sock] if self.sock is not None else [])
+
+
+def _close_endpoint(task: asyncio.Future) -> None:
+    """Close the transport of a datagram endpoint task that completed after the server stopped"""
+    if not task.cancelled() and task.exception() is None:
+        transport, _ = task.result()
+        transport.close()
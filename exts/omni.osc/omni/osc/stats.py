@@ -0,0 +1,235 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# NVIDIA CORPORATION and its licensors retain all intellectual property
+# and proprietary rights in and to this software, related documentation
+# and any modifications thereto.  Any use, reproduction, disclosure or
+# distribution of this software and related documentation without an express
+# license agreement from NVIDIA CORPORATION is strictly prohibited.
+
+import bisect
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import carb
+import carb.events
+import carb.settings
+import omni.kit.app
+
+# Upper bounds in milliseconds of the receive-to-consume latency histogram buckets, the last bucket is unbounded
+OSC_LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0)
+# The settings path the statistics are published to
+OSC_STATS_SETTINGS_PATH = "exts/omni.osc/stats"
+# Upper bound on the number of distinct addresses counted per receiving thread
+_MAX_COUNTED_ADDRESSES = 1024
+_LATENCY_BUCKETS_S = tuple(bound / 1000.0 for bound in OSC_LATENCY_BUCKETS_MS)
+
+
+class OscThreadCounters:
+    """
+    The counters of a single receiving thread. Only that thread writes them, so they need no lock.
+    """
+
+    __slots__ = ("packets", "bytes", "decode_errors", "messages", "addresses")
+
+    def __init__(self):
+        self.packets: int = 0
+        self.bytes: int = 0
+        self.decode_errors: int = 0
+        self.messages: int = 0
+        # Number of messages per address, for the first `_MAX_COUNTED_ADDRESSES` addresses
+        self.addresses: Dict[str, int] = {}
+
+    def count_message(self, address: str) -> None:
+        self.messages += 1
+        count = self.addresses.get(address)
+        if count is not None:
+            self.addresses[address] = count + 1
+        elif len(self.addresses) < _MAX_COUNTED_ADDRESSES:
+            self.addresses[address] = 1
+
+
+class OscStats:
+    """
+    Statistics of the OSC receive pipeline, cheap enough to collect all the time.
+
+    Each receiving thread increments its own `OscThreadCounters`, returned by `counters()`, so recording a packet
+    takes no lock. Receive-to-consume latencies are recorded on the main thread in a fixed histogram.
+    Readers sum the counters of every thread in `snapshot()`, the totals may lag the writers by a few messages.
+    The datagrams dropped by the kernel before they reach a server, reported by the `drop_sources` that the
+    servers register while they run, are counted in `kernel_drops`.
+
+    Once started, the statistics are published to the `exts/omni.osc/stats` settings and passed to every
+    callback in `publish_callbacks` periodically.
+
+    Usage::
+
+        import omni.osc
+
+        stats = omni.osc.get_osc_stats().snapshot()
+        print(f"{stats['packets_per_s']:.0f} packets/s, {stats['decode_errors']} decode errors")
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+        self.lock: threading.Lock = threading.Lock()
+        # The counters of every thread that recorded a packet
+        self.thread_counters: List[OscThreadCounters] = []
+        # Number of consumed messages per latency bucket, see `OSC_LATENCY_BUCKETS_MS`
+        self.latency_counts: List[int] = [0] * (len(OSC_LATENCY_BUCKETS_MS) + 1)
+        # The highest number of messages seen pending in a queue
+        self.queue_high_water: int = 0
+        self.publish_callbacks: List[Callable[[Dict[str, Any]], None]] = []
+        # Functions returning the number of datagrams the kernel dropped on a server socket, None if not available
+        self.drop_sources: List[Callable[[], Optional[int]]] = []
+        self.interval: float = 1.0
+        self.sub: carb.events.ISubscription = None
+        self.last_publish_time: float = time.monotonic()
+        self.last_packets: int = 0
+        self.last_bytes: int = 0
+
+    def running(self) -> bool:
+        """
+        Returns true if the statistics are published periodically
+        """
+        return self.sub is not None
+
+    def start(self, interval_ms: float = 1000) -> bool:
+        """
+        Publish the statistics every `interval_ms` milliseconds.
+        Does nothing if the statistics are already published.
+        """
+        if not self.running():
+            self.interval = max(0.0, interval_ms) / 1000.0
+            update_stream = omni.kit.app.get_app().get_update_event_stream()
+            self.sub = update_stream.create_subscription_to_pop(self.on_update, name="omni.osc stats")
+        return self.running()
+
+    def stop(self) -> bool:
+        """
+        Stop publishing the statistics, the counters keep their values
+        """
+        if self.running():
+            self.sub.unsubscribe()
+            self.sub = None
+        return self.running()
+
+    def counters(self) -> OscThreadCounters:
+        """
+        Returns the counters of the calling thread
+        """
+        counters = getattr(self.local, "counters", None)
+        if counters is None:
+            counters = OscThreadCounters()
+            with self.lock:
+                self.thread_counters.append(counters)
+            self.local.counters = counters
+        return counters
+
+    def record_latency(self, seconds: float) -> None:
+        """
+        Record the time between the receipt and the consumption of a message. Must be called from the main thread.
+        """
+        self.latency_counts[bisect.bisect_left(_LATENCY_BUCKETS_S, seconds)] += 1
+
+    def note_queue_depth(self, depth: int) -> None:
+        """
+        Record the number of messages pending in a queue
+        """
+        if depth > self.queue_high_water:
+            self.queue_high_water = depth
+
+    def latency_percentile(self, percentile: float) -> float:
+        """
+        Returns the upper bound in milliseconds of the latency bucket holding the percentile (0-100),
+        infinity if it is in the unbounded bucket and 0 if no latency was recorded
+        """
+        total = sum(self.latency_counts)
+        if total == 0:
+            return 0.0
+        rank = total * percentile / 100.0
+        cumulated = 0
+        for bound, count in zip(OSC_LATENCY_BUCKETS_MS, self.latency_counts):
+            cumulated += count
+            if cumulated >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the totals of every counter, the datagrams dropped by the kernel, the per-address message counts,
+        the latency histogram and the packet and byte rates since the previous publication
+        """
+        with self.lock:
+            thread_counters = list(self.thread_counters)
+        packets = sum(c.packets for c in thread_counters)
+        num_bytes = sum(c.bytes for c in thread_counters)
+        addresses: Dict[str, int] = {}
+        for c in thread_counters:
+            # Copy first, the receiving thread may add an address while we iterate
+            for address, count in c.addresses.copy().items():
+                addresses[address] = addresses.get(address, 0) + count
+        kernel_drops = 0
+        for source in list(self.drop_sources):
+            try:
+                kernel_drops += source() or 0
+            except Exception as e:
+                carb.log_warn(f"Unable to read the OSC kernel drop count: {e}")
+        elapsed = time.monotonic() - self.last_publish_time
+        return {
+            "packets": packets,
+            "bytes": num_bytes,
+            "messages": sum(c.messages for c in thread_counters),
+            "decode_errors": sum(c.decode_errors for c in thread_counters),
+            "kernel_drops": kernel_drops,
+            "packets_per_s": (packets - self.last_packets) / elapsed if elapsed > 0 else 0.0,
+            "bytes_per_s": (num_bytes - self.last_bytes) / elapsed if elapsed > 0 else 0.0,
+            "addresses": addresses,
+            "queue_high_water": self.queue_high_water,
+            "latency_buckets_ms": list(OSC_LATENCY_BUCKETS_MS),
+            "latency_counts": list(self.latency_counts),
+            "latency_p50_ms": self.latency_percentile(50),
+            "latency_p99_ms": self.latency_percentile(99),
+        }
+
+    def publish(self) -> Dict[str, Any]:
+        """
+        Publish a snapshot to the settings and to the publish callbacks, and start a new rate measurement period
+        """
+        snapshot = self.snapshot()
+        self.last_publish_time = time.monotonic()
+        self.last_packets = snapshot["packets"]
+        self.last_bytes = snapshot["bytes"]
+        settings = carb.settings.get_settings()
+        settings.set_int(f"{OSC_STATS_SETTINGS_PATH}/packets", snapshot["packets"])
+        settings.set_int(f"{OSC_STATS_SETTINGS_PATH}/bytes", snapshot["bytes"])
+        settings.set_int(f"{OSC_STATS_SETTINGS_PATH}/messages", snapshot["messages"])
+        settings.set_int(f"{OSC_STATS_SETTINGS_PATH}/decodeErrors", snapshot["decode_errors"])
+        settings.set_int(f"{OSC_STATS_SETTINGS_PATH}/kernelDrops", snapshot["kernel_drops"])
+        settings.set_float(f"{OSC_STATS_SETTINGS_PATH}/packetsPerSecond", snapshot["packets_per_s"])
+        settings.set_float(f"{OSC_STATS_SETTINGS_PATH}/bytesPerSecond", snapshot["bytes_per_s"])
+        settings.set_int(f"{OSC_STATS_SETTINGS_PATH}/queueHighWater", snapshot["queue_high_water"])
+        settings.set_int_array(f"{OSC_STATS_SETTINGS_PATH}/latencyHistogram", snapshot["latency_counts"])
+        for cb in self.publish_callbacks:
+            try:
+                cb(snapshot)
+            except Exception as e:
+                carb.log_error(f"Error in OSC statistics callback: {e}")
+        return snapshot
+
+    def on_update(self, _event: carb.events.IEvent) -> None:
+        if time.monotonic() - self.last_publish_time >= self.interval:
+            self.publish()
+
+
+_stats: Optional[OscStats] = None
+
+
+def get_osc_stats() -> OscStats:
+    """
+    Returns the statistics shared by the extension
+    """
+    global _stats
+    if _stats is None:
+        _stats = OscStats()
+    return _stats
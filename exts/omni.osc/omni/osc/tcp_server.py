@@ -0,0 +1,421 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.  All rights reserved.
+#
+# NVIDIA CORPORATION and its licensors retain all intellectual property
+# and proprietary rights in and to this software, related documentation
+# and any modifications thereto.  Any use, reproduction, disclosure or
+# distribution of this software and related documentation without an express
+# license agreement from NVIDIA CORPORATION is strictly prohibited.
+
+import abc
+import errno
+import selectors
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Iterator, Tuple
+
+import carb
+from pythonosc.dispatcher import Dispatcher
+
+from .codec import OscFastDispatcher
+from .server import OSC_TCP_FRAMING_LENGTH_PREFIX, OSC_TCP_FRAMING_SLIP, OSC_TCP_FRAMINGS
+
+# The largest packet accepted on a stream, a connection sending a larger packet is closed
+OSC_TCP_DEFAULT_MAX_PACKET_SIZE = 1 << 20
+
+_INT32 = struct.Struct(">i")
+_SLIP_END = b"\xc0"
+_SLIP_ESC = b"\xdb"
+_SLIP_ESC_END = b"\xdb\xdc"
+_SLIP_ESC_ESC = b"\xdb\xdd"
+# The smallest amount of free space handed to recv_into
+_MIN_READ_SIZE = 4096
+# The most packets dispatched per connection before serving the other connections
+_MAX_PACKETS_PER_TURN = 256
+# How long to stop accepting connections when the process runs out of file descriptors or buffers, in seconds
+_ACCEPT_RETRY_DELAY = 0.1
+# The accept errors caused by the process or the system rather than by the incoming connection
+_ACCEPT_RESOURCE_ERRORS = (errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.ENOMEM)
+
+
+class OscFramingError(Exception):
+    """Raised when a stream does not hold valid OSC packets"""
+
+
+class OscStreamFramer(abc.ABC):
+    """
+    Split a byte stream into OSC packets without copying them.
+
+    The stream is received straight into a buffer with `recv_into(framer.writable())` followed by
+    `framer.commit(size)`. `packets()` then yields the complete packets as slices of that buffer,
+    which are only valid until the next call to `writable()`. Only the bytes of an incomplete packet
+    are moved, to the start of the buffer, to make room for the rest of the packet.
+    """
+
+    def __init__(self, max_packet_size: int = OSC_TCP_DEFAULT_MAX_PACKET_SIZE):
+        self.max_packet_size: int = max_packet_size
+        self.buffer: bytearray = bytearray(_MIN_READ_SIZE * 16)
+        # The received bytes not yet framed are buffer[start:end]
+        self.start: int = 0
+        self.end: int = 0
+        # The number of bytes the incomplete packet at `start` needs, when known
+        self.needed: int = 0
+
+    def pending(self) -> int:
+        """
+        Returns the number of received bytes not yet returned in a packet
+        """
+        return self.end - self.start
+
+    def writable(self) -> memoryview:
+        """
+        Returns the free space at the end of the buffer, making room for at least the incomplete packet
+        """
+        size = self.end - self.start
+        if size == 0:
+            self.start = self.end = 0
+        required = max(self.needed, size + _MIN_READ_SIZE)
+        if self.start + required > len(self.buffer):
+            if required > len(self.buffer):
+                # Grow into a new buffer, slices of the current buffer may still be referenced
+                buffer = bytearray(max(required, 2 * len(self.buffer)))
+                buffer[:size] = self.buffer[self.start : self.end]
+                self.buffer = buffer
+            else:
+                self.buffer[:size] = self.buffer[self.start : self.end]
+            self.start = 0
+            self.end = size
+        return memoryview(self.buffer)[self.end :]
+
+    def commit(self, size: int) -> None:
+        """
+        Record that `size` bytes were written at the start of the last `writable()` view
+        """
+        self.end += size
+
+    @abc.abstractmethod
+    def packets(self) -> Iterator[memoryview]:
+        """
+        Yield every complete packet received so far
+
+        Raises:
+            OscFramingError if a packet is larger than `max_packet_size`
+        """
+
+
+class OscLengthPrefixFramer(OscStreamFramer):
+    """
+    Frame an OSC 1.0 stream, where each packet is preceded by its size as a big-endian int32
+    """
+
+    def packets(self) -> Iterator[memoryview]:
+        view = memoryview(self.buffer)
+        while self.end - self.start >= _INT32.size:
+            size = _INT32.unpack_from(self.buffer, self.start)[0]
+            if size < 0 or size > self.max_packet_size:
+                raise OscFramingError(f"Invalid OSC packet size {size}")
+            if self.end - self.start - _INT32.size < size:
+                self.needed = _INT32.size + size
+                return
+            self.start += _INT32.size + size
+            self.needed = 0
+            yield view[self.start - size : self.start]
+
+
+class OscSlipFramer(OscStreamFramer):
+    """
+    Frame an OSC 1.1 stream, where packets are SLIP encoded and delimited by END bytes.
+    Packets without escaped bytes are not copied.
+    """
+
+    def packets(self) -> Iterator[memoryview]:
+        view = memoryview(self.buffer)
+        while True:
+            index = self.buffer.find(_SLIP_END, self.start, self.end)
+            if index < 0:
+                if self.end - self.start > self.max_packet_size:
+                    raise OscFramingError(f"OSC packet larger than {self.max_packet_size} bytes")
+                return
+            start = self.start
+            self.start = index + 1
+            # Skip the empty packets between two consecutive END bytes
+            if index == start:
+                continue
+            if self.buffer.find(_SLIP_ESC, start, index) < 0:
+                yield view[start:index]
+            else:
+                packet = bytes(view[start:index]).replace(_SLIP_ESC_END, _SLIP_END).replace(_SLIP_ESC_ESC, _SLIP_ESC)
+                yield memoryview(packet)
+
+
+def create_framer(framing: str, max_packet_size: int = OSC_TCP_DEFAULT_MAX_PACKET_SIZE) -> OscStreamFramer:
+    """
+    Returns a framer for the "length" (OSC 1.0) or "slip" (OSC 1.1) stream framing
+
+    Raises:
+        ValueError if the framing is unknown
+    """
+    if framing == OSC_TCP_FRAMING_LENGTH_PREFIX:
+        return OscLengthPrefixFramer(max_packet_size)
+    if framing == OSC_TCP_FRAMING_SLIP:
+        return OscSlipFramer(max_packet_size)
+    raise ValueError(f"Unknown OSC stream framing '{framing}', expected one of {OSC_TCP_FRAMINGS}")
+
+
+class _OscConnection:
+    """A client connection and the framer of its stream"""
+
+    def __init__(self, sock: socket.socket, address: Tuple[str, int], framer: OscStreamFramer):
+        self.sock: socket.socket = sock
+        self.address: Tuple[str, int] = address
+        self.framer: OscStreamFramer = framer
+        self.packets: Iterator[memoryview] = iter(())
+        # True while the connection has received packets left to dispatch
+        self.backlog: bool = False
+
+
+class OscTCPServer:
+    """
+    Receive OSC packets over TCP connections in a daemon thread.
+
+    Each connection gets its own framer (see `OscStreamFramer`), which receives the stream in place and hands the
+    packets to an `OscFastDispatcher` without copying them, other dispatchers receive a copy of each packet.
+    A connection is only read again once every packet it already sent is dispatched, and at most
+    `_MAX_PACKETS_PER_TURN` packets are dispatched per connection before the other connections are served.
+    A sender that outpaces the dispatcher fills the socket buffers and is slowed down by TCP flow control,
+    rather than growing a queue.
+
+    Usage::
+
+        import omni.osc
+
+        dispatcher = omni.osc.OscFastDispatcher()
+        dispatcher.set_default_handler(lambda path, *args: print(f"{path}: {args}"))
+        server = omni.osc.OscTCPServer(dispatcher, framing="slip")
+        server.start("192.168.0.1", 3434)
+        # ...
+        server.stop()
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        framing: str = OSC_TCP_FRAMING_SLIP,
+        max_packet_size: int = OSC_TCP_DEFAULT_MAX_PACKET_SIZE,
+    ):
+        if framing not in OSC_TCP_FRAMINGS:
+            raise ValueError(f"Unknown OSC stream framing '{framing}', expected one of {OSC_TCP_FRAMINGS}")
+        self.dispatcher: Dispatcher = dispatcher
+        self.framing: str = framing
+        self.max_packet_size: int = max_packet_size
+        self.sock: socket.socket = None
+        self.thread: threading.Thread = None
+        self.stop_event: threading.Event = threading.Event()
+        # The thread of a server stopped with `stop_async`, until it has exited
+        self.stopping: threading.Thread = None
+
+    def running(self) -> bool:
+        """
+        Returns true if the server is running
+        """
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, addr: str, port: int) -> bool:
+        """
+        Start the OSC server on the specified address and port.
+        Does nothing if the server is already running.
+        """
+        if not self.running():
+            carb.log_info(f"Starting OSC TCP server on {addr}:{port} with {self.framing} framing")
+            # A server stopped with stop_async may still hold the port
+            self._wait_stopping()
+            sock = None
+            try:
+                family, _, _, _, sockaddr = socket.getaddrinfo(addr, port, type=socket.SOCK_STREAM)[0]
+                sock = socket.socket(family, socket.SOCK_STREAM)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                sock.bind(sockaddr)
+                sock.listen()
+                sock.setblocking(False)
+                self.sock = sock
+                # Every run has its own stop event, a server stopped with stop_async keeps the one it was stopped with
+                self.stop_event = threading.Event()
+                self.thread = threading.Thread(
+                    target=self._run, args=(sock, self.stop_event), name="omni.osc tcp server"
+                )
+                self.thread.daemon = True
+                self.thread.start()
+            except Exception as e:
+                carb.log_error(f"Error starting OSC TCP server: {e}")
+                if sock is not None:
+                    sock.close()
+                self.sock = None
+        else:
+            carb.log_info("OSC server already running")
+        return self.running()
+
+    def stop(self) -> bool:
+        """
+        Stops the OSC server and closes every connection.
+        """
+        if self.running():
+            carb.log_info("Stopping OSC TCP server")
+            self.stop_event.set()
+            self.thread.join()
+        else:
+            carb.log_info("OSC server not running")
+        self.thread = None
+        self.sock = None
+        self._wait_stopping()
+        return self.running()
+
+    def stop_async(self) -> Future:
+        """
+        Stops the OSC server without waiting for its thread to exit, e.g. from a UI callback.
+        The server reports it is not running right away, and the returned future completes with False once the
+        thread has exited and the connections are closed. `start` waits for the thread, so the server can be
+        restarted on the same port.
+        """
+        future = Future()
+        if not self.running():
+            carb.log_info("OSC server not running")
+            self.thread = None
+            future.set_result(self.running())
+            return future
+        carb.log_info("Stopping OSC TCP server")
+        self.stop_event.set()
+        thread = self.thread
+        self.thread = None
+        self.sock = None
+
+        def release() -> None:
+            thread.join()
+            future.set_result(False)
+
+        self._wait_stopping()
+        self.stopping = threading.Thread(target=release, name="omni.osc tcp server stop", daemon=True)
+        self.stopping.start()
+        return future
+
+    def rebind(self, addr: str, port: int) -> bool:
+        """
+        Restart the server on another address and port, the connections are closed and clients must reconnect.
+        Returns true if the server listens on the new address.
+        """
+        self.stop()
+        return self.start(addr, port)
+
+    def _wait_stopping(self) -> None:
+        """Wait for the thread of the server stopped with stop_async to exit"""
+        if self.stopping is not None:
+            self.stopping.join()
+            self.stopping = None
+
+    def _run(self, sock: socket.socket, stop_event: threading.Event) -> None:
+        """The server thread, owns the listening socket"""
+        connections: Dict[socket.socket, _OscConnection] = {}
+        selector = selectors.DefaultSelector()
+        selector.register(sock, selectors.EVENT_READ)
+        try:
+            while not stop_event.is_set():
+                backlog = any(connection.backlog for connection in connections.values())
+                for key, _ in selector.select(0 if backlog else 0.1):
+                    if key.fileobj is sock:
+                        self._accept(sock, selector, connections)
+                    else:
+                        self._read(selector, connections, connections[key.fileobj])
+                for connection in list(connections.values()):
+                    if connection.backlog:
+                        self._dispatch(selector, connections, connection)
+        except Exception as e:
+            carb.log_error(f"Error in OSC TCP server: {e}")
+        finally:
+            for connection in connections.values():
+                connection.sock.close()
+            selector.close()
+            sock.close()
+
+    def _accept(
+        self,
+        listener: socket.socket,
+        selector: selectors.BaseSelector,
+        connections: Dict[socket.socket, _OscConnection],
+    ) -> None:
+        try:
+            sock, address = listener.accept()
+        except BlockingIOError:
+            return
+        except OSError as e:
+            # A failed accept only affects the incoming connection, the server keeps serving the others
+            carb.log_error(f"OSC TCP server cannot accept a connection: {e}")
+            if e.errno in _ACCEPT_RESOURCE_ERRORS:
+                # The pending connection keeps the listener readable, do not spin until resources are released
+                time.sleep(_ACCEPT_RETRY_DELAY)
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connections[sock] = _OscConnection(sock, address, create_framer(self.framing, self.max_packet_size))
+        selector.register(sock, selectors.EVENT_READ)
+        carb.log_info(f"OSC TCP connection from {address[0]}:{address[1]}")
+
+    def _close(
+        self,
+        selector: selectors.BaseSelector,
+        connections: Dict[socket.socket, _OscConnection],
+        connection: _OscConnection,
+    ) -> None:
+        if not connection.backlog:
+            selector.unregister(connection.sock)
+        del connections[connection.sock]
+        connection.sock.close()
+
+    def _read(
+        self,
+        selector: selectors.BaseSelector,
+        connections: Dict[socket.socket, _OscConnection],
+        connection: _OscConnection,
+    ) -> None:
+        try:
+            size = connection.sock.recv_into(connection.framer.writable())
+        except BlockingIOError:
+            return
+        except OSError as e:
+            carb.log_warn(f"OSC TCP connection from {connection.address[0]}:{connection.address[1]} failed: {e}")
+            size = 0
+        if size == 0:
+            self._close(selector, connections, connection)
+            return
+        connection.framer.commit(size)
+        connection.packets = connection.framer.packets()
+        # Stop reading the connection until its packets are dispatched
+        connection.backlog = True
+        selector.unregister(connection.sock)
+
+    def _dispatch(
+        self,
+        selector: selectors.BaseSelector,
+        connections: Dict[socket.socket, _OscConnection],
+        connection: _OscConnection,
+    ) -> None:
+        # python-osc dispatchers parse bytes, only OscFastDispatcher decodes slices of the framer buffer in place
+        zero_copy = isinstance(self.dispatcher, OscFastDispatcher)
+        try:
+            for _ in range(_MAX_PACKETS_PER_TURN):
+                packet = next(connection.packets, None)
+                if packet is None:
+                    connection.backlog = False
+                    selector.register(connection.sock, selectors.EVENT_READ)
+                    return
+                try:
+                    data = packet if zero_copy else bytes(packet)
+                    self.dispatcher.call_handlers_for_packet(data, connection.address)
+                except Exception as e:
+                    address = f"{connection.address[0]}:{connection.address[1]}"
+                    carb.log_error(f"Error handling OSC packet from {address}: {e}")
+        except OscFramingError as e:
+            carb.log_warn(f"Closing OSC TCP connection from {connection.address[0]}:{connection.address[1]}: {e}")
+            connection.backlog = False
+            connection.sock.close()
+            del connections[connection.sock]
@@ -8,6 +8,7 @@
 
 import asyncio
 
+import carb.settings
 import omni.kit.test
 import omni.osc
 
@@ -59,3 +60,695 @@ class Test(omni.kit.test.AsyncTestCase):
         # Manually pump the stream so our subscription callback executes
         omni.osc.get_osc_event_stream().pump()
         self.assertEqual(self.count, total_msg_count)
+
+    async def test_server_can_batch_messages(self):
+        batcher = omni.osc.OscEventBatcher()
+        server = omni.osc.OmniOscExt.create_server(batcher)
+        is_running = server.start("localhost", 3338)
+        self.assertTrue(is_running)
+
+        self.batches = []
+        def on_event(e) -> None:
+            self.batches.append(omni.osc.osc_messages_from_carb_event(e))
+        sub = omni.osc.subscribe_to_osc_event_stream(on_event)
+
+        total_msg_count = 10
+        from pythonosc import udp_client
+        client = udp_client.SimpleUDPClient(address="127.0.0.1", port=3338)
+        for i in range(total_msg_count):
+            client.send_message("/batch", float(i))
+        # Wait for the server to receive the messages
+        await asyncio.sleep(1)
+        self.assertEqual(batcher.flush(), total_msg_count)
+        omni.osc.get_osc_event_stream().pump()
+        server.stop()
+        # All messages are delivered in a single event, in arrival order
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual([args[0] for _, args in self.batches[0]], [float(i) for i in range(total_msg_count)])
+        sub = None
+
+    async def test_router_matches_address_filters(self):
+        router = omni.osc.OscAddressRouter()
+        received = []
+        filters = ["/.*", "/fader", "/fader/3$", "/f[a-z]+/[0-9]"]
+        subs = [router.subscribe(f, lambda addr, _args, _timestamp, f=f: received.append((f, addr))) for f in filters]
+        for addr in ["/fader/3", "/fader/30", "/fader1", "/button/1"]:
+            omni.osc.push_to_osc_event_stream(omni.osc.carb_event_payload_from_osc_message(addr, [1.0]))
+        omni.osc.get_osc_event_stream().pump()
+        for sub in subs:
+            sub.unsubscribe()
+        self.assertEqual(
+            received,
+            [
+                ("/.*", "/fader/3"), ("/fader", "/fader/3"), ("/fader/3$", "/fader/3"), ("/f[a-z]+/[0-9]", "/fader/3"),
+                ("/.*", "/fader/30"), ("/fader", "/fader/30"), ("/f[a-z]+/[0-9]", "/fader/30"),
+                ("/.*", "/fader1"), ("/fader", "/fader1"),
+                ("/.*", "/button/1"),
+            ],
+        )
+
+    async def test_message_queue_overflow_policies(self):
+        def drain(queue):
+            messages = []
+            while len(queue) > 0:
+                messages.append(queue.pop())
+            return messages
+
+        messages = [("/a", [1.0]), ("/b", [2.0]), ("/a", [3.0]), ("/c", [4.0])]
+        latest = omni.osc.OscMessageQueue(4, omni.osc.OSC_QUEUE_POLICY_LATEST)
+        fifo = omni.osc.OscMessageQueue(3, omni.osc.OSC_QUEUE_POLICY_FIFO)
+        conflate = omni.osc.OscMessageQueue(2, omni.osc.OSC_QUEUE_POLICY_CONFLATE)
+        for queue in [latest, fifo, conflate]:
+            for addr, args in messages:
+                queue.push(addr, args)
+
+        self.assertEqual(drain(latest), [("/c", [4.0])])
+        self.assertEqual(latest.dropped, 3)
+        self.assertEqual(drain(fifo), [("/b", [2.0]), ("/a", [3.0]), ("/c", [4.0])])
+        self.assertEqual(fifo.dropped, 1)
+        # "/a" is conflated into its pending slot, then "/a" is evicted to make room for "/c"
+        self.assertEqual(drain(conflate), [("/b", [2.0]), ("/c", [4.0])])
+        self.assertEqual(conflate.dropped, 2)
+        self.assertIsNone(conflate.pop())
+
+    async def test_async_server_can_receive_messages(self):
+        server = omni.osc.OmniOscExt.create_server(engine=omni.osc.OSC_SERVER_ENGINE_ASYNCIO)
+        self.assertIsInstance(server, omni.osc.AsyncOSCUDPServer)
+        is_running = server.start("localhost", 3339)
+        self.assertTrue(is_running)
+
+        self.count = 0
+        def on_event(e) -> None:
+            self.count += len(omni.osc.osc_messages_from_carb_event(e))
+        sub = omni.osc.subscribe_to_osc_event_stream(on_event)
+
+        total_msg_count = 10
+        from pythonosc import udp_client
+        client = udp_client.SimpleUDPClient(address="127.0.0.1", port=3339)
+        for _ in range(total_msg_count):
+            client.send_message("/filter", 1.0)
+        # The datagrams are received as the event loop runs
+        await asyncio.sleep(1)
+        omni.osc.get_osc_event_stream().pump()
+        is_running = server.stop()
+        self.assertFalse(is_running)
+        self.assertEqual(self.count, total_msg_count)
+        sub = None
+
+    async def test_server_can_receive_with_multiple_workers(self):
+        import socket
+
+        if not hasattr(socket, "SO_REUSEPORT"):
+            return
+        server = omni.osc.OmniOscExt.create_server(workers=4)
+        is_running = server.start("localhost", 3340)
+        self.assertTrue(is_running)
+        self.assertEqual(len(server.threads), 4)
+
+        self.count = 0
+        def on_event(e) -> None:
+            self.count += len(omni.osc.osc_messages_from_carb_event(e))
+        sub = omni.osc.subscribe_to_osc_event_stream(on_event)
+
+        # Each client sends from its own port, so the kernel spreads the clients across the workers
+        from pythonosc import udp_client
+        clients = [udp_client.SimpleUDPClient(address="127.0.0.1", port=3340) for _ in range(8)]
+        for client in clients:
+            for i in range(10):
+                client.send_message("/worker", float(i))
+        await asyncio.sleep(1)
+        omni.osc.get_osc_event_stream().pump()
+        is_running = server.stop()
+        self.assertFalse(is_running)
+        self.assertEqual(self.count, 80)
+        sub = None
+
+    async def test_fast_decoder_matches_pythonosc(self):
+        from pythonosc import osc_message
+
+        import omni.osc.benchmark
+
+        messages = omni.osc.benchmark.DECODER_BENCHMARK_MESSAGES + [("/mixed", [1, 2.5, 3]), ("/empty", [])]
+        for address, args in messages:
+            data = omni.osc.benchmark.build_message(address, args)
+            expected = osc_message.OscMessage(data)
+            for buffer in [data, memoryview(bytearray(data))]:
+                decoded_address, decoded_args = omni.osc.decode_message(buffer)
+                self.assertEqual(decoded_address, expected.address)
+                self.assertEqual(list(decoded_args), expected.params)
+        with self.assertRaises(omni.osc.OscDecodeError):
+            omni.osc.decode_message(omni.osc.benchmark.build_message("/truncated", [1.0])[:-2])
+
+    async def test_fast_decoder_numpy_arrays(self):
+        import numpy as np
+
+        import omni.osc.benchmark
+
+        data = omni.osc.benchmark.build_message("/spectrum", [0.5 * i for i in range(64)])
+        address, args = omni.osc.decode_message(data, numpy_arrays=True)
+        self.assertEqual(address, "/spectrum")
+        self.assertIsInstance(args, np.ndarray)
+        self.assertEqual(args.dtype, np.float32)
+        self.assertTrue(np.array_equal(args, np.arange(64, dtype=np.float32) * 0.5))
+        # Messages with non float arguments are still decoded as tuples
+        _, args = omni.osc.decode_message(omni.osc.benchmark.build_message("/mixed", [1, 2.5]), numpy_arrays=True)
+        self.assertEqual(args, (1, 2.5))
+        # Arrays are converted to lists in event payloads
+        payload = omni.osc.carb_event_payload_from_osc_message(address, np.array([1.0, 2.0], dtype=np.float32))
+        self.assertEqual(payload[omni.osc.core.OSC_MESSAGE_ARGUMENTS_STR], [1.0, 2.0])
+
+    async def test_router_passes_receive_timestamps(self):
+        import time
+
+        router = omni.osc.OscAddressRouter()
+        received = []
+        sub = router.subscribe("/stamped", lambda addr, args, timestamp: received.append((addr, timestamp)))
+        before = time.perf_counter()
+        batcher = omni.osc.OscEventBatcher()
+        batcher.add("/stamped", [1.0], 1.5)
+        batcher.add("/stamped", [2.0])
+        batcher.flush()
+        omni.osc.get_osc_event_stream().pump()
+        sub.unsubscribe()
+        self.assertEqual(len(received), 2)
+        self.assertEqual(received[0], ("/stamped", 1.5))
+        self.assertGreaterEqual(received[1][1], before)
+
+    async def test_sender_coalesces_messages_into_bundles(self):
+        server = omni.osc.OmniOscExt.create_server()
+        is_running = server.start("localhost", 3341)
+        self.assertTrue(is_running)
+
+        self.addresses = []
+        def on_event(e) -> None:
+            self.addresses.extend(addr for addr, _ in omni.osc.osc_messages_from_carb_event(e))
+        sub = omni.osc.subscribe_to_osc_event_stream(on_event)
+
+        sender = omni.osc.OscSender(max_datagram_size=256)
+        sender.start(flush_every_frame=False)
+        total_msg_count = 50
+        for i in range(total_msg_count):
+            sender.send("127.0.0.1", 3341, f"/fixture/{i}", [float(i), 1.0])
+        # Every message fits in a handful of bundles
+        messages = [omni.osc.encode_message(f"/fixture/{i}", [0.0, 1.0]) for i in range(total_msg_count)]
+        self.assertLess(len(sender.pack(messages)), 10)
+        sender.stop()
+        await asyncio.sleep(1)
+        omni.osc.get_osc_event_stream().pump()
+        server.stop()
+        self.assertEqual(self.addresses, [f"/fixture/{i}" for i in range(total_msg_count)])
+        sub = None
+
+    async def test_scheduler_releases_bundles_at_their_timetag(self):
+        import time
+
+        scheduler = omni.osc.OscBundleScheduler(latency_ms=0)
+        dispatcher = omni.osc.OscFastDispatcher(scheduler=scheduler)
+        received = []
+        dispatcher.set_default_handler(lambda addr, *args: received.append(addr))
+
+        now = time.time()
+        later = omni.osc.encode_bundle([omni.osc.encode_message("/later", [1.0])], omni.osc.unix_to_ntp_time(now + 0.2))
+        late = omni.osc.encode_bundle([omni.osc.encode_message("/late", [1.0])], omni.osc.unix_to_ntp_time(now - 1.0))
+        immediate = omni.osc.encode_bundle([omni.osc.encode_message("/immediate", [1.0])])
+        for data in [later, late, immediate]:
+            dispatcher.call_handlers_for_packet(data, ("127.0.0.1", 0))
+        # Late and immediate bundles go straight through, the other one waits for its timetag
+        self.assertEqual(received, ["/late", "/immediate"])
+        self.assertEqual(scheduler.late, 1)
+        self.assertEqual(scheduler.pending(), 1)
+
+        scheduler.start()
+        await asyncio.sleep(0.5)
+        scheduler.stop()
+        self.assertEqual(received, ["/late", "/immediate", "/later"])
+        self.assertEqual(scheduler.released, 1)
+
+    async def test_scheduler_bounds_the_held_bundles(self):
+        import time
+
+        scheduler = omni.osc.OscBundleScheduler(max_hold_ms=1000, max_pending=2)
+        dispatcher = omni.osc.OscFastDispatcher(scheduler=scheduler)
+        received = []
+        dispatcher.set_default_handler(lambda addr, *args: received.append(addr))
+
+        now = time.time()
+        for address, delay in [("/skewed", 3600.0), ("/first", 0.5), ("/second", 0.5), ("/overflow", 0.5)]:
+            bundle = omni.osc.encode_bundle(
+                [omni.osc.encode_message(address, [1.0])], omni.osc.unix_to_ntp_time(now + delay)
+            )
+            dispatcher.call_handlers_for_packet(bundle, ("127.0.0.1", 0))
+        # A bundle due beyond the maximum hold time is not held, nor is a bundle over the pending limit
+        self.assertEqual(received, ["/skewed", "/overflow"])
+        self.assertEqual(scheduler.late, 1)
+        self.assertEqual(scheduler.overflowed, 1)
+        self.assertEqual(scheduler.pending(), 2)
+
+    async def test_capture_can_be_replayed(self):
+        import os
+        import tempfile
+
+        from pythonosc.dispatcher import Dispatcher
+
+        path = os.path.join(tempfile.mkdtemp(), "test.osccap")
+        source = omni.osc.OscFastDispatcher()
+        source.set_default_handler(lambda addr, *args: None)
+        recorder = omni.osc.OscRecorder(path)
+        self.assertTrue(recorder.start(source))
+        datagrams = [omni.osc.encode_message(f"/cue/{i}", [float(i)]) for i in range(10)]
+        datagrams.append(omni.osc.encode_bundle([omni.osc.encode_message("/cue/go", [1])]))
+        for data in datagrams:
+            source.call_handlers_for_packet(data, ("127.0.0.1", 0))
+        self.assertFalse(recorder.stop())
+        self.assertEqual(recorder.count, len(datagrams))
+
+        with open(path, "rb") as f:
+            self.assertEqual([bytes(data) for _, data in omni.osc.read_capture(f.read())], datagrams)
+
+        target = omni.osc.OscFastDispatcher()
+        received = []
+        target.set_default_handler(lambda addr, *args: received.append((addr, args)))
+        replayer = omni.osc.OscReplayer(path)
+        replayer.start(target, speed=0)
+        self.assertTrue(replayer.wait(5))
+        self.assertEqual(replayer.count, len(datagrams))
+        self.assertEqual(received, [(f"/cue/{i}", (float(i),)) for i in range(10)] + [("/cue/go", (1,))])
+
+        # python-osc dispatchers are handed bytes rather than slices of the mapped file
+        target = Dispatcher()
+        received = []
+        target.set_default_handler(lambda addr, *args: received.append((addr, args)))
+        replayer = omni.osc.OscReplayer(path)
+        replayer.start(target, speed=0)
+        self.assertTrue(replayer.wait(5))
+        self.assertEqual(received, [(f"/cue/{i}", (float(i),)) for i in range(10)] + [("/cue/go", (1,))])
+
+    async def test_pipeline_benchmark(self):
+        import json
+        import os
+        import tempfile
+
+        import omni.osc.benchmark
+
+        output_path = os.path.join(tempfile.mkdtemp(), "benchmark.json")
+        results = await omni.osc.benchmark.benchmark_pipeline(
+            rate=1000, duration=0.5, port=3342, output_path=output_path
+        )
+        self.assertEqual(results["sent"], 500)
+        self.assertGreater(results["received"], 0)
+        self.assertGreater(results["latency_ms"]["receive"]["count"], 0)
+        self.assertLessEqual(results["latency_ms"]["receive"]["p50"], results["latency_ms"]["receive"]["p99"])
+        self.assertGreater(results["frames"]["count"], 0)
+        with open(output_path) as f:
+            self.assertEqual(json.load(f)["sent"], results["sent"])
+
+    async def test_stats_count_packets_and_latencies(self):
+        stats = omni.osc.OscStats()
+        dispatcher = omni.osc.OscFastDispatcher(stats=stats)
+        dispatcher.set_default_handler(lambda addr, *args: None)
+        for i in range(10):
+            dispatcher.call_handlers_for_packet(omni.osc.encode_message(f"/fader/{i % 2}", [0.5]), ("127.0.0.1", 0))
+        dispatcher.call_handlers_for_packet(b"/truncated\x00", ("127.0.0.1", 0))
+        stats.record_latency(0.0002)
+        stats.record_latency(0.003)
+        stats.note_queue_depth(7)
+
+        snapshot = stats.publish()
+        self.assertEqual(snapshot["packets"], 11)
+        self.assertEqual(snapshot["messages"], 10)
+        self.assertEqual(snapshot["decode_errors"], 1)
+        self.assertEqual(snapshot["addresses"], {"/fader/0": 5, "/fader/1": 5})
+        self.assertEqual(snapshot["queue_high_water"], 7)
+        self.assertEqual(sum(snapshot["latency_counts"]), 2)
+        self.assertEqual(snapshot["latency_p50_ms"], 0.25)
+        settings = carb.settings.get_settings()
+        self.assertEqual(settings.get(f"{omni.osc.OSC_STATS_SETTINGS_PATH}/packets"), 11)
+
+    async def test_bindings_write_attributes_once_per_frame(self):
+        import omni.usd
+        from pxr import UsdGeom
+
+        await omni.usd.get_context().new_stage_async()
+        stage = omni.usd.get_context().get_stage()
+        sphere = UsdGeom.Sphere.Define(stage, "/World/Sphere")
+        router = omni.osc.OscAddressRouter()
+        engine = omni.osc.OscBindingEngine(router=router)
+        count = engine.load(
+            [
+                {"address": "/radius$", "prim": "/World/Sphere", "attribute": "radius", "scale": 10.0, "offset": 1.0},
+                {"address": "/color$", "prim": "/World/Sphere", "attribute": "primvars:displayColor", "argument": 0},
+                {"address": "/missing", "prim": "/World/Sphere"},
+            ]
+        )
+        self.assertEqual(count, 2)
+        router.route("/radius", [0.1], 0.0)
+        router.route("/radius", [0.5], 0.0)
+        # Only the latest value of a binding is written
+        self.assertEqual(engine.apply(), 1)
+        self.assertAlmostEqual(sphere.GetRadiusAttr().Get(), 6.0)
+        self.assertEqual(engine.apply(), 0)
+        engine.clear()
+
+    async def test_tcp_server_can_receive_framed_streams(self):
+        import socket
+        import struct
+
+        from pythonosc.dispatcher import Dispatcher
+
+        def slip(packet: bytes) -> bytes:
+            return b"\xc0" + packet.replace(b"\xdb", b"\xdb\xdd").replace(b"\xc0", b"\xdb\xdc") + b"\xc0"
+
+        def length_prefix(packet: bytes) -> bytes:
+            return struct.pack(">i", len(packet)) + packet
+
+        total_msg_count = 100
+        packets = [omni.osc.encode_message(f"/tcp/{i}", [float(i), b"\xc0\xdb"]) for i in range(total_msg_count)]
+        # python-osc dispatchers are handed bytes rather than slices of the framer buffer
+        cases = [
+            ("slip", slip, omni.osc.OscFastDispatcher),
+            ("length", length_prefix, omni.osc.OscFastDispatcher),
+            ("slip", slip, Dispatcher),
+        ]
+        for framing, encode, dispatcher_type in cases:
+            received = []
+            dispatcher = dispatcher_type()
+            dispatcher.set_default_handler(lambda addr, *args: received.append((addr, args)))
+            server = omni.osc.OscTCPServer(dispatcher, framing=framing)
+            self.assertTrue(server.start("localhost", 3343))
+            with socket.create_connection(("localhost", 3343)) as sock:
+                stream = b"".join(encode(packet) for packet in packets)
+                # Split the stream in the middle of a packet
+                sock.sendall(stream[:1001])
+                await asyncio.sleep(0.1)
+                sock.sendall(stream[1001:])
+                await asyncio.sleep(0.5)
+            self.assertFalse(server.stop())
+            self.assertEqual([addr for addr, _ in received], [f"/tcp/{i}" for i in range(total_msg_count)])
+            self.assertEqual(received[-1][1], (99.0, b"\xc0\xdb"))
+
+    async def test_named_listeners_have_dedicated_streams(self):
+        from pythonosc import udp_client
+
+        server = omni.osc.OmniOscExt.create_server(listener="test_listener")
+        is_running = server.start("localhost", 3344)
+        self.assertTrue(is_running)
+
+        default_addresses = []
+        listener_addresses = []
+        def on_default_event(e) -> None:
+            default_addresses.extend(addr for addr, _ in omni.osc.osc_messages_from_carb_event(e))
+        default_sub = omni.osc.subscribe_to_osc_event_stream(on_default_event)
+        listener_sub = omni.osc.get_osc_router("test_listener").subscribe(
+            "/listener", lambda addr, args, timestamp: listener_addresses.append(addr)
+        )
+
+        total_msg_count = 10
+        client = udp_client.SimpleUDPClient(address="127.0.0.1", port=3344)
+        for i in range(total_msg_count):
+            client.send_message(f"/listener/{i}", 1.0)
+        # The listener stream is pumped on app updates
+        await asyncio.sleep(1)
+        omni.osc.get_osc_event_stream().pump()
+        server.stop()
+        listener_sub.unsubscribe()
+        default_sub = None
+        self.assertEqual(listener_addresses, [f"/listener/{i}" for i in range(total_msg_count)])
+        self.assertEqual(default_addresses, [])
+
+    async def test_value_store_keeps_the_latest_value_of_each_address(self):
+        store = omni.osc.OscValueStore(capacity=2)
+        self.assertIsNone(store.get("/fader/1"))
+        self.assertEqual(store.get("/fader/1", default=[0.0]), [0.0])
+        self.assertIsNone(store.get_timed("/fader/1"))
+
+        store.update("/fader/1", [0.25], 1.0)
+        store.update("/fader/2", [0.5], 2.0)
+        store.update("/fader/1", [0.75], 3.0)
+        # Every slot is allocated, new addresses are ignored
+        store.update("/fader/3", [1.0], 4.0)
+        self.assertEqual(store.get("/fader/1"), [0.75])
+        self.assertEqual(store.get_timed("/fader/1"), ([0.75], 3.0, 2))
+        self.assertEqual(store.get_timed("/fader/2"), ([0.5], 2.0, 1))
+        self.assertIsNone(store.get("/fader/3"))
+        self.assertEqual(store.overflow, 1)
+        self.assertEqual(store.addresses(), ["/fader/1", "/fader/2"])
+
+        store.clear()
+        self.assertEqual(len(store), 0)
+        self.assertIsNone(store.get("/fader/1"))
+
+    async def test_process_server_can_receive_messages(self):
+        server = omni.osc.OmniOscExt.create_server(engine=omni.osc.OSC_SERVER_ENGINE_PROCESS, ring_size=16)
+        self.assertIsInstance(server, omni.osc.OscProcessServer)
+        is_running = server.start("localhost", 3345)
+        self.assertTrue(is_running)
+
+        received = []
+        def on_event(e) -> None:
+            received.extend(omni.osc.osc_messages_from_carb_event(e))
+        sub = omni.osc.subscribe_to_osc_event_stream(on_event)
+
+        from pythonosc import udp_client
+        client = udp_client.SimpleUDPClient(address="127.0.0.1", port=3345)
+        # Give the receiver process time to start
+        await asyncio.sleep(1)
+        client.send_message("/process/numeric", [1.5, 2])
+        client.send_message("/process/string", ["text", 3.0])
+        # The ring buffer is drained on app updates
+        await asyncio.sleep(1)
+        omni.osc.get_osc_event_stream().pump()
+        is_running = server.stop()
+        self.assertFalse(is_running)
+        self.assertEqual(
+            [(addr, list(args)) for addr, args in received],
+            [("/process/numeric", [1.5, 2]), ("/process/string", ["text", 3.0])],
+        )
+        sub = None
+
+    async def test_server_drains_bursts_and_counts_kernel_drops(self):
+        import socket
+
+        stats = omni.osc.OscStats()
+        dispatcher = omni.osc.OscFastDispatcher(stats=stats)
+        self.count = 0
+        def on_message(_addr, *_args) -> None:
+            self.count += 1
+        dispatcher.set_default_handler(on_message)
+        server = omni.osc.DaemonOSCUDPServer(dispatcher, receive_buffer_size=1 << 20)
+        self.assertTrue(server.start("localhost", 3346))
+        self.assertEqual(stats.drop_sources, [server.kernel_drops])
+
+        total_msg_count = 2000
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        packet = omni.osc.encode_message("/burst", [1.0])
+        for _ in range(total_msg_count):
+            sock.sendto(packet, ("127.0.0.1", 3346))
+        sock.close()
+        await asyncio.sleep(1)
+        snapshot = stats.snapshot()
+        self.assertFalse(server.stop())
+        self.assertEqual(stats.drop_sources, [])
+        # Every datagram is either received or counted as dropped by the kernel, where the kernel reports drops
+        self.assertEqual(self.count + snapshot["kernel_drops"], total_msg_count)
+        self.assertEqual(snapshot["packets"], self.count)
+
+    async def test_server_hands_bytes_to_pythonosc_dispatchers(self):
+        import socket
+
+        from pythonosc.dispatcher import Dispatcher
+
+        dispatcher = Dispatcher()
+        self.messages = []
+        dispatcher.set_default_handler(lambda addr, *args: self.messages.append((addr, args)))
+        server = omni.osc.DaemonOSCUDPServer(dispatcher)
+        self.assertTrue(server.start("localhost", 3350))
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.sendto(omni.osc.encode_message("/plain", [1.0, 2]), ("127.0.0.1", 3350))
+        sock.sendto(omni.osc.encode_bundle([omni.osc.encode_message("/bundled", ["text"])]), ("127.0.0.1", 3350))
+        sock.close()
+        await asyncio.sleep(1)
+        self.assertFalse(server.stop())
+        self.assertEqual(self.messages, [("/plain", (1.0, 2)), ("/bundled", ("text",))])
+
+    async def test_startup_times_are_published(self):
+        settings = carb.settings.get_settings()
+        self.assertGreater(settings.get(f"{omni.osc.OSC_STARTUP_SETTINGS_PATH}/importMs"), 0.0)
+        self.assertGreater(settings.get(f"{omni.osc.OSC_STARTUP_SETTINGS_PATH}/startupMs"), 0.0)
+
+    async def test_message_filter_limits_rate_and_smooths(self):
+        delivered = []
+        def emit(addr, args, timestamp) -> None:
+            delivered.append((addr, args))
+        message_filter = omni.osc.OscMessageFilter(
+            [
+                omni.osc.OscFilterRule("/rate$", max_rate=10),
+                omni.osc.OscFilterRule("/conflate$", max_rate=10, conflate=True),
+                omni.osc.OscFilterRule("/deadband$", deadband=0.1),
+                omni.osc.OscFilterRule("/ema$", smoothing="ema", alpha=0.5),
+            ]
+        )
+        # 100 messages over a second at most 10 times per second
+        passed = [message_filter.process("/rate", (float(i),), i * 0.01, emit) for i in range(100)]
+        self.assertEqual(len([args for args in passed if args is not None]), 10)
+        # The latest message over the rate is held until the filter is flushed
+        passed = [message_filter.process("/conflate", (float(i),), 10.0 + i * 0.01, emit) for i in range(5)]
+        self.assertEqual(passed, [(0.0,), None, None, None, None])
+        self.assertEqual(message_filter.flush(force=True), 1)
+        self.assertEqual(delivered, [("/conflate", (4.0,))])
+        passed = [message_filter.process("/deadband", (value,), 0.0, emit) for value in (0.0, 0.05, 0.2)]
+        self.assertEqual(passed, [(0.0,), None, (0.2,)])
+        passed = [message_filter.process("/ema", (value,), float(i), emit) for i, value in enumerate((0.0, 1.0, 1.0))]
+        self.assertEqual(passed, [[0.0], [0.5], [0.75]])
+        # Addresses without a rule are passed on unchanged
+        self.assertEqual(message_filter.process("/other", ("text",), 0.0, emit), ("text",))
+
+    async def test_mirror_sends_changed_attributes(self):
+        import omni.usd
+        from pxr import Gf, UsdGeom
+
+        await omni.usd.get_context().new_stage_async()
+        stage = omni.usd.get_context().get_stage()
+        sphere = UsdGeom.Sphere.Define(stage, "/World/Sphere")
+        translate = sphere.AddTranslateOp()
+        server = omni.osc.OmniOscExt.create_server()
+        is_running = server.start("localhost", 3347)
+        self.assertTrue(is_running)
+
+        self.messages = []
+        def on_event(e) -> None:
+            self.messages.extend(omni.osc.osc_messages_from_carb_event(e))
+        sub = omni.osc.subscribe_to_osc_event_stream(on_event)
+
+        sender = omni.osc.OscSender()
+        sender.start(flush_every_frame=False)
+        mirror = omni.osc.OscStageMirror(sender=sender)
+        count = mirror.load(
+            [
+                {"prim": "/World/Sphere", "attribute": "radius", "address": "/radius"},
+                {"prim": "/World/Sphere", "address": "/transform"},
+                {"prim": "/World/Sphere", "attribute": "radius", "port": 3347},
+            ],
+            host="127.0.0.1",
+            port=3347,
+        )
+        self.assertEqual(count, 3)
+        mirror.start()
+        # Every entry is sent once after loading
+        self.assertEqual(mirror.send_changes(), 3)
+        self.assertEqual(mirror.send_changes(), 0)
+        # Setting an unchanged value sends nothing
+        sphere.GetRadiusAttr().Set(sphere.GetRadiusAttr().Get())
+        self.assertEqual(mirror.send_changes(), 0)
+        sphere.GetRadiusAttr().Set(2.0)
+        translate.Set(Gf.Vec3d(1.0, 2.0, 3.0))
+        self.assertEqual(mirror.send_changes(), 3)
+        mirror.stop()
+        mirror.clear()
+        sender.stop()
+        await asyncio.sleep(1)
+        omni.osc.get_osc_event_stream().pump()
+        server.stop()
+        addresses = [addr for addr, _ in self.messages]
+        self.assertEqual(addresses.count("/radius"), 2)
+        self.assertEqual(addresses.count("/World/Sphere/radius"), 2)
+        self.assertEqual(addresses.count("/transform"), 2)
+        self.assertEqual(list(self.messages[-2][1][12:15]), [1.0, 2.0, 3.0])
+        sub = None
+
+    async def test_monitor_aggregates_messages_in_bounded_memory(self):
+        monitor = omni.osc.OscMonitor(capacity=1024, max_addresses=8)
+        # Nothing is recorded while paused
+        monitor.record("/paused", [0.0], 0.0)
+        self.assertEqual(monitor.update(), 0)
+        monitor.resume()
+        for i in range(10000):
+            monitor.record(f"/fader/{i % 10}", [float(i)], 0.0)
+        # Only the latest messages are kept between two updates
+        self.assertEqual(monitor.update(), 1024)
+        self.assertEqual(monitor.overwritten, 10000 - 1024)
+        self.assertEqual(len(monitor.states), 8)
+        self.assertGreater(monitor.untracked, 0)
+        [(address, state)] = monitor.addresses("/fader/1")
+        self.assertEqual(address, "/fader/1")
+        self.assertEqual(state.args, [9991.0])
+        monitor.pause()
+        monitor.clear()
+        self.assertEqual(monitor.addresses(), [])
+
+    async def test_server_can_rebind_and_stop_without_blocking(self):
+        from pythonosc import udp_client
+
+        server = omni.osc.OmniOscExt.create_server()
+        is_running = server.start("localhost", 3348)
+        self.assertTrue(is_running)
+
+        self.addresses = []
+        def on_event(e) -> None:
+            self.addresses.extend(addr for addr, _ in omni.osc.osc_messages_from_carb_event(e))
+        sub = omni.osc.subscribe_to_osc_event_stream(on_event)
+
+        udp_client.SimpleUDPClient("127.0.0.1", 3348).send_message("/before", 1.0)
+        await asyncio.sleep(0.5)
+        # The new socket is bound before the previous one is released
+        self.assertTrue(server.rebind("localhost", 3349))
+        udp_client.SimpleUDPClient("127.0.0.1", 3349).send_message("/after", 1.0)
+        # An address of another host cannot be bound, the server stays on its current address
+        self.assertFalse(server.rebind("192.0.2.1", 3349))
+        self.assertTrue(server.running())
+        await asyncio.sleep(0.5)
+        future = server.stop_async()
+        self.assertFalse(server.running())
+        self.assertFalse(future.result(timeout=2))
+        omni.osc.get_osc_event_stream().pump()
+        self.assertEqual(self.addresses, ["/before", "/after"])
+        sub = None
+
+    async def test_stop_async_then_start_on_every_transport(self):
+        for options in [{"transport": "tcp"}, {"engine": "process"}, {"engine": "thread"}]:
+            server = omni.osc.OmniOscExt.create_server(**options)
+            self.assertTrue(server.start("localhost", 3351), options)
+            future = server.stop_async()
+            # The server is stopped right away, and can be restarted on the same port before it is released
+            self.assertFalse(server.running(), options)
+            self.assertTrue(server.start("localhost", 3351), options)
+            self.assertFalse(future.result(timeout=5), options)
+            self.assertTrue(server.running(), options)
+            self.assertFalse(server.stop(), options)
+            # Stopping twice releases the server once
+            self.assertFalse(server.stop_async().result(timeout=5), options)
+
+    async def test_messages_node_flattens_numeric_arguments(self):
+        import numpy as np
+        from omni.osc.ogn.nodes.OgnOnOscMessages import OgnOnOscMessages
+
+        arguments = [[1.0, 2.0], (3,), [], np.array([4.0, 5.0], dtype=np.float32)]
+        values, offsets = OgnOnOscMessages.flatten_values(arguments)
+        self.assertEqual(values.tolist(), [1.0, 2.0, 3.0, 4.0, 5.0])
+        self.assertEqual(offsets.tolist(), [0, 2, 3, 3, 5])
+        # A message with a string argument contributes no values, even when the string holds a number
+        values, offsets = OgnOnOscMessages.flatten_values([[1.0, "2.5"], [True, 4], ["text"]])
+        self.assertEqual(values.tolist(), [1.0, 4.0])
+        self.assertEqual(offsets.tolist(), [0, 0, 2, 2])
+
+    async def test_process_server_keeps_the_batch_when_a_handler_fails(self):
+        import socket
+
+        dispatcher = omni.osc.OscFastDispatcher()
+        received = []
+        def on_message(address, *args) -> None:
+            if address == "/fail":
+                raise ValueError("handler error")
+            received.append(address)
+        dispatcher.set_default_handler(on_message)
+        server = omni.osc.OscProcessServer(dispatcher, ring_size=16)
+        self.assertTrue(server.start("localhost", 3352))
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # Give the receiver process time to start
+        await asyncio.sleep(1)
+        for address in ("/before", "/fail", "/after"):
+            sock.sendto(omni.osc.encode_message(address, [1.0]), ("127.0.0.1", 3352))
+        await asyncio.sleep(0.5)
+        self.assertEqual(server.drain(), 3)
+        server.stop()
+        sock.close()
+        self.assertEqual(received, ["/before", "/after"])
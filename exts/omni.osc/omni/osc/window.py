@@ -6,19 +6,47 @@
 # distribution of this software and related documentation without an express
 # license agreement from NVIDIA CORPORATION is strictly prohibited.
 
-from typing import Callable
+import time
+from typing import Any, Callable, Dict, Optional
 
+import carb.events
+import numpy as np
+import omni.kit.app
 import omni.ui as ui
 
+from .monitor import OscMonitor
+from .stats import OscStats
+
+# Number of addresses listed in the statistics panel
+_TOP_ADDRESSES = 5
+# Number of addresses listed in the monitor panel
+_MONITOR_ROWS = 40
+# Number of arguments shown for each address in the monitor panel
+_MONITOR_ARGS = 8
+# Minimum time between two redraws of the monitor panel, in seconds
+_MONITOR_REDRAW_INTERVAL = 0.25
+
 OnStartCallback = Callable[[str, int], bool]
 OnStopCallback = Callable[[], bool]
+OnRebindCallback = Callable[[str, int], bool]
 
 
 class OscWindow(ui.Window):
     def __init__(
-        self, default_addr: str, default_port: int, on_start: OnStartCallback, on_stop: OnStopCallback
+        self,
+        default_addr: str,
+        default_port: int,
+        on_start: OnStartCallback,
+        on_stop: OnStopCallback,
+        stats: Optional[OscStats] = None,
+        monitor: Optional[OscMonitor] = None,
+        on_rebind: Optional[OnRebindCallback] = None,
     ) -> None:
         super().__init__("OSC UDP Server", width=300, height=300)
+        self.stats: Optional[OscStats] = stats
+        self.monitor: Optional[OscMonitor] = monitor
+        self.monitor_sub: carb.events.ISubscription = None
+        self.redraw_time: float = 0.0
 
         def start() -> None:
             """
@@ -34,6 +62,14 @@ class OscWindow(ui.Window):
             is_running = on_stop()
             running.set_value(is_running)
 
+        def rebind() -> None:
+            """
+            Callback when the user presses the rebind button
+            """
+            if on_rebind(addr.as_string, port.as_int):
+                running.set_value(True)
+                update_running_label(label, True)
+
         def update_running_label(label: ui.Label, running: bool) -> None:
             """
             Keep the UI label up to date with the state of the server
@@ -47,8 +83,11 @@ class OscWindow(ui.Window):
 
         def toggle_enabled(field: ui.AbstractField, running: bool) -> None:
             """
-            Enable or disable the input field based on the state of the server
+            Enable or disable the input field based on the state of the server,
+            the fields stay enabled when the server can be rebound while running
             """
+            if on_rebind is not None:
+                return
             field.enabled = not running
             color = "gray" if running else "white"
             field.set_style({"color": color})
@@ -79,3 +118,92 @@ class OscWindow(ui.Window):
                 with ui.VStack():
                     ui.Button("Start", clicked_fn=start)
                     ui.Button("Stop", clicked_fn=stop)
+                    if on_rebind is not None:
+                        ui.Button(
+                            "Rebind", clicked_fn=rebind, tooltip="Move the running server to the address and port"
+                        )
+                if stats is not None:
+                    with ui.CollapsableFrame("Statistics", height=0):
+                        self.stats_label = ui.Label("", word_wrap=True)
+                    self.update_stats(stats.snapshot())
+                    stats.publish_callbacks.append(self.update_stats)
+                if monitor is not None:
+                    # Collapsed by default, the monitor only records messages while its panel is shown
+                    self.monitor_frame = ui.CollapsableFrame("Monitor", height=0, collapsed=True)
+                    with self.monitor_frame:
+                        with ui.VStack(height=0):
+                            with ui.HStack(height=20):
+                                ui.Label("Filter:", width=40)
+                                self.monitor_filter = ui.SimpleStringModel("")
+                                ui.StringField(self.monitor_filter)
+                                ui.Spacer(width=4)
+                                ui.Label("Pause", width=40)
+                                self.monitor_paused = ui.SimpleBoolModel(False)
+                                ui.CheckBox(self.monitor_paused, width=20)
+                                ui.Button("Clear", width=50, clicked_fn=monitor.clear)
+                            self.monitor_label = ui.Label("", word_wrap=False)
+                    update_stream = omni.kit.app.get_app().get_update_event_stream()
+                    self.monitor_sub = update_stream.create_subscription_to_pop(
+                        self.update_monitor, name="omni.osc monitor"
+                    )
+
+    def update_stats(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Show the statistics published by the stats
+        """
+        top = sorted(snapshot["addresses"].items(), key=lambda item: item[1], reverse=True)[:_TOP_ADDRESSES]
+        lines = [
+            f"Packets: {snapshot['packets']} ({snapshot['packets_per_s']:.0f}/s)",
+            f"Bytes: {snapshot['bytes']} ({snapshot['bytes_per_s'] / 1024:.1f} KiB/s)",
+            f"Decode errors: {snapshot['decode_errors']}",
+            f"Kernel drops: {snapshot['kernel_drops']}",
+            f"Queue high-water: {snapshot['queue_high_water']}",
+            f"Latency p50: {snapshot['latency_p50_ms']} ms, p99: {snapshot['latency_p99_ms']} ms",
+        ]
+        lines.extend(f"{address}: {count}" for address, count in top)
+        self.stats_label.text = "\n".join(lines)
+
+    def update_monitor(self, _event: carb.events.IEvent) -> None:
+        """
+        Redraw the monitor panel a few times per second while it is shown, and pause the monitor otherwise
+        """
+        shown = self.visible and not self.monitor_frame.collapsed and not self.monitor_paused.get_value_as_bool()
+        if not shown:
+            self.monitor.pause()
+            return
+        self.monitor.resume()
+        now = time.perf_counter()
+        if now - self.redraw_time < _MONITOR_REDRAW_INTERVAL:
+            return
+        self.redraw_time = now
+        self.monitor.update()
+        addresses = self.monitor.addresses(self.monitor_filter.as_string)
+        lines = [
+            f"{len(addresses)} addresses, {self.monitor.overwritten} overwritten, {self.monitor.untracked} untracked"
+        ]
+        for address, state in addresses[:_MONITOR_ROWS]:
+            lines.append(f"{address} {_format_args(state.args)} {state.rate:.0f}/s ({state.count})")
+        if len(addresses) > _MONITOR_ROWS:
+            lines.append(f"... {len(addresses) - _MONITOR_ROWS} more, refine the filter")
+        self.monitor_label.text = "\n".join(lines)
+
+    def destroy(self) -> None:
+        self.monitor_sub = None
+        if self.monitor is not None:
+            self.monitor.pause()
+        self.monitor = None
+        if self.stats is not None and self.update_stats in self.stats.publish_callbacks:
+            self.stats.publish_callbacks.remove(self.update_stats)
+        self.stats = None
+        super().destroy()
+
+
+def _format_args(args: Any) -> str:
+    """Returns the first arguments of a message as text"""
+    if isinstance(args, np.ndarray):
+        args = args.tolist()
+    args = list(args)
+    text = ", ".join(f"{arg:.3f}" if isinstance(arg, float) else str(arg) for arg in args[:_MONITOR_ARGS])
+    if len(args) > _MONITOR_ARGS:
+        text += ", ..."
+    return f"[{text}]"